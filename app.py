@@ -98,9 +98,15 @@
         </div>
     </div>
 
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/three.js/r167/three.min.js"></script>
-    <script>
-        'use strict';
+    <script type="importmap">
+        {
+            "imports": {
+                "three": "/vendor/three/three.module.js"
+            }
+        }
+    </script>
+    <script type="module">
+        import * as THREE from 'three';
 
         class TradingCardApp {
             constructor() {
@@ -126,11 +132,12 @@
                     maxZoom: 10,
                     packSize: 10
                 };
-                // Mock 1989 Score set data (replace with local assets in production)
+                // 1989 Score set served by the local asset server (python -m cardserver serve);
+                // each URL redirects to the immutable, content-hashed texture tier.
                 this.score1989Cards = Array.from({ length: 330 }, (_, i) => ({
                     name: `Card #${i + 1}`,
-                    front: `https://via.placeholder.com/250x350?text=1989+Score+Card+${i + 1}`,
-                    back: `https://via.placeholder.com/250x350?text=1989+Score+Back`
+                    front: `/api/sets/1989-score-football/cards/${i + 1}/front?tier=mid`,
+                    back: `/api/sets/1989-score-football/cards/${i + 1}/back?tier=mid`
                 }));
 
                 if (!this.checkWebGLSupport()) {
@@ -149,8 +156,10 @@
                 try {
                     this.state.scene = new THREE.Scene();
                     this.state.camera = new THREE.PerspectiveCamera(75, window.innerWidth / window.innerHeight, 0.1, 1000);
-                    this.state.renderer = new THREE.WebGLRenderer({ alpha: true, antialias: true });
-                    this.state.renderer.setPixelRatio(window.devicePixelRatio);
+                    // This page redraws every frame, so high-DPI panels are capped and
+                    // skip MSAA; index.html adapts resolution instead.
+                    this.state.renderer = new THREE.WebGLRenderer({ alpha: true, antialias: window.devicePixelRatio < 2 });
+                    this.state.renderer.setPixelRatio(Math.min(window.devicePixelRatio, 1.5));
                     this.state.renderer.setSize(window.innerWidth, window.innerHeight);
                     document.body.appendChild(this.state.renderer.domElement);
                     this.state.camera.position.z = 5;
@@ -198,8 +207,8 @@
             createCard(index, frontUrl = null, backUrl = null) {
                 try {
                     const geometry = new THREE.BoxGeometry(this.config.cardWidth, this.config.cardHeight, this.config.cardThickness);
-                    const frontTexture = new THREE.TextureLoader().load(
-                        frontUrl || `https://via.placeholder.com/250x350?text=Front_${index}`,
+                    const frontTexture = !frontUrl ? new THREE.Texture() : new THREE.TextureLoader().load(
+                        frontUrl,
                         () => {},
                         undefined,
                         (err) => {
@@ -207,8 +216,8 @@
                             this.showError('Failed to load front image');
                         }
                     );
-                    const backTexture = new THREE.TextureLoader().load(
-                        backUrl || `https://via.placeholder.com/250x350?text=Back_${index}`,
+                    const backTexture = !backUrl ? new THREE.Texture() : new THREE.TextureLoader().load(
+                        backUrl,
                         () => {},
                         undefined,
                         (err) => {
@@ -0,0 +1,91 @@
+"""Catalog query benchmark.
+
+Builds a synthetic catalog (default 1000 sets x 500 cards = 500k cards) in a
+temporary directory and times the queries the API serves.  Prints one JSON
+object with p50/p99 milliseconds per query.
+
+    python bench/catalog.py --sets 1000 --cards-per-set 500 --runs 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cardserver.catalog import Catalog  # noqa: E402
+
+TEAMS = [f"Team {i}" for i in range(32)]
+
+
+def build(catalog: Catalog, sets: int, per_set: int, players: int) -> None:
+    for s in range(sets):
+        slug = f"set-{s:05d}"
+        catalog.register_set(slug, f"{1950 + s % 75} Set {s}")
+        catalog.add_cards(
+            slug, ((n, f"Player {(s * per_set + n) % players}", TEAMS[n % len(TEAMS)]) for n in range(1, per_set + 1))
+        )
+
+
+def percentile(sorted_times: list[float], p: float) -> float:
+    return sorted_times[min(len(sorted_times) - 1, int(p * len(sorted_times)))]
+
+
+def time_query(run, runs: int) -> dict:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {"p50Ms": round(percentile(times, 0.5), 3), "p99Ms": round(percentile(times, 0.99), 3)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sets", type=int, default=1000)
+    parser.add_argument("--cards-per-set", type=int, default=500)
+    parser.add_argument("--players", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = Catalog(Path(tmp) / "catalog.sqlite3")
+        start = time.perf_counter()
+        build(catalog, args.sets, args.cards_per_set, args.players)
+        build_seconds = time.perf_counter() - start
+
+        rng = random.Random(1)
+        slug = lambda: f"set-{rng.randrange(args.sets):05d}"  # noqa: E731
+        deep = catalog.cards(year=1989, limit=100)
+        for _ in range(5):
+            deep = catalog.cards(year=1989, limit=100, cursor=deep["next"]) if deep["next"] else deep
+        queries = {
+            "set": lambda: catalog.get_set(slug()),
+            "setPage": lambda: catalog.cards(set_slug=slug(), limit=100),
+            "card": lambda: catalog.cards(set_slug=slug(), number=rng.randrange(1, args.cards_per_set + 1)),
+            "yearPage": lambda: catalog.cards(year=1950 + rng.randrange(75), limit=100),
+            "yearDeepPage": lambda: catalog.cards(year=1989, limit=100, cursor=deep["next"]),
+            "player": lambda: catalog.cards(player=f"player {rng.randrange(args.players)}"),
+            "teamPage": lambda: catalog.cards(team=rng.choice(TEAMS), limit=100),
+            "setsByYear": lambda: catalog.sets(year=1950 + rng.randrange(75)),
+        }
+        results = {name: time_query(run, args.runs) for name, run in queries.items()}
+        catalog.close()
+
+    print(json.dumps({
+        "cards": args.sets * args.cards_per_set,
+        "buildSeconds": round(build_seconds, 2),
+        "queries": results,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Pack generation throughput.
+
+Rips packs from a synthetic set with a base pool and a short-print slot
+and prints packs per second as JSON.
+
+    python bench/packs.py --cards 330 --pack-size 10 --packs 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cardserver.packs import PackTable  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=330)
+    parser.add_argument("--short-prints", type=int, default=30)
+    parser.add_argument("--pack-size", type=int, default=10)
+    parser.add_argument("--packs", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    base = args.cards - args.short_prints
+    tables = {
+        "uniform": PackTable.uniform(range(1, args.cards + 1), args.pack_size),
+        "rarity": PackTable(
+            {"base": list(range(1, base + 1)), "short-print": list(range(base + 1, args.cards + 1))},
+            [(args.pack_size - 1, {"base": 1}), (1, {"base": 9, "short-print": 1})],
+        ),
+    }
+    results = {}
+    for name, table in tables.items():
+        start = time.perf_counter()
+        table.rip_many(args.packs, random.Random(args.seed))
+        rips = time.perf_counter() - start
+        start = time.perf_counter()
+        table.summarize(args.packs, random.Random(args.seed))
+        summary = time.perf_counter() - start
+        results[name] = {"packsPerSecond": round(args.packs / rips), "summaryPacksPerSecond": round(args.packs / summary)}
+    print(json.dumps({"packs": args.packs, "packSize": args.pack_size, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Card server load test.
+
+Starts ``python -m cardserver serve`` on a generated placeholder set (or
+targets a running server with ``--url``) and simulates ``--viewers`` kiosks
+for ``--seconds``.  Each viewer holds one keep-alive connection and loops
+over what the viewer fetches during a card show: tier images, byte ranges
+of a bundle, the set manifest, catalog pages, pack rips and the page and
+its modules revalidated by ETag.  Prints one JSON report with requests per
+second and latency percentiles, overall and per kind of request.
+
+    python bench/server.py --viewers 1000 --seconds 20
+    python bench/server.py --viewers 1000 --threaded      # thread-per-connection server
+    python bench/server.py --url http://127.0.0.1:8000 --set 1989-score-football
+
+Viewers are spread over ``--processes`` client processes so the load
+generator is not limited to one core; on a single machine the clients
+compete with the server for CPU, so treat numbers as relative.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from cardserver.assets import AssetStore  # noqa: E402
+from cardserver.catalog import CATALOG_FILENAME, Catalog  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+SET_NAME = "Load Test Set"
+SET_SLUG = "load-test-set"
+SET_SIZE = 330
+RANGE_BYTES = 64 * 1024
+
+#: Relative frequency of each kind of request in a viewer's loop.
+MIX = {"tier": 40, "bundleRange": 15, "module": 10, "manifest": 10, "catalog": 10, "pack": 10, "page": 5}
+
+
+def percentile(sorted_times: list[float], p: float) -> float:
+    return sorted_times[min(len(sorted_times) - 1, int(p * len(sorted_times)))]
+
+
+def summarize(times: list[float]) -> dict:
+    times = sorted(times)
+    if not times:
+        return {"requests": 0}
+    return {
+        "requests": len(times),
+        "p50Ms": round(percentile(times, 0.5), 2),
+        "p95Ms": round(percentile(times, 0.95), 2),
+        "p99Ms": round(percentile(times, 0.99), 2),
+        "maxMs": round(times[-1], 2),
+    }
+
+
+def raise_file_limit() -> None:
+    # A thousand sockets on each side exceed the usual soft limit of 1024.
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+
+
+def prepare_assets(root: Path) -> None:
+    store = AssetStore(root)
+    if SET_SLUG not in store.sets():
+        print(f"Generating {SET_SIZE} placeholder cards under {root}...", file=sys.stderr)
+        store.generate_placeholders(SET_SLUG, SET_NAME, SET_SIZE)
+    Catalog(root / CATALOG_FILENAME).sync_store(store)
+
+
+def start_server(root: Path, threaded: bool) -> tuple[subprocess.Popen, str]:
+    command = [sys.executable, "-u", "-m", "cardserver", "--root", str(root), "serve", "--port", "0"]
+    if threaded:
+        command.append("--threaded")
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if "http://" not in line:
+        process.kill()
+        raise SystemExit(f"server did not start: {line!r}")
+    return process, line.split("http://", 1)[1].split("/", 1)[0]
+
+
+def build_plan(base_url: str, slug: str) -> dict:
+    """Paths each kind of request picks from, read from the server's manifest."""
+    with urllib.request.urlopen(f"{base_url}/api/sets/{slug}/manifest") as response:
+        manifest = json.load(response)
+    tiers = sorted({
+        entry["file"]
+        for card in manifest["cards"].values()
+        for face in card.values()
+        for entry in face.values()
+        if isinstance(entry, dict)  # Skips the inline preview
+    })
+    bundle = max(manifest.get("bundles", {}).values(), key=lambda b: b["bytes"], default=None)
+    return {
+        "slug": slug,
+        "tiers": [f"/assets/{slug}/{name}" for name in tiers],
+        "bundle": bundle and (f"/assets/{slug}/{bundle['file']}", bundle["bytes"]),
+        "modules": [f"/js/{path.name}" for path in sorted((ROOT / "js").glob("*.js"))],
+    }
+
+
+def next_request(kind: str, plan: dict, rng: random.Random) -> tuple[str, dict[str, str]]:
+    slug = plan["slug"]
+    if kind == "tier":
+        return rng.choice(plan["tiers"]), {}
+    if kind == "bundleRange" and plan["bundle"]:
+        path, size = plan["bundle"]
+        start = rng.randrange(max(1, size - RANGE_BYTES))
+        return path, {"Range": f"bytes={start}-{start + RANGE_BYTES - 1}"}
+    if kind == "module":
+        return rng.choice(plan["modules"]), {"Accept-Encoding": "gzip, br"}
+    if kind == "manifest":
+        return f"/api/sets/{slug}/manifest", {"Accept-Encoding": "gzip, br"}
+    if kind == "catalog":
+        return f"/api/catalog/cards?set={slug}&limit=100", {"Accept-Encoding": "gzip, br"}
+    if kind == "pack":
+        return f"/api/sets/{slug}/pack", {"Accept-Encoding": "gzip, br"}
+    return "/", {"Accept-Encoding": "gzip, br"}
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, dict[str, str], int]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length:
+        await reader.readexactly(length)
+    return status, headers, length
+
+
+async def viewer(host: str, port: int, plan: dict, start_at: float, deadline: float, seed: int, results: dict) -> None:
+    rng = random.Random(seed)
+    kinds, weights = zip(*MIX.items())
+    etags: dict[str, str] = {}  # Revalidate like a browser cache would
+    reader = writer = None
+    await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        path, headers = next_request(kind, plan, rng)
+        if path in etags and "Range" not in headers:
+            headers["If-None-Match"] = etags[path]
+        request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write((request + "\r\n").encode("latin-1"))
+            status, response_headers, length = await read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as error:
+            results["errors"][type(error).__name__] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+            continue
+        results["times"].setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+        results["status"][status] += 1
+        results["bytes"] += length
+        if "etag" in response_headers and status == 200:
+            etags[path] = response_headers["etag"]
+        if response_headers.get("connection", "").lower() == "close":
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+def run_clients(base_url: str, plan: dict, viewers: int, first_seed: int, start_at: float, seconds: float) -> dict:
+    """One client process: runs ``viewers`` viewers on its own event loop."""
+    raise_file_limit()
+    parts = urlsplit(base_url)
+    results = {"times": {}, "status": Counter(), "errors": Counter(), "bytes": 0}
+    # perf_counter is not comparable across processes; convert the shared
+    # wall-clock start into this process's clock.
+    local_start = time.perf_counter() + (start_at - time.time())
+
+    async def main() -> None:
+        await asyncio.gather(*(
+            viewer(parts.hostname, parts.port or 80, plan, local_start, local_start + seconds, first_seed + i, results)
+            for i in range(viewers)
+        ))
+
+    asyncio.run(main())
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    raise_file_limit()
+    server = None
+    tmp = None
+    if args.url:
+        base_url, slug, label = args.url.rstrip("/"), args.set, args.url
+    else:
+        if not args.assets:
+            tmp = tempfile.mkdtemp(prefix="cardserver-load-")
+        root = Path(args.assets or tmp)
+        prepare_assets(root)
+        server, address = start_server(root, args.threaded)
+        base_url, slug, label = f"http://{address}", SET_SLUG, "threaded" if args.threaded else "asyncio"
+    try:
+        plan = build_plan(base_url, slug)
+        processes = max(1, min(args.processes, args.viewers))
+        shares = [args.viewers // processes + (i < args.viewers % processes) for i in range(processes)]
+        start_at = time.time() + 2.0  # Time for every client process to spin up
+        with ProcessPoolExecutor(processes) as pool:
+            futures = [
+                pool.submit(run_clients, base_url, plan, share, sum(shares[:i]), start_at, args.seconds)
+                for i, share in enumerate(shares)
+            ]
+            parts = [future.result() for future in futures]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    times: dict[str, list[float]] = {}
+    status: Counter = Counter()
+    errors: Counter = Counter()
+    for part in parts:
+        for kind, values in part["times"].items():
+            times.setdefault(kind, []).extend(values)
+        status.update(part["status"])
+        errors.update(part["errors"])
+    every = [t for values in times.values() for t in values]
+    overall = summarize(every)
+    return {
+        "server": label,
+        "viewers": args.viewers,
+        "processes": len(parts),
+        "seconds": args.seconds,
+        "requests": overall.get("requests", 0),
+        "requestsPerSecond": round(len(every) / args.seconds),
+        "megabytesPerSecond": round(sum(part["bytes"] for part in parts) / args.seconds / 1e6, 1),
+        "latency": overall,
+        "kinds": {kind: summarize(values) for kind, values in sorted(times.items())},
+        "status": {str(code): count for code, count in sorted(status.items())},
+        "errors": dict(errors),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, default=1000, help="concurrent simulated viewers")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="client processes")
+    parser.add_argument("--threaded", action="store_true", help="load the thread-per-connection server instead")
+    parser.add_argument("--assets", help="asset store to serve (default: a generated set in a temp directory)")
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--set", default=SET_SLUG, help="set slug to request with --url")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""Headless benchmark of the card viewer (index.html).
+
+Drives the viewer in headless Chromium with SwiftShader (software WebGL, no
+GPU) against a local card server, with every other request blocked, and
+writes one JSON report::
+
+    python bench/viewer.py --three-root node_modules/three --out report.json
+    python bench/viewer.py --three-root ... --baseline main.json --threshold 0.2
+
+Scenarios: cold start, warm start (a reload served by the service worker,
+checked against a 300 ms first-frame target), 10/100/1000-card pack rips, flip/fade, drag/rotate
+and texture swap.  Each records frame intervals and per-frame main-thread
+work (p50/p95/p99/max), JS heap after GC, estimated texture memory and the
+last frame's draw calls.  With ``--baseline`` the exit status is 1 when a
+metric is worse than the baseline by more than ``--threshold`` (and by more
+than a small absolute floor, so sub-millisecond noise does not fail builds).
+
+Needs Playwright (``pip install playwright && playwright install chromium``).
+The page loads three.js from ``vendor/three``; when that has not been built,
+``--three-root`` (a local copy of the three@0.134.0 npm package) is vendored
+first, since the benchmark never touches the network.  The asset set is
+generated once under ``data/bench``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from cardserver.assets import AssetStore  # noqa: E402
+from cardserver.catalog import CATALOG_FILENAME, Catalog  # noqa: E402
+from cardserver.server import make_server  # noqa: E402
+from cardserver.shell import VENDOR_DIR, is_vendored, vendor_three  # noqa: E402
+from cardserver.tiers import placeholder_png  # noqa: E402
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:  # pragma: no cover - optional dependency
+    sync_playwright = None
+
+SET_NAME = "1989 Score Football"  # The set the viewer rips packs from
+SET_SLUG = "1989-score-football"
+SET_SIZE = 1100
+WARM_START_TARGET_MS = 300
+VIEWPORT = {"width": 1280, "height": 720}
+CHROMIUM_ARGS = [
+    "--use-gl=angle",
+    "--use-angle=swiftshader",
+    "--enable-unsafe-swiftshader",
+    "--ignore-gpu-blocklist",
+]
+
+#: Metrics compared against a baseline, with the absolute change that is
+#: always tolerated.
+REGRESSION_FLOORS = {
+    "frameWorkMs.p95": 1.0,
+    "frameIntervalMs.p95": 2.0,
+    "durationMs": 50.0,
+    "heapMB": 2.0,
+    "textureMB": 1.0,
+    "drawCalls": 0,
+}
+
+# Wraps requestAnimationFrame so every frame's timestamp and main-thread
+# work are recorded without touching the viewer itself.
+FRAME_PROBE = """
+(() => {
+    const frames = [];
+    const raf = window.requestAnimationFrame.bind(window);
+    window.requestAnimationFrame = (callback) => raf((time) => {
+        const start = performance.now();
+        callback(time);
+        frames.push([time, performance.now() - start]);
+    });
+    window.__benchFrames = frames;
+})();
+"""
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def pick(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 3)}
+
+
+def prepare_assets(root: Path) -> AssetStore:
+    store = AssetStore(root)
+    loaded = store.manifest(SET_SLUG) if SET_SLUG in store.sets() else None
+    if loaded is None or loaded[0]["count"] < SET_SIZE:
+        print(f"Generating {SET_SIZE} placeholder cards under {root} (first run only)...", file=sys.stderr)
+        store.generate_placeholders(SET_SLUG, SET_NAME, SET_SIZE)
+    return store
+
+
+def set_pack_size(store: AssetStore, size: int) -> None:
+    config = {"rarities": {"base": {"cards": f"1-{SET_SIZE}"}}, "slots": [{"count": size, "rarities": {"base": 1}}]}
+    store.packs_path(SET_SLUG).write_text(json.dumps(config))
+
+
+class Session:
+    """One page of the viewer plus the probes the scenarios read."""
+
+    def __init__(self, browser, base_url: str) -> None:
+        self.context = browser.new_context(viewport=VIEWPORT, device_scale_factor=1)
+        self.context.route("**/*", lambda route: self._route(route, base_url))
+        self.context.add_init_script(FRAME_PROBE)
+        self.page = self.context.new_page()
+        self.cdp = self.context.new_cdp_session(self.page)
+        self.errors: list[str] = []
+        self.page.on("pageerror", lambda error: self.errors.append(str(error)))
+
+    @staticmethod
+    def _route(route, base_url: str) -> None:
+        if route.request.url.startswith(base_url):
+            route.continue_()
+        else:
+            route.abort()  # No network: anything else is a bug in the harness or the page
+
+    def start_window(self) -> float:
+        return self.page.evaluate("() => { window.__benchFrames.length = 0; return performance.now(); }")
+
+    def settle(self, timeout: float = 120.0) -> None:
+        """Wait until nothing renders, decodes, loads or prefetches."""
+        deadline = time.monotonic() + timeout
+        quiet = 0
+        while quiet < 3:
+            if time.monotonic() > deadline:
+                raise TimeoutError("viewer did not settle")
+            busy = self.page.evaluate(
+                """() => {
+                    const m = window.tradingCardApp.metrics;
+                    return !m.idle || m.pendingDecodes > 0 || m.sharedTextures.pending > 0 ||
+                        m.prefetch.queued > 0 || m.prefetch.running > 0;
+                }"""
+            )
+            quiet = 0 if busy else quiet + 1
+            time.sleep(0.05)
+
+    def measure(self, started: float, **extra) -> dict:
+        frames, now, metrics = self.page.evaluate(
+            "() => [window.__benchFrames.slice(), performance.now(), window.tradingCardApp.metrics]"
+        )
+        self.cdp.send("HeapProfiler.collectGarbage")
+        heap = self.cdp.send("Runtime.getHeapUsage")["usedSize"]
+        times = [stamp for stamp, _ in frames]
+        # Gaps longer than 250 ms are idle time between on-demand frames.
+        intervals = [b - a for a, b in zip(times, times[1:]) if b - a < 250]
+        return {
+            "durationMs": round(now - started, 1),
+            "frames": len(frames),
+            "frameIntervalMs": percentiles(intervals),
+            "frameWorkMs": percentiles([work for _, work in frames]),
+            "heapMB": round(heap / 2**20, 2),
+            "textureMB": round(metrics["sharedTextures"]["bytes"] / 2**20, 2),
+            "drawCalls": metrics["drawCalls"],
+            "liveCards": metrics["cards"]["live"],
+            **extra,
+        }
+
+    def close(self) -> None:
+        self.context.close()
+
+
+def startup(session: Session) -> dict:
+    session.page.wait_for_function("() => window.tradingCardApp && window.tradingCardApp.metrics.frames.rendered > 0")
+    session.settle()
+    timing = session.page.evaluate(
+        """() => {
+            const nav = performance.getEntriesByType('navigation')[0];
+            const first = window.__benchFrames[0];
+            return { domContentLoadedMs: nav.domContentLoadedEventEnd, firstFrameMs: first ? first[0] : null };
+        }"""
+    )
+    # durationMs runs from navigation start until everything has loaded
+    return session.measure(0.0, **{k: round(v, 1) for k, v in timing.items() if v is not None})
+
+
+def cold_start(session: Session, base_url: str) -> dict:
+    session.page.goto(base_url + "/")
+    return startup(session)
+
+
+def warm_start(session: Session) -> dict:
+    """Reload once the service worker controls the page and has cached the shell."""
+    session.page.wait_for_function("() => navigator.serviceWorker.controller !== null", timeout=60_000)
+    session.page.evaluate("() => navigator.serviceWorker.ready.then(() => true)")
+    session.page.reload()
+    result = startup(session)
+    controlled = session.page.evaluate("() => window.tradingCardApp.metrics.startup.serviceWorker")
+    first = result.get("firstFrameMs")
+    return {
+        **result,
+        "serviceWorker": controlled,
+        "targetMs": WARM_START_TARGET_MS,
+        "withinTarget": first is not None and first <= WARM_START_TARGET_MS,
+    }
+
+
+def rip(session: Session, store: AssetStore, size: int) -> dict:
+    set_pack_size(store, size)
+    session.settle()
+    started = session.start_window()
+    session.page.evaluate("() => window.tradingCardApp.ripPack()")
+    session.page.wait_for_function(
+        "() => performance.getEntriesByName('pack-rip-first-frame').length > 0", timeout=120_000
+    )
+    first = session.page.evaluate(
+        """() => {
+            const entries = performance.getEntriesByName('pack-rip-first-frame');
+            const last = entries[entries.length - 1];
+            performance.clearMeasures('pack-rip-first-frame');
+            return last.duration;
+        }"""
+    )
+    session.settle()
+    return session.measure(started, firstCardMs=round(first, 1), packSize=size)
+
+
+def flip_fade(session: Session) -> dict:
+    started = session.start_window()
+    for _ in range(2):
+        session.page.evaluate("() => window.tradingCardApp.flipCard()")
+        session.settle()
+    for index in (1, 0):
+        session.page.evaluate(f"() => window.tradingCardApp.selectCard({index})")
+        session.settle()
+    return session.measure(started)
+
+
+def drag_rotate(session: Session) -> dict:
+    started = session.start_window()
+    mouse = session.page.mouse
+    x, y = VIEWPORT["width"] // 2, VIEWPORT["height"] // 2
+    mouse.move(x, y)
+    mouse.down()
+    for step in range(60):
+        mouse.move(x + step * 4, y + step * 2)
+    mouse.up()
+    session.page.evaluate("() => window.tradingCardApp.toggleRotate()")
+    time.sleep(2.0)
+    session.page.evaluate("() => window.tradingCardApp.toggleRotate()")
+    session.settle()
+    return session.measure(started)
+
+
+def texture_swap(session: Session) -> dict:
+    images = [placeholder_png(2000, 2800, color) for color in ((200, 60, 60), (60, 160, 90), (70, 90, 200))]
+    started = session.start_window()
+    for index, data in enumerate(images):
+        before = session.page.evaluate("() => window.tradingCardApp.metrics.frames.invalidations")
+        session.page.set_input_files(
+            "#frontImage", files=[{"name": f"swap-{index}.png", "mimeType": "image/png", "buffer": data}]
+        )
+        # The settled viewer only invalidates again once the new image is applied
+        session.page.wait_for_function(
+            f"() => window.tradingCardApp.metrics.frames.invalidations > {before}", timeout=60_000
+        )
+        session.settle()
+    return session.measure(started, swaps=len(images))
+
+
+def run(args: argparse.Namespace) -> dict:
+    three_root = Path(args.three_root) if args.three_root else None
+    if not is_vendored(ROOT):
+        if three_root is None:
+            raise SystemExit(f"{VENDOR_DIR} has not been built; pass --three-root to vendor three.js")
+        try:
+            vendor_three(three_root, ROOT)
+        except ValueError as error:
+            raise SystemExit(str(error)) from None
+    store = prepare_assets(Path(args.assets))
+    catalog = Catalog(Path(args.assets) / CATALOG_FILENAME)
+    catalog.sync_store(store)
+    server = make_server("127.0.0.1", 0, store, catalog)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    scenarios = {}
+    try:
+        with sync_playwright() as playwright:
+            browser = playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+            session = Session(browser, base_url)
+            try:
+                scenarios["cold-start"] = cold_start(session, base_url)
+                scenarios["warm-start"] = warm_start(session)
+                renderer = session.page.evaluate(
+                    """() => {
+                        const gl = document.querySelector('canvas').getContext('webgl2') ||
+                            document.querySelector('canvas').getContext('webgl');
+                        const ext = gl.getExtension('WEBGL_debug_renderer_info');
+                        return ext ? gl.getParameter(ext.UNMASKED_RENDERER_WEBGL) : gl.getParameter(gl.RENDERER);
+                    }"""
+                )
+                for size in (10, 100, 1000):
+                    scenarios[f"rip-{size}"] = rip(session, store, size)
+                set_pack_size(store, 10)
+                session.page.evaluate("() => window.tradingCardApp.ripPack()")
+                session.settle()
+                scenarios["flip-fade"] = flip_fade(session)
+                scenarios["drag-rotate"] = drag_rotate(session)
+                scenarios["texture-swap"] = texture_swap(session)
+                errors = session.errors
+            finally:
+                session.close()
+                browser.close()
+    finally:
+        store.packs_path(SET_SLUG).unlink(missing_ok=True)
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "renderer": renderer,
+            "viewport": VIEWPORT,
+            "pageErrors": errors,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def _lookup(result: dict, dotted: str):
+    value = result
+    for part in dotted.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def regressions(report: dict, baseline: dict, threshold: float) -> list[str]:
+    found = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for metric, floor in REGRESSION_FLOORS.items():
+            old, new = _lookup(before, metric), _lookup(result, metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > floor:
+                found.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100 if old else float('inf'):.0f}%)")
+    return found
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--three-root", help="three@0.134.0 npm package to vendor if vendor/three is missing")
+    parser.add_argument("--assets", default=str(ROOT / "data" / "bench"), help="asset store for the benchmark set")
+    parser.add_argument("--out", help="write the report here (default: stdout)")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if sync_playwright is None:
+        print("Playwright is required: pip install playwright && playwright install chromium", file=sys.stderr)
+        return 2
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        found = regressions(report, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
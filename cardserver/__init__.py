@@ -0,0 +1,14 @@
+"""Local tooling and servers for the 3D trading card viewer.
+
+The viewer (``index.html``) is a static page; everything it needs -- a
+self-hosted three.js, card images, set metadata, packs, the service worker
+that keeps it working offline -- is produced and served by the modules in
+this package.  Run ``python -m cardserver --help`` for the CLI.
+"""
+
+from cardserver.assets import AssetStore
+from cardserver.catalog import Catalog
+from cardserver.collection import CollectionStore
+from cardserver.tiers import TIERS, Tier
+
+__all__ = ["AssetStore", "Catalog", "CollectionStore", "TIERS", "Tier"]
@@ -0,0 +1,241 @@
+"""Command line entry point: ``python -m cardserver <command>``."""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+from cardserver.assets import DEFAULT_ROOT, AssetStore, slugify
+from cardserver.catalog import CATALOG_FILENAME, Catalog
+from cardserver.collection import COLLECTION_FILENAME, CollectionStore
+
+
+def _catalog(args: argparse.Namespace) -> Catalog:
+    return Catalog(args.catalog or Path(args.root) / CATALOG_FILENAME)
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    if args.threaded:
+        from cardserver.server import serve
+    else:
+        from cardserver.aioserver import serve
+    from cardserver.server import STATIC_ROOT
+    from cardserver.shell import VENDOR_MISSING, is_vendored
+
+    if not is_vendored(STATIC_ROOT):
+        print(f"warning: {VENDOR_MISSING}; the viewer cannot start without it", file=sys.stderr)
+
+    store = AssetStore(args.root)
+    catalog = _catalog(args)
+    catalog.sync_store(store)
+    collections = CollectionStore(args.collections or Path(args.root) / COLLECTION_FILENAME)
+    serve(args.host, args.port, store, catalog, collections)
+    return 0
+
+
+def _cmd_bake(args: argparse.Namespace) -> int:
+    store = AssetStore(args.root)
+    manifest = store.bake_set(args.slug or slugify(args.name), args.name, Path(args.source))
+    _catalog(args).sync_store(store)
+    print(f"Baked {len(manifest['cards'])} cards into {store.set_dir(manifest['set'])}")
+    return 0
+
+
+def _cmd_ingest(args: argparse.Namespace) -> int:
+    from cardserver.ingest import ingest_set
+
+    store = AssetStore(args.root)
+    report = ingest_set(
+        store,
+        args.slug or slugify(args.name),
+        args.name,
+        Path(args.source),
+        catalog=_catalog(args),
+        workers=args.workers,
+        max_distance=args.max_distance,
+    )
+    print(f"Ingested {report.processed} scans ({report.cropped} cropped) for {report.cards} cards into "
+          f"{store.set_dir(report.slug)}")
+    for scan, original, distance in report.duplicates:
+        print(f"  {scan.name} duplicates {original.name} (distance {distance}); stored once")
+    for scan, reason in report.failed:
+        print(f"  {scan.name} skipped: {reason}", file=sys.stderr)
+    return 0
+
+
+def _cmd_placeholders(args: argparse.Namespace) -> int:
+    store = AssetStore(args.root)
+    manifest = store.generate_placeholders(args.slug or slugify(args.name), args.name, args.count)
+    _catalog(args).sync_store(store)
+    print(f"Wrote placeholder tiers for {manifest['count']} cards into {store.set_dir(manifest['set'])}")
+    return 0
+
+
+def _cmd_catalog_import(args: argparse.Namespace) -> int:
+    slug = args.slug or slugify(args.name)
+    count = _catalog(args).import_csv(slug, args.name, Path(args.source), args.year)
+    print(f"Catalogued {count} cards for {slug}")
+    return 0
+
+
+def _cmd_catalog_sync(args: argparse.Namespace) -> int:
+    synced = _catalog(args).sync_store(AssetStore(args.root))
+    print(f"Synced {len(synced)} baked sets into the catalog")
+    return 0
+
+
+def _cmd_atlas(args: argparse.Namespace) -> int:
+    from cardserver.atlas import bake_atlases
+
+    atlas = bake_atlases(
+        AssetStore(args.root), args.slug, tier=args.tier, page_size=args.page_size, ktx2=not args.no_ktx2
+    )
+    compressed = sum("ktx2" in page for page in atlas["pages"])
+    print(f"Packed {len(atlas['cards'])} cards into {len(atlas['pages'])} pages ({compressed} KTX2)")
+    return 0
+
+
+def _cmd_bundle(args: argparse.Namespace) -> int:
+    store = AssetStore(args.root)
+    manifest = store.bundle_set(args.slug)
+    for tier, bundle in manifest["bundles"].items():
+        print(f"{tier}: {bundle['file']} ({bundle['bytes']} bytes)")
+    return 0
+
+
+def _cmd_vendor(args: argparse.Namespace) -> int:
+    from cardserver.server import STATIC_ROOT
+    from cardserver.shell import VENDOR_DIR, vendor_three
+
+    try:
+        record = vendor_three(Path(args.three_root), STATIC_ROOT, esbuild=args.esbuild)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    size = f"{record['bytes'] // 1024} KB"
+    if record["treeShaken"]:
+        print(f"Bundled {len(record['exports'])} three.js exports into {VENDOR_DIR} "
+              f"({size} of {record['fullBytes'] // 1024} KB)")
+    else:
+        print(f"esbuild not found; copied the full three.js module into {VENDOR_DIR} ({size})")
+    return 0
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    from cardserver.export import export_cards
+    from cardserver.packs import parse_numbers
+
+    store = AssetStore(args.root)
+    numbers = parse_numbers(args.cards.split(",")) if args.cards else None
+    try:
+        report = export_cards(
+            store, args.slug, numbers, tuple(args.kinds.split(",")),
+            size=args.size, frames=args.frames, fps=args.fps, background=args.background, workers=args.workers,
+        )
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f"Exported {report.rendered + report.cached} files for {len(report.cards)} cards "
+          f"({report.rendered} rendered, {report.cached} cached)")
+    if args.out:
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        for number, kinds in report.cards.items():
+            for kind, entry in kinds.items():
+                suffix = Path(entry["file"]).suffix
+                shutil.copyfile(store.tier_dir(args.slug) / entry["file"], out / f"{args.slug}-{number}-{kind}{suffix}")
+        print(f"Copied them to {out}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cardserver", description=__doc__)
+    parser.add_argument("--root", default=str(DEFAULT_ROOT), help="asset store directory (default: %(default)s)")
+    parser.add_argument("--catalog", help=f"catalog database (default: <root>/{CATALOG_FILENAME})")
+    parser.add_argument(
+        "--collections", help=f"saved collections database (default: <root>/{COLLECTION_FILENAME})"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve the viewer and baked assets")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument(
+        "--threaded", action="store_true", help="use the thread-per-connection server instead of asyncio"
+    )
+    serve.set_defaults(func=_cmd_serve)
+
+    bake = commands.add_parser("bake", help="bake a directory of card scans into texture tiers")
+    bake.add_argument("source", help="directory of <number>-front/back images")
+    bake.add_argument("--name", required=True, help='set name, e.g. "1989 Score Football"')
+    bake.add_argument("--slug", help="set slug (default: derived from --name)")
+    bake.set_defaults(func=_cmd_bake)
+
+    ingest = commands.add_parser("ingest", help="crop, normalize, dedupe and bake raw scans in parallel")
+    ingest.add_argument("source", help="directory of <number>-front/back scans or photos")
+    ingest.add_argument("--name", required=True, help='set name, e.g. "1989 Score Football"')
+    ingest.add_argument("--slug", help="set slug (default: derived from --name)")
+    ingest.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    ingest.add_argument(
+        "--max-distance", type=int, default=6,
+        help="perceptual hash bits two faces may differ by and still count as duplicates; -1 disables",
+    )
+    ingest.set_defaults(func=_cmd_ingest)
+
+    placeholders = commands.add_parser("placeholders", help="generate placeholder tiers for a set")
+    placeholders.add_argument("--name", default="1989 Score Football")
+    placeholders.add_argument("--slug")
+    placeholders.add_argument("--count", type=int, default=330)
+    placeholders.set_defaults(func=_cmd_placeholders)
+
+    atlas = commands.add_parser("atlas", help="pack a baked set's fronts into texture atlases")
+    atlas.add_argument("slug", help="set slug, e.g. 1989-score-football")
+    atlas.add_argument("--tier", default="mid", help="tier packed into the atlas (default: %(default)s)")
+    atlas.add_argument("--page-size", type=int, default=4096)
+    atlas.add_argument("--no-ktx2", action="store_true", help="skip KTX2 compression even if toktx is installed")
+    atlas.set_defaults(func=_cmd_atlas)
+
+    bundle = commands.add_parser("bundle", help="rebuild the per-tier bundles of a baked set")
+    bundle.add_argument("slug", help="set slug, e.g. 1989-score-football")
+    bundle.set_defaults(func=_cmd_bundle)
+
+    export = commands.add_parser("export", help="render card turntables, flips, sprite sheets and thumbnails")
+    export.add_argument("slug", help="set slug, e.g. 1989-score-football")
+    export.add_argument("--cards", help='card numbers, e.g. "1-10,25" (default: every card in the set)')
+    export.add_argument("--kinds", default="turntable,flip,sheet,thumb", help="what to render (default: %(default)s)")
+    export.add_argument("--size", type=int, help="frame height in pixels (default: 512 for animations, 256 otherwise)")
+    export.add_argument("--frames", type=int, default=60, help="turntable and sprite sheet frames (default: %(default)s)")
+    export.add_argument("--fps", type=int, default=30, help="frame rate of flips (default: %(default)s)")
+    export.add_argument("--background", help="colour behind the card, e.g. #202020 (default: transparent)")
+    export.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    export.add_argument("--out", help="also copy the files here as <slug>-<number>-<kind>.<ext>")
+    export.set_defaults(func=_cmd_export)
+
+    vendor = commands.add_parser("vendor", help="self-host three.js for the viewer under vendor/three")
+    vendor.add_argument("--three-root", required=True, help="directory of the three@0.134.0 npm package")
+    vendor.add_argument("--esbuild", help="esbuild executable used to tree-shake (default: esbuild on PATH)")
+    vendor.set_defaults(func=_cmd_vendor)
+
+    catalog = commands.add_parser("catalog", help="manage the card catalog")
+    catalog_commands = catalog.add_subparsers(dest="catalog_command", required=True)
+    catalog_import = catalog_commands.add_parser("import", help="load a number,player,team checklist CSV")
+    catalog_import.add_argument("source", help="CSV file with number, player and team columns")
+    catalog_import.add_argument("--name", required=True, help='set name, e.g. "1989 Score Football"')
+    catalog_import.add_argument("--slug", help="set slug (default: derived from --name)")
+    catalog_import.add_argument("--year", type=int, help="set year (default: taken from --name)")
+    catalog_import.set_defaults(func=_cmd_catalog_import)
+    catalog_sync = catalog_commands.add_parser("sync", help="register every baked set in the catalog")
+    catalog_sync.set_defaults(func=_cmd_catalog_sync)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
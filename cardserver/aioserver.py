@@ -0,0 +1,512 @@
+"""asyncio HTTP/1.1 server for the viewer and its assets.
+
+Serves the same :class:`~cardserver.web.Router` as :mod:`cardserver.server`
+from one event loop instead of a thread per connection, so a room of kiosks
+holding keep-alive connections open costs a socket each, not a thread each.
+
+File responses (tier images, bundles, the viewer's own files) go out with
+``loop.sendfile``, which uses ``os.sendfile`` on plain TCP sockets: the bytes
+move from the page cache to the socket without passing through Python.
+Where sendfile is not available (TLS, some platforms) the file is
+memory-mapped and written in slices of the mapping instead of being read
+into buffers.  Single byte ranges and conditional requests (``If-None-Match``,
+``If-Modified-Since``, ``If-Range``) are answered by
+:func:`cardserver.web.file_response`, as for the threaded server.
+
+JSON, HTML, JavaScript and CSS go out gzip-encoded, or brotli-encoded when
+the ``brotli`` package is installed, to clients that accept it.  A body with
+an ETag is compressed once at the highest level and kept in a bounded cache
+keyed by that ETag, so a manifest fetched by a thousand viewers is
+compressed once; the viewer's own files are compressed before the server
+starts listening.  Bodies that must not be cached (unseeded pack rips) are
+compressed quickly per response.  An encoded body is its own representation,
+so it carries its own ETag (``"<tag>-gz"``, ``"<tag>-br"``), and 304s carry
+``Vary: Accept-Encoding`` like the 200s they stand in for.
+
+API handlers may query SQLite or rip millions of packs, and the service
+worker is rendered from the whole shell, so those run in the loop's thread
+pool.  Everything else only stats a file and is dispatched on the loop; its
+response stays there only if it needs no compression or its compressed body
+is already cached, otherwise it is compressed in the pool as well.  The
+viewer's ETags and compressed files are computed before the server starts
+listening, so a cold cache only ever costs a pool thread, never the loop.
+Export renders take seconds each, so they get a small pool of their own
+with a bounded queue instead of tying up the threads other API calls need.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import mimetypes
+import mmap
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from email.utils import formatdate
+from http import HTTPStatus
+from pathlib import Path
+from typing import Callable
+
+from cardserver.assets import AssetStore
+from cardserver.catalog import Catalog
+from cardserver.collection import CollectionStore
+from cardserver.server import StaticFiles, build_router
+from cardserver.web import HTTPError, Request, Response, Router, error_response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+#: Content types worth compressing; the asset store only holds image data
+#: that is compressed already.
+COMPRESSIBLE = {
+    "application/json",
+    "application/manifest+json",
+    "application/wasm",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+}
+#: Supported ``Content-Encoding`` values, preferred first.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+#: Appended to a body's ETag once it is sent encoded.
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+MIN_COMPRESS_BYTES = 1024
+MAX_COMPRESS_BYTES = 8 * 1024 * 1024
+COMPRESSION_CACHE_BYTES = 64 * 1024 * 1024
+MAX_REQUEST_BODY = 16 * 1024 * 1024
+MAX_HEADERS = 100
+KEEPALIVE_SECONDS = 15.0
+BODY_SECONDS = 60.0
+MMAP_CHUNK = 256 * 1024
+#: Paths whose handlers do more than stat a file; they always run in the pool.
+EXECUTOR_PREFIXES = ("/api/", "/sw.js")
+#: Export renders; they run in their own pool of ``EXPORT_WORKERS`` threads,
+#: and past ``EXPORT_QUEUE`` waiting or running ones are turned away with 503.
+EXPORT_ROUTE = re.compile(r"/api/sets/[^/]+/cards/[^/]+/exports/[^/]+")
+EXPORT_WORKERS = 2
+EXPORT_QUEUE = 8
+
+
+def compress(data: bytes, encoding: str, *, best: bool = False) -> bytes:
+    """Encode ``data``; ``best`` trades time for size on bodies compressed once."""
+    if encoding == "br":
+        quality = (11 if len(data) <= 1024 * 1024 else 9) if best else 4
+        return brotli.compress(data, quality=quality)
+    return gzip.compress(data, compresslevel=9 if best else 5, mtime=0)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of ``etag``'s body sent with ``encoding``: ``"abc"`` -> ``"abc-gz"``."""
+    return etag[:-1] + ETAG_SUFFIXES[encoding] + '"'
+
+
+def identity_etag(etag: str) -> str:
+    """Undo :func:`encoded_etag`; other ETags come back unchanged."""
+    for suffix in ETAG_SUFFIXES.values():
+        if etag.endswith(suffix + '"'):
+            return etag[: -len(suffix) - 1] + '"'
+    return etag
+
+
+def accepted_encoding(header: str | None) -> str | None:
+    """The supported encoding an ``Accept-Encoding`` header ranks highest."""
+    if not header:
+        return None
+    best, best_q = None, 0.0
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if name not in ENCODINGS:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if q > best_q or (q == best_q and q > 0 and ENCODINGS.index(name) < ENCODINGS.index(best)):
+            best, best_q = name, q
+    return best
+
+
+class CompressionCache:
+    """Compressed bodies keyed by ``(etag, encoding)``, evicted least recently used.
+
+    ETags here are content hashes, so an entry never goes stale.  Concurrent
+    misses for the same key wait for one compression instead of each doing it.
+    """
+
+    def __init__(self, budget_bytes: int = COMPRESSION_CACHE_BYTES) -> None:
+        self.budget_bytes = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._bytes = 0
+        self._pending: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, etag: str, encoding: str, load: Callable[[], bytes]) -> bytes:
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            pending = self._pending.setdefault(key, threading.Lock())
+        with pending:
+            with self._lock:
+                cached = self._lookup(key)
+                if cached is not None:
+                    return cached
+                self.misses += 1
+            compressed = compress(load(), encoding, best=True)
+            with self._lock:
+                self._pending.pop(key, None)
+                if len(compressed) <= self.budget_bytes:
+                    self._entries[key] = compressed
+                    self._bytes += len(compressed)
+                    while self._bytes > self.budget_bytes:
+                        _, evicted = self._entries.popitem(last=False)
+                        self._bytes -= len(evicted)
+        return compressed
+
+    def peek(self, etag: str, encoding: str) -> bytes | None:
+        """The cached body for ``(etag, encoding)``, without compressing on a miss."""
+        with self._lock:
+            return self._lookup((etag, encoding))
+
+    def _lookup(self, key: tuple[str, str]) -> bytes | None:
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return cached
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+class MappedFiles:
+    """Read-only memory maps of recently sent files, for transports without sendfile.
+
+    Only used from the event loop thread.  An evicted map is not closed: it
+    stays alive for as long as slices of it are still queued on a socket.
+    """
+
+    def __init__(self, capacity: int = 128) -> None:
+        self.capacity = capacity
+        self._maps: OrderedDict[Path, tuple[tuple[int, int], memoryview]] = OrderedDict()
+
+    def view(self, path: Path) -> memoryview:
+        stat = path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._maps.get(path)
+        if cached is not None and cached[0] == version:
+            self._maps.move_to_end(path)
+            return cached[1]
+        with path.open("rb") as source:
+            view = memoryview(mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ))
+        self._maps[path] = (version, view)
+        while len(self._maps) > self.capacity:
+            self._maps.popitem(last=False)
+        return view
+
+
+class CardServer:
+    """Answers HTTP/1.1 connections handed over by :func:`asyncio.start_server`."""
+
+    def __init__(self, router: Router, *, compression: CompressionCache | None = None) -> None:
+        self.router = router
+        self.compression = compression or CompressionCache()
+        self._mapped = MappedFiles()
+        self._exports = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+        self._exports_queued = 0  # Only touched on the loop
+
+    def dispatch(self, request: Request) -> Response:
+        """Route ``request``, matching encoded ETags against the bodies they encode.
+
+        Handlers only know identity ETags, so ``If-None-Match`` is translated
+        for them, and a 304 echoes the validator the client actually holds.
+        """
+        held = request.header("if-none-match")
+        if held:
+            candidates = [candidate.strip() for candidate in held.split(",")]
+            translated = ", ".join(identity_etag(candidate) for candidate in candidates)
+            request = replace(request, headers={**request.headers, "if-none-match": translated})
+        response = self.router.dispatch(request)
+        if response.status == 304:
+            response.headers["Vary"] = "Accept-Encoding"
+            etag = response.headers.get("ETag")
+            if held and etag:
+                response.headers["ETag"] = next((c for c in candidates if identity_etag(c) == etag), etag)
+        return response
+
+    def respond(self, request: Request) -> Response:
+        try:
+            return self.encode(request, self.dispatch(request))
+        except Exception:  # noqa: BLE001 - keep serving other clients
+            return _internal_error(request)
+
+    def respond_cached(self, request: Request) -> tuple[Response, bool]:
+        """Dispatch ``request`` and encode the response only from the compression cache.
+
+        Returns the response and whether it is ready to send; if not, it still
+        has to go through :meth:`encode`.
+        """
+        try:
+            response = self.dispatch(request)
+            encoded = self.encode(request, response, cached_only=True)
+        except Exception:  # noqa: BLE001 - keep serving other clients
+            return _internal_error(request), True
+        return (response, False) if encoded is None else (encoded, True)
+
+    def encode_guarded(self, request: Request, response: Response) -> Response:
+        try:
+            return self.encode(request, response)
+        except Exception:  # noqa: BLE001 - keep serving other clients
+            return _internal_error(request)
+
+    def encode(self, request: Request, response: Response, *, cached_only: bool = False) -> Response | None:
+        """Compress ``response`` for ``request`` if both sides allow it.
+
+        With ``cached_only``, returns ``None`` instead of compressing a body
+        that is not in the compression cache yet.
+        """
+        if response.status != 200 or "Content-Encoding" in response.headers:
+            return response
+        if response.headers.get("Content-Type", "").partition(";")[0] not in COMPRESSIBLE:
+            return response
+        if not MIN_COMPRESS_BYTES <= response.content_length <= MAX_COMPRESS_BYTES:
+            return response
+        response.headers["Vary"] = "Accept-Encoding"
+        encoding = accepted_encoding(request.header("accept-encoding"))
+        if encoding is None:
+            return response
+        load = response.file.read_bytes if response.file is not None else lambda: response.body
+        etag = response.headers.get("ETag")
+        if etag and response.headers.get("Cache-Control") != "no-store":
+            body = self.compression.peek(etag, encoding) if cached_only else self.compression.get(etag, encoding, load)
+        else:
+            body = None if cached_only else compress(load(), encoding)
+        if body is None:
+            return None
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.headers["ETag"] = encoded_etag(etag, encoding)
+        response.headers.pop("Accept-Ranges", None)  # Ranges are only served unencoded
+        response.body, response.file, response.file_range = body, None, None
+        return response
+
+    async def respond_export(self, request: Request) -> Response:
+        if self._exports_queued >= EXPORT_QUEUE:
+            return error_response(503, "too many exports are rendering; try again shortly")
+        self._exports_queued += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._exports, self.respond, request)
+        finally:
+            self._exports_queued -= 1
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(_read_head(reader), KEEPALIVE_SECONDS)
+                    if head is None:
+                        break
+                    method, target, version, headers = head
+                    keep_alive = _keep_alive(version, headers)
+                    body = await asyncio.wait_for(_read_body(reader, writer, headers), BODY_SECONDS)
+                except HTTPError as error:
+                    await self._write(writer, error_response(error.status, error.message), keep_alive=False)
+                    break
+                request = Request.from_target(method, target, headers, body)
+                if request.method == "POST" and EXPORT_ROUTE.fullmatch(request.path):
+                    response = await self.respond_export(request)
+                elif request.path.startswith(EXECUTOR_PREFIXES):
+                    response = await loop.run_in_executor(None, self.respond, request)
+                else:
+                    response, ready = self.respond_cached(request)
+                    if not ready:
+                        response = await loop.run_in_executor(None, self.encode_guarded, request, response)
+                await self._write(writer, response, keep_alive=keep_alive, head_only=request.method == "HEAD")
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass  # Idle, truncated or dropped connections are simply closed
+        finally:
+            writer.close()
+
+    async def _write(
+        self, writer: asyncio.StreamWriter, response: Response, *, keep_alive: bool, head_only: bool = False
+    ) -> None:
+        status = response.status
+        lines = [f"HTTP/1.1 {status} {_reason(status)}", f"Date: {_http_date()}"]
+        lines.extend(f"{name}: {value}" for name, value in response.headers.items())
+        has_body = status not in (204, 304)
+        if has_body:
+            lines.append(f"Content-Length: {response.content_length}")
+        if not keep_alive:
+            lines.append("Connection: close")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        if head_only or not has_body:
+            writer.write(head)
+        elif response.file is None:
+            writer.write(head + response.body)
+        else:
+            writer.write(head)
+            await self._send_file(writer, response)
+        await writer.drain()
+
+    async def _send_file(self, writer: asyncio.StreamWriter, response: Response) -> None:
+        start, length = response.file_range or (0, response.content_length)
+        if length == 0:
+            return
+        with response.file.open("rb") as source:
+            try:
+                await asyncio.get_running_loop().sendfile(writer.transport, source, start, length, fallback=False)
+                return
+            except asyncio.SendfileNotAvailableError:
+                pass
+        view = self._mapped.view(response.file)
+        for offset in range(start, start + length, MMAP_CHUNK):
+            writer.write(view[offset:min(offset + MMAP_CHUNK, start + length)])
+            await writer.drain()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple[str, str, str, dict[str, str]] | None:
+    """Request line and headers, or ``None`` once the client has closed."""
+    try:
+        line = await reader.readline()
+        while line in (b"\r\n", b"\n"):  # Tolerate stray blank lines between requests
+            line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            raise HTTPError(400, "malformed request line")
+        headers: dict[str, str] = {}
+        for _ in range(MAX_HEADERS + 1):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return parts[0], parts[1], parts[2], headers
+            name, sep, value = line.decode("latin-1").partition(":")
+            if not sep:
+                raise HTTPError(400, "malformed header line")
+            name = name.strip().lower()
+            headers[name] = f"{headers[name]}, {value.strip()}" if name in headers else value.strip()
+    except ValueError:  # Line longer than the stream limit
+        raise HTTPError(431, "request line or header too long") from None
+    raise HTTPError(431, f"more than {MAX_HEADERS} headers")
+
+
+async def _read_body(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict[str, str]) -> bytes:
+    if "transfer-encoding" in headers:
+        raise HTTPError(411, "request bodies need a Content-Length")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length") from None
+    if length < 0:
+        raise HTTPError(400, "invalid Content-Length")
+    if length > MAX_REQUEST_BODY:
+        raise HTTPError(413, f"request bodies are limited to {MAX_REQUEST_BODY} bytes")
+    if length == 0:
+        return b""
+    if headers.get("expect", "").lower() == "100-continue":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+    return await reader.readexactly(length)
+
+
+def _keep_alive(version: str, headers: dict[str, str]) -> bool:
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return "keep-alive" in connection
+    return "close" not in connection
+
+
+def _internal_error(request: Request) -> Response:
+    print(f"unhandled error for {request.path}", file=sys.stderr)
+    traceback.print_exc()
+    return error_response(500, "internal server error")
+
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+_date_cache: tuple[int, str] = (0, "")
+
+
+def _http_date() -> str:
+    # Formatting a date for every response shows up in profiles; it only
+    # changes once a second.
+    global _date_cache
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache = (now, formatdate(now, usegmt=True))
+    return _date_cache[1]
+
+
+def precompress(static: StaticFiles, compression: CompressionCache) -> int:
+    """Hash and compress the viewer's own files ahead of the first request.
+
+    Returns how many files were compressed.
+    """
+    count = 0
+    for path in static.files():
+        etag = static.etag(path)
+        if mimetypes.guess_type(path.name)[0] not in COMPRESSIBLE:
+            continue
+        if not MIN_COMPRESS_BYTES <= path.stat().st_size <= MAX_COMPRESS_BYTES:
+            continue
+        for encoding in ENCODINGS:
+            compression.get(etag, encoding, path.read_bytes)
+        count += 1
+    return count
+
+
+async def start_server(
+    host: str, port: int, router: Router, *, compression: CompressionCache | None = None
+) -> asyncio.AbstractServer:
+    server = CardServer(router, compression=compression)
+    return await asyncio.start_server(server.handle, host, port, backlog=4096)
+
+
+def serve(
+    host: str,
+    port: int,
+    store: AssetStore,
+    catalog: Catalog | None = None,
+    collections: CollectionStore | None = None,
+) -> None:
+    static = StaticFiles()
+    router = build_router(store, static, catalog, collections)
+    compression = CompressionCache()
+    warmed = precompress(static, compression)
+
+    async def run() -> None:
+        server = await start_server(host, port, router, compression=compression)
+        bound = server.sockets[0].getsockname()[1]
+        print(f"Serving card viewer on http://{host}:{bound}/ ({warmed} files precompressed)")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,264 @@
+"""On-disk store of baked card textures.
+
+Layout under the store root::
+
+    sets/<slug>/manifest.json      set metadata, tier file names and previews per card
+    sets/<slug>/atlas.json         optional atlas pages and per-card UV rects
+    sets/<slug>/packs.json         optional rarity table for pack rips
+    sets/<slug>/exports.json       rendered turntables, sheets and thumbnails by export key
+    sets/<slug>/tiers/<hash>.<ext> content-addressed tier images
+    sets/<slug>/tiers/<hash>.cpak  one bundle of every image per tier
+
+Tier files are named by the hash of their bytes, so they never change once
+written and can be served with immutable cache headers; identical images
+(e.g. a back shared by a whole set) are stored and downloaded once.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from cardserver.bundle import write_bundle
+from cardserver.tiers import (
+    TIERS,
+    EncodedTier,
+    encode_image_preview,
+    encode_image_tiers,
+    encode_placeholder_tiers,
+    placeholder_preview,
+)
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / "data"
+
+FACES = ("front", "back")
+
+_SLUG_RE = re.compile(r"^[a-z0-9]+(?:-[a-z0-9]+)*$")
+_ASSET_RE = re.compile(r"^[0-9a-f]{20}\.(?:jpg|png|webp|ktx2|cpak)$")
+_SOURCE_RE = re.compile(r"^(?:(?P<number>\d+)[-_ ])?(?P<face>front|back)$", re.IGNORECASE)
+_SOURCE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp"}
+
+
+def slugify(name: str) -> str:
+    """Turn a folder name such as ``"1989 Score Football"`` into a set slug."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def find_scans(source_dir: Path) -> tuple[dict[int, dict[str, Path]], Path | None]:
+    """Return ``({number: {face: path}}, shared back)`` for a directory of scans.
+
+    Scans are named ``<number>-front.<ext>`` / ``<number>-back.<ext>``; a
+    lone ``back.<ext>`` is used for every card without its own back.
+    """
+    scans: dict[int, dict[str, Path]] = {}
+    shared_back: Path | None = None
+    for path in sorted(Path(source_dir).iterdir()):
+        if path.suffix.lower() not in _SOURCE_SUFFIXES:
+            continue
+        match = _SOURCE_RE.match(path.stem)
+        if not match:
+            continue
+        face = match["face"].lower()
+        if match["number"] is None:
+            if face == "back":
+                shared_back = path
+            continue
+        scans.setdefault(int(match["number"]), {})[face] = path
+    if not scans:
+        raise ValueError(f"no card scans found in {source_dir}")
+    return scans, shared_back
+
+
+class AssetStore:
+    """Reads and writes baked sets below ``root``."""
+
+    def __init__(self, root: Path | str = DEFAULT_ROOT) -> None:
+        self.root = Path(root)
+        self._json_cache: dict[Path, tuple[int, dict, bytes]] = {}
+        self._lock = threading.Lock()
+        self._exports_lock = threading.Lock()
+
+    # -- paths ---------------------------------------------------------------
+
+    def set_dir(self, slug: str) -> Path:
+        if not _SLUG_RE.match(slug):
+            raise ValueError(f"invalid set slug: {slug!r}")
+        return self.root / "sets" / slug
+
+    def tier_dir(self, slug: str) -> Path:
+        return self.set_dir(slug) / "tiers"
+
+    def manifest_path(self, slug: str) -> Path:
+        return self.set_dir(slug) / "manifest.json"
+
+    def atlas_path(self, slug: str) -> Path:
+        return self.set_dir(slug) / "atlas.json"
+
+    def packs_path(self, slug: str) -> Path:
+        return self.set_dir(slug) / "packs.json"
+
+    def exports_path(self, slug: str) -> Path:
+        return self.set_dir(slug) / "exports.json"
+
+    def asset_path(self, slug: str, filename: str) -> Path | None:
+        """Return the path of a tier file, or ``None`` if it does not exist."""
+        if not _ASSET_RE.match(filename):
+            return None
+        path = self.tier_dir(slug) / filename
+        return path if path.is_file() else None
+
+    def sets(self) -> list[str]:
+        base = self.root / "sets"
+        if not base.is_dir():
+            return []
+        return sorted(p.name for p in base.iterdir() if (p / "manifest.json").is_file())
+
+    # -- manifests -------------------------------------------------------------
+
+    def manifest(self, slug: str) -> tuple[dict, bytes] | None:
+        """Return ``(manifest, raw_json_bytes)`` for a set, cached by mtime."""
+        return self._cached_json(self.manifest_path(slug))
+
+    def atlas(self, slug: str) -> tuple[dict, bytes] | None:
+        """Return ``(atlas, raw_json_bytes)`` if the set has baked atlases."""
+        return self._cached_json(self.atlas_path(slug))
+
+    def pack_config(self, slug: str) -> tuple[dict, bytes] | None:
+        """Return ``(config, raw_json_bytes)`` if the set has a rarity table."""
+        return self._cached_json(self.packs_path(slug))
+
+    def exports(self, slug: str) -> dict:
+        """Return the set's export index, ``{export key: entry}``."""
+        loaded = self._cached_json(self.exports_path(slug))
+        return loaded[0] if loaded else {}
+
+    def _cached_json(self, path: Path) -> tuple[dict, bytes] | None:
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._json_cache.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1], cached[2]
+        raw = path.read_bytes()
+        data = json.loads(raw)
+        with self._lock:
+            self._json_cache[path] = (mtime, data, raw)
+        return data, raw
+
+    def write_manifest(self, slug: str, manifest: dict) -> None:
+        self._write_json(self.manifest_path(slug), manifest)
+
+    def write_atlas(self, slug: str, atlas: dict) -> None:
+        self._write_json(self.atlas_path(slug), atlas)
+
+    def add_exports(self, slug: str, entries: dict) -> None:
+        """Merge ``entries`` into the export index, keeping what others added."""
+        with self._exports_lock:
+            self._write_json(self.exports_path(slug), {**self.exports(slug), **entries})
+
+    def _write_json(self, path: Path, data: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(data, separators=(",", ":"), sort_keys=True))
+        os.replace(tmp, path)
+
+    # -- baking --------------------------------------------------------------
+
+    def bake_set(self, slug: str, name: str, source_dir: Path) -> dict:
+        """Bake every scan in ``source_dir`` (see :func:`find_scans`) into
+        tiers and write the manifest.  Scans are resized as they are; ``python
+        -m cardserver ingest`` also crops and normalizes them.
+        """
+        scans, shared_back = find_scans(source_dir)
+        shared = self._bake_face(slug, shared_back) if shared_back else None
+        cards = {}
+        for number, faces in sorted(scans.items()):
+            entry = {}
+            for face in FACES:
+                if face in faces:
+                    entry[face] = self._bake_face(slug, faces[face])
+                elif face == "back" and shared:
+                    entry[face] = shared
+            cards[str(number)] = entry
+        return self.write_set(slug, name, cards)
+
+    def generate_placeholders(self, slug: str, name: str, count: int) -> dict:
+        """Write flat-coloured placeholder tiers for cards ``1..count``."""
+        back = self._placeholder_face(slug, 0, "back")
+        cards = {
+            str(number): {
+                "front": self._placeholder_face(slug, number, "front"),
+                "back": back,
+            }
+            for number in range(1, count + 1)
+        }
+        return self.write_set(slug, name, cards)
+
+    def write_asset(self, slug: str, filename: str, data: bytes) -> Path:
+        """Store a content-addressed file next to the set's tiers."""
+        directory = self.tier_dir(slug)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / filename
+        if not path.exists():
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return path
+
+    def bundle_set(self, slug: str) -> dict:
+        """Rebuild the per-tier bundles of a baked set and update its manifest."""
+        loaded = self.manifest(slug)
+        if loaded is None:
+            raise ValueError(f"unknown set: {slug}")
+        manifest = dict(loaded[0])
+        manifest["bundles"] = self._write_bundles(slug, manifest["cards"])
+        self.write_manifest(slug, manifest)
+        return manifest
+
+    def _write_bundles(self, slug: str, cards: dict) -> dict:
+        bundles = {}
+        for tier in TIERS:
+            faces = {
+                int(number): {face: entry[face][tier.name] for face in FACES if tier.name in entry.get(face, {})}
+                for number, entry in cards.items()
+            }
+            bundles[tier.name] = write_bundle(self.tier_dir(slug), faces)
+        return bundles
+
+    def _bake_face(self, slug: str, source: Path) -> dict:
+        return {**self.write_tiers(slug, encode_image_tiers(source)), "preview": encode_image_preview(source)}
+
+    def _placeholder_face(self, slug: str, number: int, face: str) -> dict:
+        tiers = self.write_tiers(slug, encode_placeholder_tiers(number, face))
+        return {**tiers, "preview": placeholder_preview(number, face)}
+
+    def write_tiers(self, slug: str, encoded: list[EncodedTier]) -> dict:
+        """Store encoded tiers and return the face's manifest entry for them."""
+        tiers = {}
+        for item in encoded:
+            self.write_asset(slug, item.filename, item.data)
+            tiers[item.tier.name] = {
+                "file": item.filename,
+                "bytes": len(item.data),
+                "width": item.width,
+                "height": item.height,
+            }
+        return tiers
+
+    def write_set(self, slug: str, name: str, cards: dict) -> dict:
+        """Write the manifest and bundles for ``cards`` ({number: {face: entry}})."""
+        manifest = {
+            "set": slug,
+            "name": name,
+            "count": max(int(number) for number in cards),
+            "tiers": [{"name": t.name, "width": t.width, "height": t.height} for t in TIERS],
+            "cards": cards,
+            "bundles": self._write_bundles(slug, cards),
+        }
+        self.write_manifest(slug, manifest)
+        return manifest
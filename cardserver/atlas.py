@@ -0,0 +1,158 @@
+"""Offline bake of a set's card fronts into shared texture atlases.
+
+Instead of one texture per card, the fronts of a whole set are packed into a
+few large pages.  Each page is written as a PNG (the browser generates its
+mipmaps on upload) and, when KTX-Software's ``toktx`` is on ``PATH``, also
+as a Basis-compressed KTX2 file with a full mip chain that the viewer can
+transcode straight into a GPU-compressed format.
+
+The resulting ``atlas.json`` lists the pages and, per card, the page index
+and UV rectangle ``[u, v, width, height]`` in three.js texture space (origin
+bottom-left, i.e. the default ``flipY`` orientation).
+"""
+
+from __future__ import annotations
+
+import io
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from cardserver.assets import AssetStore
+from cardserver.tiers import TIERS_BY_NAME, content_hash, require_pillow
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - exercised only without Pillow
+    Image = None
+
+#: Pixels of edge-extended padding around every cell so mip levels and
+#: bilinear filtering never sample a neighbouring card.
+GUTTER = 8
+
+
+def bake_atlases(
+    store: AssetStore,
+    slug: str,
+    *,
+    tier: str = "mid",
+    page_size: int = 4096,  # must be a power of two
+    face: str = "front",
+    ktx2: bool = True,
+) -> dict:
+    """Pack every card's ``face`` at ``tier`` into atlas pages for ``slug``."""
+    require_pillow()
+    loaded = store.manifest(slug)
+    if loaded is None:
+        raise ValueError(f"unknown set: {slug}")
+    manifest, _ = loaded
+    if page_size & (page_size - 1):
+        raise ValueError(f"page size must be a power of two, got {page_size}")
+    spec = TIERS_BY_NAME[tier]
+    cell_w, cell_h = spec.width + 2 * GUTTER, spec.height + 2 * GUTTER
+    columns, rows = page_size // cell_w, page_size // cell_h
+    if not columns or not rows:
+        raise ValueError(f"page size {page_size} is too small for {tier} tiers")
+    per_page = columns * rows
+
+    numbers = sorted(int(n) for n, entry in manifest["cards"].items() if tier in entry.get(face, {}))
+    if not numbers:
+        raise ValueError(f"set {slug} has no {face} images at tier {tier}")
+    toktx = shutil.which("toktx") if ktx2 else None
+
+    pages, cards = [], {}
+    for first in range(0, len(numbers), per_page):
+        chunk = numbers[first:first + per_page]
+        # Power-of-two pages keep mipmapping and block compression legal on
+        # WebGL1; a short last page only grows to the next power of two.
+        used_height = -(-len(chunk) // columns) * cell_h
+        page = Image.new("RGB", (page_size, _next_pow2(used_height)), (255, 255, 255))
+        page_index = len(pages)
+        for slot, number in enumerate(chunk):
+            entry = manifest["cards"][str(number)][face][tier]
+            with Image.open(store.tier_dir(slug) / entry["file"]) as image:
+                cell = _with_gutter(image.convert("RGB").resize((spec.width, spec.height), Image.LANCZOS))
+            x, y = (slot % columns) * cell_w, (slot // columns) * cell_h
+            page.paste(cell, (x, y))
+            cards[str(number)] = {
+                "page": page_index,
+                "uv": _uv_rect(x + GUTTER, y + GUTTER, spec.width, spec.height, page.width, page.height),
+            }
+        pages.append(_write_page(store, slug, page, toktx))
+
+    atlas = {
+        "set": slug,
+        "face": face,
+        "tier": tier,
+        "gutter": GUTTER,
+        "pages": pages,
+        "cards": cards,
+    }
+    store.write_atlas(slug, atlas)
+    return atlas
+
+
+def _next_pow2(value: int) -> int:
+    return 1 << (value - 1).bit_length()
+
+
+def _with_gutter(image: "Image.Image") -> "Image.Image":
+    """Return ``image`` surrounded by GUTTER pixels of replicated edge."""
+    w, h = image.size
+    out = Image.new("RGB", (w + 2 * GUTTER, h + 2 * GUTTER))
+    out.paste(image, (GUTTER, GUTTER))
+    out.paste(image.crop((0, 0, w, 1)).resize((w, GUTTER)), (GUTTER, 0))
+    out.paste(image.crop((0, h - 1, w, h)).resize((w, GUTTER)), (GUTTER, h + GUTTER))
+    left = out.crop((GUTTER, 0, GUTTER + 1, h + 2 * GUTTER)).resize((GUTTER, h + 2 * GUTTER))
+    right = out.crop((w + GUTTER - 1, 0, w + GUTTER, h + 2 * GUTTER)).resize((GUTTER, h + 2 * GUTTER))
+    out.paste(left, (0, 0))
+    out.paste(right, (w + GUTTER, 0))
+    return out
+
+
+def _uv_rect(x: int, y: int, w: int, h: int, page_w: int, page_h: int) -> list[float]:
+    # Image rows run top-down while three.js UVs run bottom-up.
+    return [
+        round(x / page_w, 6),
+        round(1 - (y + h) / page_h, 6),
+        round(w / page_w, 6),
+        round(h / page_h, 6),
+    ]
+
+
+def _write_page(store: AssetStore, slug: str, page: "Image.Image", toktx: str | None) -> dict:
+    buffer = io.BytesIO()
+    page.save(buffer, "PNG", optimize=True)
+    png = buffer.getvalue()
+    png_name = f"{content_hash(png)}.png"
+    store.write_asset(slug, png_name, png)
+    entry = {"file": png_name, "width": page.width, "height": page.height}
+    if toktx:
+        ktx2 = _encode_ktx2(toktx, png)
+        if ktx2 is not None:
+            entry["ktx2"] = f"{content_hash(ktx2)}.ktx2"
+            store.write_asset(slug, entry["ktx2"], ktx2)
+    return entry
+
+
+def _encode_ktx2(toktx: str, png: bytes) -> bytes | None:
+    """Basis-compress ``png`` into KTX2 with mipmaps; ``None`` if toktx fails.
+
+    The transfer function is tagged linear so the viewer samples the page
+    exactly like the PNG fallback, which three.js also treats as linear.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = Path(tmp, "page.png"), Path(tmp, "page.ktx2")
+        source.write_bytes(png)
+        result = subprocess.run(
+            [
+                toktx, "--t2", "--encode", "etc1s", "--genmipmap",
+                "--lower_left_maps_to_s0t0", "--assign_oetf", "linear",
+                str(target), str(source),
+            ],
+            capture_output=True,
+        )
+        if result.returncode != 0 or not target.exists():
+            return None
+        return target.read_bytes()
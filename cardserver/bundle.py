@@ -0,0 +1,147 @@
+"""Set bundles: every card face of one tier in a single file.
+
+Fetching a set face by face costs one request per image (660 for a 330
+card set).  A bundle packs a tier's encoded images back to back behind a
+small binary index, so the viewer can fetch a small tier in one request and
+slice it in memory, or read just the index of a large tier and pull single
+images out of it with HTTP range requests.
+
+All integers are little-endian::
+
+    header (24 bytes)
+      0   4  magic b"CPAK"
+      4   2  format version (1)
+      6   2  reserved
+      8   4  card count C
+      12  4  image count I
+      16  4  data offset D: header and index occupy bytes [0, D)
+      20  4  reserved
+    cards (C x 12 bytes, ascending card number)
+      u32 number, u32 front image, u32 back image (NO_IMAGE if missing)
+    images (I x 24 bytes)
+      10 bytes content hash, u8 type (see IMAGE_TYPES), u8 reserved,
+      u16 width, u16 height, u32 offset from D, u32 length
+    data, starting at D (aligned to 8 bytes)
+
+Each image is stored once however many cards use it, and its hash is the
+tier file's content hash, so ``<hash>.<ext>`` names the same bytes under
+``/assets``.  Bundles are themselves content-addressed ``<hash>.cpak``
+files in the set's tier directory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+
+MAGIC = b"CPAK"
+VERSION = 1
+NO_IMAGE = 0xFFFFFFFF
+IMAGE_TYPES = ("jpg", "png", "webp")
+SUFFIX = ".cpak"
+
+_HEADER = struct.Struct("<4sHHIIII")
+_CARD = struct.Struct("<III")
+_IMAGE = struct.Struct("<10sBBHHII")
+_ALIGN = 8
+
+
+@dataclass(frozen=True)
+class BundleImage:
+    hash: str  # 20 hex digits, as in tier file names
+    type: str
+    width: int
+    height: int
+    offset: int  # Absolute position in the bundle
+    length: int
+
+    @property
+    def filename(self) -> str:
+        return f"{self.hash}.{self.type}"
+
+
+@dataclass(frozen=True)
+class BundleIndex:
+    cards: dict[int, tuple[int | None, int | None]]  # number -> (front, back) image indices
+    images: list[BundleImage]
+    data_offset: int
+
+
+def write_bundle(tier_dir: Path, cards: dict[int, dict[str, dict]]) -> dict:
+    """Pack the tier files named in ``cards`` into ``tier_dir/<hash>.cpak``.
+
+    ``cards`` maps card numbers to ``{"front": entry, "back": entry}`` with
+    manifest tier entries (``file``, ``width``, ``height``).  Returns the
+    manifest record for the bundle.
+    """
+    images: dict[str, int] = {}
+    entries: list[dict] = []
+    card_rows = []
+    for number in sorted(cards):
+        row = [number]
+        for face in ("front", "back"):
+            entry = cards[number].get(face)
+            if entry is None:
+                row.append(NO_IMAGE)
+                continue
+            if entry["file"] not in images:
+                images[entry["file"]] = len(entries)
+                entries.append(entry)
+            row.append(images[entry["file"]])
+        card_rows.append(row)
+
+    index_end = _HEADER.size + len(card_rows) * _CARD.size + len(entries) * _IMAGE.size
+    data_offset = -(-index_end // _ALIGN) * _ALIGN
+    records, offset = [], 0
+    for entry in entries:
+        stem, ext = entry["file"].split(".", 1)
+        if ext not in IMAGE_TYPES:
+            raise ValueError(f"cannot bundle {entry['file']}: only {', '.join(IMAGE_TYPES)} images")
+        length = (tier_dir / entry["file"]).stat().st_size
+        records.append(
+            _IMAGE.pack(bytes.fromhex(stem), IMAGE_TYPES.index(ext), 0, entry["width"], entry["height"], offset, length)
+        )
+        offset += length
+    if offset > 0xFFFFFFFF:
+        raise ValueError("bundle data exceeds 4 GiB")
+
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(card_rows), len(entries), data_offset, 0)
+    index = header + b"".join(_CARD.pack(*row) for row in card_rows) + b"".join(records)
+    index += b"\0" * (data_offset - len(index))
+
+    # Streamed through a temporary file; the name depends on every byte.
+    digest = hashlib.sha256(index)
+    tmp = tier_dir / f"bundle-{os.getpid()}{SUFFIX}.tmp"
+    with tmp.open("wb") as out:
+        out.write(index)
+        for entry in entries:
+            data = (tier_dir / entry["file"]).read_bytes()
+            digest.update(data)
+            out.write(data)
+    filename = digest.hexdigest()[:20] + SUFFIX
+    os.replace(tmp, tier_dir / filename)
+    return {"file": filename, "bytes": data_offset + offset, "indexBytes": data_offset}
+
+
+def read_index(data: bytes) -> BundleIndex:
+    """Parse the header and index at the start of a bundle."""
+    if len(data) < _HEADER.size:
+        raise ValueError("truncated bundle header")
+    magic, version, _, card_count, image_count, data_offset, _ = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a version 1 card bundle")
+    if len(data) < data_offset:
+        raise ValueError("truncated bundle index")
+    images = []
+    position = _HEADER.size + card_count * _CARD.size
+    for _ in range(image_count):
+        digest, kind, _, width, height, offset, length = _IMAGE.unpack_from(data, position)
+        images.append(BundleImage(digest.hex(), IMAGE_TYPES[kind], width, height, data_offset + offset, length))
+        position += _IMAGE.size
+    cards = {}
+    for number, front, back in _CARD.iter_unpack(data[_HEADER.size:_HEADER.size + card_count * _CARD.size]):
+        cards[number] = (None if front == NO_IMAGE else front, None if back == NO_IMAGE else back)
+    return BundleIndex(cards, images, data_offset)
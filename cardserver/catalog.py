@@ -0,0 +1,232 @@
+"""SQLite catalog of sets and the cards in them.
+
+The asset store knows which images a set has; the catalog knows what the
+cards are (number, player, team) and answers the viewer's lookups and
+searches.  Every query the API exposes is served straight from an index and
+paginated by keyset (``cursor``) rather than ``OFFSET``, so the cost of a page
+does not grow with the size of the catalog or how deep the client has paged.
+
+Schema::
+
+    sets(id, slug, name, year, count)
+    cards(set_id, number, year, player, team)   primary key (set_id, number)
+
+``cards.year`` duplicates the set's year so year searches need no join.
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+
+CATALOG_FILENAME = "catalog.sqlite3"
+MAX_PAGE = 500
+
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sets (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    year INTEGER,
+    count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sets_by_year ON sets (year, slug);
+
+CREATE TABLE IF NOT EXISTS cards (
+    set_id INTEGER NOT NULL REFERENCES sets (id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    year INTEGER,
+    player TEXT COLLATE NOCASE,
+    team TEXT COLLATE NOCASE,
+    PRIMARY KEY (set_id, number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cards_by_year ON cards (year, set_id, number);
+CREATE INDEX IF NOT EXISTS cards_by_player ON cards (player, set_id, number);
+CREATE INDEX IF NOT EXISTS cards_by_team ON cards (team, set_id, number);
+"""
+
+
+def year_from_name(name: str) -> int | None:
+    """Pick the year out of a set name such as ``"1989 Score Football"``."""
+    match = _YEAR_RE.search(name)
+    return int(match.group()) if match else None
+
+
+def _page_size(limit: int | None, default: int) -> int:
+    return max(1, min(MAX_PAGE, limit or default))
+
+
+class Catalog:
+    """Card metadata in a SQLite database at ``path``.
+
+    Safe to share between threads: each thread gets its own connection.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute("PRAGMA journal_mode = WAL")
+            db.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA foreign_keys = ON")
+            self._local.db = db
+        return db
+
+    # -- writing ---------------------------------------------------------------
+
+    def register_set(self, slug: str, name: str, year: int | None = None) -> int:
+        """Create or rename a set and return its id."""
+        year = year if year is not None else year_from_name(name)
+        with self._connection() as db:
+            db.execute(
+                "INSERT INTO sets (slug, name, year) VALUES (?, ?, ?)"
+                " ON CONFLICT (slug) DO UPDATE SET name = excluded.name, year = excluded.year",
+                (slug, name, year),
+            )
+            db.execute("UPDATE cards SET year = ? WHERE set_id = (SELECT id FROM sets WHERE slug = ?)", (year, slug))
+            return db.execute("SELECT id FROM sets WHERE slug = ?", (slug,)).fetchone()["id"]
+
+    def add_cards(
+        self, slug: str, cards: Iterable[tuple[int, str | None, str | None]], *, replace: bool = True
+    ) -> int:
+        """Insert ``(number, player, team)`` rows into a registered set.
+
+        With ``replace=False`` existing rows are kept, which lets a bake
+        register card numbers without wiping imported player data.
+        Returns the set's new card count.
+        """
+        db = self._connection()
+        row = db.execute("SELECT id, year FROM sets WHERE slug = ?", (slug,)).fetchone()
+        if row is None:
+            raise ValueError(f"unknown set: {slug}")
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with db:
+            db.executemany(
+                f"{verb} INTO cards (set_id, number, year, player, team) VALUES (?, ?, ?, ?, ?)",
+                ((row["id"], int(number), row["year"], player or None, team or None) for number, player, team in cards),
+            )
+            count = db.execute("SELECT COUNT(*) FROM cards WHERE set_id = ?", (row["id"],)).fetchone()[0]
+            db.execute("UPDATE sets SET count = ? WHERE id = ?", (count, row["id"]))
+        return count
+
+    def import_csv(self, slug: str, name: str, source: Path, year: int | None = None) -> int:
+        """Load a checklist CSV with ``number,player,team`` columns."""
+        self.register_set(slug, name, year)
+        with source.open(newline="", encoding="utf-8") as handle:
+            rows = [(row["number"], row.get("player"), row.get("team")) for row in csv.DictReader(handle)]
+        return self.add_cards(slug, rows)
+
+    def sync_store(self, store) -> list[str]:
+        """Register every baked set in an :class:`~cardserver.assets.AssetStore`."""
+        synced = []
+        for slug in store.sets():
+            manifest, _ = store.manifest(slug)
+            self.register_set(slug, manifest["name"])
+            self.add_cards(slug, ((int(n), None, None) for n in manifest["cards"]), replace=False)
+            synced.append(slug)
+        return synced
+
+    # -- queries ---------------------------------------------------------------
+
+    def get_set(self, slug: str) -> dict | None:
+        row = self._connection().execute("SELECT slug, name, year, count FROM sets WHERE slug = ?", (slug,)).fetchone()
+        return _set_payload(row) if row else None
+
+    def sets(self, *, year: int | None = None, limit: int | None = None, cursor: str | None = None) -> dict:
+        """One page of sets ordered by slug."""
+        size = _page_size(limit, 100)
+        clauses, params = [], []
+        if year is not None:
+            clauses.append("year = ?")
+            params.append(year)
+        if cursor:
+            clauses.append("slug > ?")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = (
+            self._connection()
+            .execute(f"SELECT slug, name, year, count FROM sets {where} ORDER BY slug LIMIT ?", (*params, size + 1))
+            .fetchall()
+        )
+        page = [_set_payload(row) for row in rows[:size]]
+        return {"sets": page, "next": page[-1]["set"] if len(rows) > size else None}
+
+    def cards(
+        self,
+        *,
+        set_slug: str | None = None,
+        year: int | None = None,
+        player: str | None = None,
+        team: str | None = None,
+        number: int | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> dict:
+        """One page of cards ordered by set and number.
+
+        ``player`` and ``team`` match whole names, case-insensitively.
+        ``cursor`` is the ``next`` value of the previous page.  Cards carry
+        their set slug only when the query is not scoped to one set.
+        """
+        size = _page_size(limit, 100)
+        db = self._connection()
+        clauses, params = [], []
+        if set_slug is not None:
+            row = db.execute("SELECT id FROM sets WHERE slug = ?", (set_slug,)).fetchone()
+            if row is None:
+                return {"cards": [], "next": None}
+            clauses.append("c.set_id = ?")
+            params.append(row["id"])
+        for column, value in (("year", year), ("player", player), ("team", team), ("number", number)):
+            if value is not None:
+                clauses.append(f"c.{column} = ?")
+                params.append(value)
+        if cursor:
+            clauses.append("(c.set_id, c.number) > (?, ?)")
+            params.extend(_parse_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = db.execute(
+            "SELECT c.set_id, s.slug, c.number, c.player, c.team FROM cards c JOIN sets s ON s.id = c.set_id"
+            f" {where} ORDER BY c.set_id, c.number LIMIT ?",
+            (*params, size + 1),
+        ).fetchall()
+
+        page = []
+        for row in rows[:size]:
+            card = {"number": row["number"], "player": row["player"], "team": row["team"]}
+            if set_slug is None:
+                card["set"] = row["slug"]
+            page.append(card)
+        last = rows[size - 1] if len(rows) > size else None
+        return {"cards": page, "next": f"{last['set_id']}.{last['number']}" if last else None}
+
+    def close(self) -> None:
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+def _set_payload(row: sqlite3.Row) -> dict:
+    return {"set": row["slug"], "name": row["name"], "year": row["year"], "count": row["count"]}
+
+
+def _parse_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        set_id, number = cursor.split(".")
+        return int(set_id), int(number)
+    except ValueError:
+        raise ValueError(f"invalid cursor: {cursor!r}") from None
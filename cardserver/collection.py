@@ -0,0 +1,287 @@
+"""SQLite store for users' card collections, synced by deltas.
+
+The viewer keeps every card it shows in memory; this store is what survives
+a reload.  It is written to incrementally: the client sends only the cards
+it added, re-skinned, moved or removed since its last save, and every such
+batch bumps the collection's revision.  Collections are read back a page at
+a time in display order, so a collection of tens of thousands of cards
+starts showing after the first page, and a second tab can catch up by
+asking for the changes since the revision it last saw.
+
+Schema::
+
+    collections(id, name, revision)
+    collection_cards(collection_id, card_id, position, set_slug, number,
+                     name, front, back, transform, revision, deleted)
+        primary key (collection_id, card_id)
+
+``card_id`` is chosen by the client, so a card can be saved before the
+server has seen it.  ``front``/``back`` are texture references (an uploaded
+image's content hash, for example); cards from a baked set are identified
+by ``set_slug`` and ``number`` instead.  ``transform`` is the card's pose as
+a JSON array of numbers.  Removed cards are kept as tombstones
+(``deleted = 1``) so that change feeds can report them.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+import threading
+from pathlib import Path
+
+COLLECTION_FILENAME = "collections.sqlite3"
+MAX_PAGE = 1000
+MAX_CHANGES = 5000
+MAX_TRANSFORM = 16
+#: SQLite integers are signed 64-bit; anything wider fails inside the driver.
+MIN_INT64, MAX_INT64 = -(2**63), 2**63 - 1
+
+#: Card fields a change may set; absent fields keep their stored value.
+FIELDS = ("position", "set", "number", "name", "front", "back", "transform")
+_COLUMNS = {"set": "set_slug"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS collection_cards (
+    collection_id INTEGER NOT NULL REFERENCES collections (id) ON DELETE CASCADE,
+    card_id TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    set_slug TEXT,
+    number INTEGER,
+    name TEXT,
+    front TEXT,
+    back TEXT,
+    transform TEXT,
+    revision INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (collection_id, card_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS collection_cards_by_position
+    ON collection_cards (collection_id, deleted, position, card_id);
+CREATE INDEX IF NOT EXISTS collection_cards_by_revision
+    ON collection_cards (collection_id, revision, card_id);
+"""
+
+
+def _page_size(limit: int | None, default: int, maximum: int) -> int:
+    return max(1, min(maximum, limit or default))
+
+
+class CollectionStore:
+    """Collections in a SQLite database at ``path``.
+
+    Safe to share between threads: each thread gets its own connection, and
+    SQLite serializes the writes.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute("PRAGMA journal_mode = WAL")
+            db.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA foreign_keys = ON")
+            # Deltas are small and frequent; a WAL commit need not wait for fsync.
+            db.execute("PRAGMA synchronous = NORMAL")
+            self._local.db = db
+        return db
+
+    # -- writing ---------------------------------------------------------------
+
+    def apply(self, name: str, upserts: list[dict] = (), deletes: list[str] = ()) -> dict:
+        """Save one batch of changes to collection ``name`` as a new revision.
+
+        Each upsert is ``{"id": ..., <any of FIELDS>}``; new cards are created
+        and existing ones only have the given fields replaced.  ``deletes``
+        lists card ids to remove.  Returns the new revision and how many cards
+        were written.  Raises :class:`ValueError` for malformed changes,
+        before anything is written.
+        """
+        rows = [_validate(change) for change in upserts]
+        deletes = [_card_id(card_id) for card_id in deletes]
+        if len(rows) + len(deletes) > MAX_CHANGES:
+            raise ValueError(f"at most {MAX_CHANGES} changes per batch")
+        db = self._connection()
+        with db:
+            db.execute("INSERT INTO collections (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (name,))
+            db.execute("UPDATE collections SET revision = revision + 1 WHERE name = ?", (name,))
+            collection_id, revision = db.execute(
+                "SELECT id, revision FROM collections WHERE name = ?", (name,)
+            ).fetchone()
+            # One statement per combination of fields, so an update touches
+            # exactly the columns the client sent.
+            groups: dict[tuple[str, ...], list[tuple]] = {}
+            for card_id, values in rows:
+                keys = tuple(sorted(values))
+                groups.setdefault(keys, []).append((collection_id, card_id, revision, *(values[k] for k in keys)))
+            for keys, params in groups.items():
+                columns = [_COLUMNS.get(key, key) for key in keys]
+                updates = "".join(f", {column} = excluded.{column}" for column in columns)
+                db.executemany(
+                    "INSERT INTO collection_cards (collection_id, card_id, revision"
+                    + "".join(f", {column}" for column in columns)
+                    + ") VALUES (?, ?, ?" + ", ?" * len(columns) + ")"
+                    " ON CONFLICT (collection_id, card_id) DO UPDATE SET revision = excluded.revision,"
+                    f" deleted = 0{updates}",
+                    params,
+                )
+            db.executemany(
+                "UPDATE collection_cards SET deleted = 1, revision = ? WHERE collection_id = ? AND card_id = ?",
+                ((revision, collection_id, card_id) for card_id in deletes),
+            )
+        return {"collection": name, "revision": revision, "saved": len(rows), "deleted": len(deletes)}
+
+    # -- queries ---------------------------------------------------------------
+
+    def revision(self, name: str) -> int:
+        row = self._connection().execute("SELECT revision FROM collections WHERE name = ?", (name,)).fetchone()
+        return row["revision"] if row else 0
+
+    def cards(self, name: str, *, limit: int | None = None, cursor: str | None = None) -> dict:
+        """One page of the collection's cards in display order.
+
+        The first page also carries the total card count.  ``revision`` is the
+        revision the page was read at; pass it to :meth:`changes` afterwards
+        to pick up anything saved while the remaining pages were loading.
+        """
+        size = _page_size(limit, 200, MAX_PAGE)
+        db = self._connection()
+        collection = db.execute("SELECT id, revision FROM collections WHERE name = ?", (name,)).fetchone()
+        if collection is None:
+            return {"collection": name, "revision": 0, "count": 0, "cards": [], "next": None}
+        params: list = [collection["id"]]
+        after = ""
+        if cursor:
+            after = " AND (position, card_id) > (?, ?)"
+            params.extend(_parse_cursor(cursor))
+        rows = db.execute(
+            "SELECT * FROM collection_cards WHERE collection_id = ? AND deleted = 0"
+            f"{after} ORDER BY position, card_id LIMIT ?",
+            (*params, size + 1),
+        ).fetchall()
+        page = {"collection": name, "revision": collection["revision"]}
+        if not cursor:
+            page["count"] = db.execute(
+                "SELECT COUNT(*) FROM collection_cards WHERE collection_id = ? AND deleted = 0", (collection["id"],)
+            ).fetchone()[0]
+        last = rows[size - 1] if len(rows) > size else None
+        page["cards"] = [_card_payload(row) for row in rows[:size]]
+        page["next"] = f"{last['position']}.{last['card_id']}" if last else None
+        return page
+
+    def changes(self, name: str, since: int, *, limit: int | None = None, cursor: str | None = None) -> dict:
+        """Cards saved or removed after revision ``since``, oldest first.
+
+        Removed cards appear as ``{"id": ..., "deleted": true}``.
+        """
+        size = _page_size(limit, 500, MAX_PAGE)
+        since = _int64(since, "since")
+        db = self._connection()
+        collection = db.execute("SELECT id, revision FROM collections WHERE name = ?", (name,)).fetchone()
+        if collection is None:
+            return {"collection": name, "revision": 0, "cards": [], "next": None}
+        params: list = [collection["id"], since]
+        after = ""
+        if cursor:
+            after = " AND (revision, card_id) > (?, ?)"
+            params.extend(_parse_cursor(cursor))
+        rows = db.execute(
+            "SELECT * FROM collection_cards WHERE collection_id = ? AND revision > ?"
+            f"{after} ORDER BY revision, card_id LIMIT ?",
+            (*params, size + 1),
+        ).fetchall()
+        last = rows[size - 1] if len(rows) > size else None
+        return {
+            "collection": name,
+            "revision": collection["revision"],
+            "cards": [{"id": row["card_id"], "deleted": True} if row["deleted"] else _card_payload(row)
+                      for row in rows[:size]],
+            "next": f"{last['revision']}.{last['card_id']}" if last else None,
+        }
+
+    def close(self) -> None:
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+def _card_id(value) -> str:
+    if not isinstance(value, str) or not 0 < len(value) <= 64:
+        raise ValueError("card ids must be strings of 1 to 64 characters")
+    return value
+
+
+def _int64(value: int, what: str) -> int:
+    if not MIN_INT64 <= value <= MAX_INT64:
+        raise ValueError(f"{what} must fit in a signed 64-bit integer")
+    return value
+
+
+def _transform_number(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return MIN_INT64 <= value <= MAX_INT64
+    return isinstance(value, float) and math.isfinite(value)
+
+
+def _validate(change) -> tuple[str, dict]:
+    if not isinstance(change, dict):
+        raise ValueError("each change must be an object")
+    card_id = _card_id(change.get("id"))
+    values = {}
+    for key in FIELDS:
+        if key not in change:
+            continue
+        value = change[key]
+        if key in ("position", "number"):
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                raise ValueError(f"{key} must be an integer")
+            if key == "position" and value is None:
+                raise ValueError("position must be an integer")
+            if value is not None:
+                _int64(value, key)
+        elif key == "transform":
+            if value is not None:
+                if not isinstance(value, list) or len(value) > MAX_TRANSFORM or not all(map(_transform_number, value)):
+                    raise ValueError(f"transform must be a list of at most {MAX_TRANSFORM} finite 64-bit numbers")
+                value = json.dumps(value, separators=(",", ":"))
+        elif value is not None and not isinstance(value, str):
+            raise ValueError(f"{key} must be a string")
+        values[key] = value
+    return card_id, values
+
+
+def _card_payload(row: sqlite3.Row) -> dict:
+    card = {"id": row["card_id"], "position": row["position"]}
+    for key, column in (("set", "set_slug"), ("number", "number"), ("name", "name"), ("front", "front"),
+                        ("back", "back")):
+        if row[column] is not None:
+            card[key] = row[column]
+    if row["transform"] is not None:
+        card["transform"] = json.loads(row["transform"])
+    return card
+
+
+def _parse_cursor(cursor: str) -> tuple[int, str]:
+    """Split a ``<position or revision>.<card id>`` keyset cursor."""
+    key, _, card_id = cursor.partition(".")
+    try:
+        return _int64(int(key), "cursor"), card_id
+    except ValueError:
+        raise ValueError(f"invalid cursor: {cursor!r}") from None
@@ -0,0 +1,396 @@
+"""Headless export of card turntables, flips, sprite sheets and thumbnails.
+
+Cards are drawn the way the viewer draws them -- a 2.5 x 3.5 box with white
+edges and unlit faces, seen in perspective from the viewer's camera distance
+-- but on the CPU with Pillow, so exports run on machines with neither a GPU
+nor a browser.  Each face is sampled from the smallest texture tier at least
+as tall as the card in the frame.  Frames are rendered at twice the output
+size and box-filtered down, which smooths the edges.
+
+Kinds:
+
+``turntable``
+    A full turn at the speed of the viewer's Rotate button, as an animated WebP.
+``flip``
+    A flip to the back and another one back to the front, with the viewer's
+    easing and timing and a pause on each face, as an animated WebP.
+``sheet``
+    The turntable frames on one PNG sprite sheet, left to right and top to
+    bottom.
+``thumb``
+    The card at rest, as a WebP.
+
+Outputs are content-addressed files next to the set's tiers and are served
+like them.  The set's export index maps an export key to its output.  The key
+is a hash of the kind, its options and the tier files it reads, so exporting
+an unchanged card again is a lookup.  :func:`export_cards` renders whatever
+is missing on a pool of worker processes; :func:`find_export` only looks up.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cardserver.assets import FACES, AssetStore
+from cardserver.tiers import TIERS, content_hash, require_pillow
+
+try:
+    from PIL import Image, ImageColor, ImageDraw
+except ImportError:  # pragma: no cover - exercised only without Pillow
+    Image = None
+
+#: Bump when rendering changes, so cached exports are not reused.
+EXPORT_VERSION = 1
+
+KINDS = ("turntable", "flip", "sheet", "thumb")
+#: Frame height in pixels when no size is given.
+DEFAULT_SIZES = {"turntable": 512, "flip": 512, "sheet": 256, "thumb": 256}
+DEFAULT_FRAMES = 60
+DEFAULT_FPS = 30
+MAX_SIZE = 2048
+MAX_FRAMES = 360
+
+# The card and camera of the viewer (index.html, js/card-pool.js)
+CARD_WIDTH = 2.5
+CARD_HEIGHT = 3.5
+CARD_THICKNESS = 0.01
+CAMERA_DISTANCE = 5.0
+SPIN_RADIANS_PER_SECOND = 0.02 * 60
+FLIP_MS = 600
+FLIP_HOLD_MS = 700
+
+SUPERSAMPLE = 2
+MARGIN = 1.04  # Room around the card's outline
+WEBP_QUALITY = 85
+EDGE_COLOR = (255, 255, 255)
+BATCH = 32  # Results recorded in the export index at a time
+
+# Box faces as (corners top-left, top-right, bottom-right, bottom-left as seen
+# from outside, outward normal, texture). Like three.js BoxGeometry, the back
+# is mapped so its image reads the right way round from behind.
+_W, _H, _T = CARD_WIDTH / 2, CARD_HEIGHT / 2, CARD_THICKNESS / 2
+_BOX = (
+    (((-_W, _H, _T), (_W, _H, _T), (_W, -_H, _T), (-_W, -_H, _T)), (0, 0, 1), "front"),
+    (((_W, _H, -_T), (-_W, _H, -_T), (-_W, -_H, -_T), (_W, -_H, -_T)), (0, 0, -1), "back"),
+    (((_W, _H, _T), (_W, _H, -_T), (_W, -_H, -_T), (_W, -_H, _T)), (1, 0, 0), None),
+    (((-_W, _H, -_T), (-_W, _H, _T), (-_W, -_H, _T), (-_W, -_H, -_T)), (-1, 0, 0), None),
+    (((-_W, _H, -_T), (_W, _H, -_T), (_W, _H, _T), (-_W, _H, _T)), (0, 1, 0), None),
+    (((-_W, -_H, _T), (_W, -_H, _T), (_W, -_H, -_T), (-_W, -_H, -_T)), (0, -1, 0), None),
+)
+
+
+@dataclass(frozen=True)
+class ExportJob:
+    """One output to render; everything a worker process needs."""
+
+    key: str
+    kind: str
+    number: str
+    faces: tuple[Path | None, Path | None]  # Front and back tier files
+    size: int
+    frames: int
+    fps: int
+    background: tuple[int, int, int] | None
+
+
+@dataclass
+class ExportReport:
+    slug: str
+    rendered: int = 0
+    cached: int = 0
+    #: ``{card number: {kind: index entry}}``
+    cards: dict[str, dict[str, dict]] = field(default_factory=dict)
+
+
+def export_cards(
+    store: AssetStore,
+    slug: str,
+    numbers: list[int] | None = None,
+    kinds: tuple[str, ...] = KINDS,
+    *,
+    size: int | None = None,
+    frames: int = DEFAULT_FRAMES,
+    fps: int = DEFAULT_FPS,
+    background: str | None = None,
+    workers: int | None = None,
+) -> ExportReport:
+    """Export ``kinds`` for cards ``numbers`` of set ``slug`` (every card by default).
+
+    ``size`` is the frame height in pixels (see :data:`DEFAULT_SIZES`),
+    ``frames`` the number of turntable and sprite sheet frames, ``fps`` the
+    frame rate of flips and ``background`` a colour behind the card
+    (transparent by default).  Raises :class:`ValueError` for unknown cards,
+    kinds or out-of-range options.
+    """
+    cards, keys, color = _validate(store, slug, numbers, kinds, size, frames, fps, background)
+    report = ExportReport(slug)
+    index = store.exports(slug)
+    jobs = []
+    for number in keys:
+        for kind in kinds:
+            job = _plan(store, slug, number, cards[number], kind, size or DEFAULT_SIZES[kind], frames, fps, color)
+            entry = index.get(job.key)
+            if entry and store.asset_path(slug, entry["file"]):
+                report.cards.setdefault(number, {})[kind] = entry
+                report.cached += 1
+            else:
+                jobs.append(job)
+
+    added: dict[str, dict] = {}
+
+    def record(job: ExportJob, result: tuple[bytes, str, dict]) -> None:
+        data, ext, meta = result
+        name = f"{content_hash(data)}.{ext}"
+        store.write_asset(slug, name, data)
+        entry = {"card": int(job.number), "kind": job.kind, "file": name, "bytes": len(data), **meta}
+        added[job.key] = entry
+        report.cards.setdefault(job.number, {})[job.kind] = entry
+        report.rendered += 1
+        if len(added) >= BATCH:
+            store.add_exports(slug, added)
+            added.clear()
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            record(job, render_export(job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for job, result in zip(jobs, pool.map(render_export, jobs)):
+                record(job, result)
+    if added:
+        store.add_exports(slug, added)
+    return report
+
+
+def find_export(
+    store: AssetStore,
+    slug: str,
+    number: int,
+    kind: str,
+    *,
+    size: int | None = None,
+    frames: int = DEFAULT_FRAMES,
+    fps: int = DEFAULT_FPS,
+    background: str | None = None,
+) -> dict | None:
+    """Index entry of an export rendered earlier with these options, else ``None``.
+
+    Takes the options of :func:`export_cards` and raises the same errors.
+    """
+    cards, (key,), color = _validate(store, slug, [number], (kind,), size, frames, fps, background)
+    job = _plan(store, slug, key, cards[key], kind, size or DEFAULT_SIZES[kind], frames, fps, color)
+    entry = store.exports(slug).get(job.key)
+    return entry if entry and store.asset_path(slug, entry["file"]) else None
+
+
+def _validate(
+    store: AssetStore,
+    slug: str,
+    numbers: list[int] | None,
+    kinds: tuple[str, ...],
+    size: int | None,
+    frames: int,
+    fps: int,
+    background: str | None,
+) -> tuple[dict, list[str], tuple[int, int, int] | None]:
+    """The set's cards, the requested card keys and the background colour."""
+    require_pillow()
+    loaded = store.manifest(slug)
+    if loaded is None:
+        raise ValueError(f"no baked set {slug}")
+    cards = loaded[0]["cards"]
+    unknown_kinds = [kind for kind in kinds if kind not in KINDS]
+    if unknown_kinds:
+        raise ValueError(f"unknown export kind {unknown_kinds[0]!r}; choose from {', '.join(KINDS)}")
+    if size is not None and not 16 <= size <= MAX_SIZE:
+        raise ValueError(f"size must be between 16 and {MAX_SIZE}")
+    if not 2 <= frames <= MAX_FRAMES:
+        raise ValueError(f"frames must be between 2 and {MAX_FRAMES}")
+    if not 1 <= fps <= 120:
+        raise ValueError("fps must be between 1 and 120")
+    color = ImageColor.getrgb(background)[:3] if background else None
+    keys = sorted(cards, key=int) if numbers is None else [str(number) for number in numbers]
+    missing = [number for number in keys if number not in cards]
+    if missing:
+        raise ValueError(f"set {slug} has no card {missing[0]}")
+    return cards, keys, color
+
+
+def _plan(
+    store: AssetStore,
+    slug: str,
+    number: str,
+    card: dict,
+    kind: str,
+    size: int,
+    frames: int,
+    fps: int,
+    background: tuple[int, int, int] | None,
+) -> ExportJob:
+    # Tall enough for the card at rest in the supersampled frame
+    scale, _, _ = _frame(_angles(kind, frames, fps)[0], size)
+    needed = scale * CARD_HEIGHT / (CAMERA_DISTANCE - _T)
+    files = tuple(_pick_tier(card.get(face), needed) for face in FACES)
+    key = content_hash(json.dumps({
+        "version": EXPORT_VERSION,
+        "kind": kind,
+        "size": size,
+        "frames": frames if kind in ("turntable", "sheet") else None,
+        "fps": fps if kind == "flip" else None,
+        "background": background,
+        "faces": files,
+    }).encode())
+    faces = tuple(store.asset_path(slug, name) if name else None for name in files)
+    return ExportJob(key, kind, number, faces, size, frames, fps, background)
+
+
+def _pick_tier(entry: dict | None, height: float) -> str | None:
+    """File of the smallest tier at least ``height`` tall, else of the largest."""
+    if not entry:
+        return None
+    available = [entry[tier.name] for tier in TIERS if tier.name in entry]
+    for tier in available:
+        if tier["height"] >= height:
+            return tier["file"]
+    return available[-1]["file"] if available else None
+
+
+def _angles(kind: str, frames: int, fps: int) -> tuple[list[float], list[int]]:
+    """Rotation about the vertical axis and display time in ms of every frame."""
+    if kind == "thumb":
+        return [0.0], [0]
+    if kind == "flip":
+        steps = max(2, round(FLIP_MS * fps / 1000))
+        half = [math.pi * _in_out_cubic(i / steps) for i in range(1, steps)]
+        angles = [0.0, *half, math.pi, *(math.pi + a for a in half)]
+        durations = [FLIP_HOLD_MS, *[FLIP_MS // steps] * len(half), FLIP_HOLD_MS, *[FLIP_MS // steps] * len(half)]
+        return angles, durations
+    step = 2 * math.pi / frames
+    return [i * step for i in range(frames)], [round(step / SPIN_RADIANS_PER_SECOND * 1000)] * frames
+
+
+def _in_out_cubic(t: float) -> float:
+    return 4 * t * t * t if t < 0.5 else 1 - 4 * (1 - t) ** 3  # Easing.inOutCubic in js/tweens.js
+
+
+def _frame(angles: list[float], size: int) -> tuple[float, int, int]:
+    """``(pixels per unit of x/depth, width, height)`` of a supersampled frame
+    that holds the card at every one of ``angles``."""
+    span_x = span_y = 0.0
+    for angle in angles:
+        for corners, _, _ in _BOX:
+            for x, y in (_project(corner, angle) for corner in corners):
+                span_x, span_y = max(span_x, abs(x)), max(span_y, abs(y))
+    height = size * SUPERSAMPLE
+    scale = height / (2 * span_y * MARGIN)
+    width = 2 * math.ceil(span_x * MARGIN * scale)  # Even, so it halves exactly
+    return scale, width, height
+
+
+def _rotate(point: tuple[float, float, float], angle: float) -> tuple[float, float, float]:
+    x, y, z = point
+    cos, sin = math.cos(angle), math.sin(angle)
+    return x * cos + z * sin, y, z * cos - x * sin
+
+
+def _project(point: tuple[float, float, float], angle: float) -> tuple[float, float]:
+    x, y, z = _rotate(point, angle)
+    depth = CAMERA_DISTANCE - z
+    return x / depth, y / depth
+
+
+def render_export(job: ExportJob) -> tuple[bytes, str, dict]:
+    """Render one export; returns ``(file bytes, extension, index metadata)``."""
+    textures = {}
+    for face, path in zip(FACES, job.faces):
+        if path is None:
+            textures[face] = Image.new("RGB", (1, 1), (255, 255, 255))  # The viewer's blank face
+        else:
+            with Image.open(path) as image:
+                textures[face] = image.convert("RGB")
+    angles, durations = _angles(job.kind, job.frames, job.fps)
+    scale, width, height = _frame(angles, job.size)
+    frames = [_render_frame(textures, angle, scale, width, height, job.background) for angle in angles]
+    meta = {"width": frames[0].width, "height": frames[0].height}
+    buffer = io.BytesIO()
+    if job.kind == "thumb":
+        frames[0].save(buffer, "WEBP", quality=WEBP_QUALITY)
+        return buffer.getvalue(), "webp", meta
+    if job.kind == "sheet":
+        columns = math.ceil(math.sqrt(len(frames)))
+        rows = math.ceil(len(frames) / columns)
+        sheet = Image.new(frames[0].mode, (columns * meta["width"], rows * meta["height"]))
+        for i, frame in enumerate(frames):
+            sheet.paste(frame, ((i % columns) * meta["width"], (i // columns) * meta["height"]))
+        sheet.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue(), "png", {**meta, "frames": len(frames), "columns": columns, "rows": rows,
+                                          "frameMs": durations[0]}
+    frames[0].save(
+        buffer, "WEBP", save_all=True, append_images=frames[1:], duration=durations, loop=0, quality=WEBP_QUALITY
+    )
+    return buffer.getvalue(), "webp", {**meta, "frames": len(frames), "durationMs": sum(durations)}
+
+
+def _render_frame(
+    textures: dict, angle: float, scale: float, width: int, height: int, background: tuple[int, int, int] | None
+) -> "Image.Image":
+    mode = "RGB" if background else "RGBA"
+    canvas = Image.new(mode, (width, height), background or (0, 0, 0, 0))
+    camera = (0.0, 0.0, CAMERA_DISTANCE)
+    # The box is convex, so its camera-facing faces never overlap on screen
+    for corners, normal, texture in _BOX:
+        center = _rotate(tuple(sum(axis) / 4 for axis in zip(*corners)), angle)
+        facing = _rotate(normal, angle)
+        if sum(n * (c - p) for n, c, p in zip(facing, camera, center)) <= 0:
+            continue
+        quad = [
+            (width / 2 + x * scale, height / 2 - y * scale)
+            for x, y in (_project(corner, angle) for corner in corners)
+        ]
+        left, top = (max(0, math.floor(min(axis))) for axis in zip(*quad))
+        right, bottom = math.ceil(max(x for x, _ in quad)), math.ceil(max(y for _, y in quad))
+        right, bottom = min(width, right), min(height, bottom)
+        if right - left < 1 or bottom - top < 1:
+            continue
+        mask = Image.new("L", (right - left, bottom - top), 0)
+        local = [(x - left, y - top) for x, y in quad]
+        ImageDraw.Draw(mask).polygon(local, fill=255)
+        if texture is None:
+            canvas.paste(EDGE_COLOR if background else (*EDGE_COLOR, 255), (left, top, right, bottom), mask)
+            continue
+        image = textures[texture]
+        source = [(0, 0), (image.width, 0), (image.width, image.height), (0, image.height)]
+        try:
+            coefficients = _perspective(local, source)
+        except ZeroDivisionError:  # Seen edge-on
+            continue
+        warped = image.transform(mask.size, Image.PERSPECTIVE, coefficients, Image.BILINEAR)
+        canvas.paste(warped, (left, top), mask)
+    return canvas.reduce(SUPERSAMPLE)
+
+
+def _perspective(target: list[tuple[float, float]], source: list[tuple[float, float]]) -> list[float]:
+    """Coefficients of Pillow's PERSPECTIVE transform taking ``target`` points
+    to ``source`` points (output pixel -> input pixel)."""
+    rows = []
+    for (x, y), (u, v) in zip(target, source):
+        rows.append([x, y, 1, 0, 0, 0, -u * x, -u * y, u])
+        rows.append([0, 0, 0, x, y, 1, -v * x, -v * y, v])
+    # Gaussian elimination with partial pivoting on the 8 x 9 augmented matrix
+    for col in range(8):
+        pivot = max(range(col, 8), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            raise ZeroDivisionError("degenerate quad")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(8):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][8] / rows[i][i] for i in range(8)]
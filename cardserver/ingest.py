@@ -0,0 +1,208 @@
+"""Batch ingest of raw card scans and phone photos.
+
+``bake`` resizes scans exactly as they are.  Ingest is for rougher input:
+every image is processed on a pool of worker processes, which
+
+* applies the EXIF orientation and decodes large JPEGs at a reduced scale,
+* crops to the card by finding where the image stops matching the colour
+  of its border (scanner lid, table top),
+* turns landscape faces upright and centre-crops to the 2.5 x 3.5 card
+  shape the viewer's card geometry uses, so tiers are never stretched,
+* encodes every texture tier and the inline preview, and
+* computes a perceptual (difference) hash.
+
+Back in the parent process, faces whose hashes are within ``max_distance``
+bits of an earlier face of the same side are treated as the same image and
+share its files; they are listed in the report so mislabelled scans are
+easy to spot.  A scan that cannot be read or encoded is listed in the report
+too and skipped: a card without its front is left out of the set, one
+without its back keeps just the front.  The set is then written to the
+asset store (manifest, tiers, bundles) and registered in the catalog.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cardserver.assets import FACES, AssetStore, find_scans
+from cardserver.catalog import Catalog
+from cardserver.tiers import TIERS, EncodedTier, encode_preview, encode_tiers, require_pillow
+
+try:
+    from PIL import Image, ImageChops, ImageFilter, ImageOps
+except ImportError:  # pragma: no cover - exercised only without Pillow
+    Image = None
+
+#: Card shape, width over height (2.5 x 3.5 inches).
+CARD_ASPECT = 2.5 / 3.5
+
+#: Side of the difference hash grid; the hash has HASH_SIZE ** 2 bits.
+HASH_SIZE = 16
+DEFAULT_MAX_DISTANCE = 6
+
+_DETECT_SIZE = 256  # Long side of the image used to find the card bounds
+_BACKGROUND_THRESHOLD = 40  # Grey-level difference that counts as card
+_MIN_CARD_FRACTION = 0.2  # Smaller detections are treated as failures
+
+
+@dataclass
+class ProcessedScan:
+    path: Path
+    tiers: list[EncodedTier]
+    preview: str
+    phash: int
+    cropped: bool
+
+
+@dataclass
+class IngestReport:
+    slug: str
+    cards: int = 0
+    processed: int = 0
+    cropped: int = 0
+    #: ``(scan, earlier scan it duplicates, hash distance)``
+    duplicates: list[tuple[Path, Path, int]] = field(default_factory=list)
+    #: ``(scan, why it could not be processed)``
+    failed: list[tuple[Path, str]] = field(default_factory=list)
+
+
+def ingest_set(
+    store: AssetStore,
+    slug: str,
+    name: str,
+    source_dir: Path,
+    *,
+    catalog: Catalog | None = None,
+    workers: int | None = None,
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+) -> IngestReport:
+    """Process every scan in ``source_dir`` and write the set ``slug``.
+
+    A negative ``max_distance`` turns deduplication off.
+    """
+    require_pillow()
+    scans, shared_back = find_scans(source_dir)
+    paths = sorted({path for faces in scans.values() for path in faces.values()} | {shared_back} - {None})
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = dict(zip(paths, pool.map(_try_process_scan, paths, chunksize=4)))
+
+    processed = {path: result for path, result in results.items() if isinstance(result, ProcessedScan)}
+    report = IngestReport(slug, processed=len(processed), cropped=sum(p.cropped for p in processed.values()))
+    report.failed = [(path, result) for path, result in results.items() if isinstance(result, str)]
+    entries: dict[Path, dict] = {}
+    seen: dict[str, list[tuple[int, Path]]] = {face: [] for face in FACES}
+
+    def entry_for(path: Path, face: str) -> dict:
+        if path in entries:
+            return entries[path]
+        scan = processed[path]
+        if max_distance >= 0:
+            for phash, earlier in seen[face]:
+                distance = bin(phash ^ scan.phash).count("1")
+                if distance <= max_distance:
+                    report.duplicates.append((path, earlier, distance))
+                    entries[path] = entries[earlier]
+                    return entries[path]
+        seen[face].append((scan.phash, path))
+        entries[path] = {**store.write_tiers(slug, scan.tiers), "preview": scan.preview}
+        return entries[path]
+
+    cards = {}
+    for number, faces in sorted(scans.items()):
+        entry = {}
+        for face in FACES:
+            path = faces.get(face) or (shared_back if face == "back" else None)
+            if path is not None and path in processed:
+                entry[face] = entry_for(path, face)
+        if "front" in entry:
+            cards[str(number)] = entry
+    store.write_set(slug, name, cards)
+    report.cards = len(cards)
+
+    if catalog is not None:
+        catalog.register_set(slug, name)
+        catalog.add_cards(slug, ((int(number), None, None) for number in cards), replace=False)
+    return report
+
+
+def _try_process_scan(path: Path) -> ProcessedScan | str:
+    """:func:`process_scan`, or why it failed; one bad file must not stop the batch."""
+    try:
+        return process_scan(path)
+    except Exception as error:  # noqa: BLE001 - truncated files, unknown formats, decompression bombs
+        return f"{type(error).__name__}: {error}"
+
+
+def process_scan(path: Path) -> ProcessedScan:
+    """Crop, normalize and encode one scan (runs in a worker process)."""
+    full = TIERS[-1]
+    with Image.open(path) as image:
+        # JPEG scans decode at 1/2, 1/4 or 1/8 scale when that still covers
+        # twice the largest tier, which is most of the cost of a 1200 dpi scan.
+        image.draft("RGB", (full.width * 2, full.height * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    bounds = find_card_bounds(image)
+    if bounds is not None:
+        image = image.crop(bounds)
+    if image.width > image.height:
+        image = image.transpose(Image.ROTATE_90)
+    image = normalize_aspect(image)
+    return ProcessedScan(path, encode_tiers(image), encode_preview(image), perceptual_hash(image), bounds is not None)
+
+
+def find_card_bounds(image: "Image.Image") -> tuple[int, int, int, int] | None:
+    """Bounding box of the card in ``image``, or ``None`` to keep it whole.
+
+    The background colour is the median of the outermost pixels; anything
+    clearly different from it (after a median filter removes dust and
+    noise) belongs to the card.
+    """
+    scale = _DETECT_SIZE / max(image.size)
+    small = image.convert("L").resize(
+        (max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BILINEAR
+    )
+    w, h = small.size
+    pixels = small.load()
+    border = sorted(
+        [pixels[x, y] for x in range(w) for y in (0, h - 1)] + [pixels[x, y] for y in range(h) for x in (0, w - 1)]
+    )
+    background = border[len(border) // 2]
+    mask = ImageChops.difference(small, Image.new("L", small.size, background))
+    mask = mask.point(lambda v: 255 if v > _BACKGROUND_THRESHOLD else 0).filter(ImageFilter.MedianFilter(5))
+    box = mask.getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+    if (right - left) * (bottom - top) < _MIN_CARD_FRACTION * w * h or box == (0, 0, w, h):
+        return None
+    return (
+        int(left / scale),
+        int(top / scale),
+        min(image.width, round(right / scale)),
+        min(image.height, round(bottom / scale)),
+    )
+
+
+def normalize_aspect(image: "Image.Image") -> "Image.Image":
+    """Centre-crop a portrait ``image`` to exactly :data:`CARD_ASPECT`."""
+    width = min(image.width, round(image.height * CARD_ASPECT))
+    height = min(image.height, round(width / CARD_ASPECT))
+    if (width, height) == image.size:
+        return image
+    left, top = (image.width - width) // 2, (image.height - height) // 2
+    return image.crop((left, top, left + width, top + height))
+
+
+def perceptual_hash(image: "Image.Image") -> int:
+    """Difference hash: one bit per neighbouring pixel pair of a small grey copy."""
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
@@ -0,0 +1,201 @@
+"""Pack generation: rarity tables, seeded draws and bulk boxes/cases.
+
+A set's pack layout lives in ``sets/<slug>/packs.json`` next to its
+manifest::
+
+    {
+      "rarities": {
+        "base": {"cards": "1-300"},
+        "short-print": {"cards": [301, "305-310"]}
+      },
+      "slots": [
+        {"count": 9, "rarities": {"base": 1}},
+        {"count": 1, "rarities": {"base": 9, "short-print": 1}}
+      ],
+      "packs_per_box": 36,
+      "boxes_per_case": 20
+    }
+
+Each slot draws ``count`` cards, choosing a rarity by weight per card.
+Within a rarity every card is equally likely and never repeats inside a
+pack, so a short print is a rarity with a small weight or a small pool.
+Sets without ``packs.json`` get one slot of :data:`DEFAULT_PACK_SIZE`
+uniform cards.  Cards are drawn with a partial Fisher-Yates shuffle over
+each rarity pool, so a pack costs O(pack size) however large the set, and
+all randomness comes from one seeded :class:`random.Random` so a break can
+be replayed exactly.
+"""
+
+from __future__ import annotations
+
+import random
+import secrets
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Iterable
+
+DEFAULT_PACK_SIZE = 10
+DEFAULT_PACKS_PER_BOX = 36
+DEFAULT_BOXES_PER_CASE = 20
+
+
+def new_seed() -> int:
+    return secrets.randbits(53)  # Survives a round trip through JavaScript numbers
+
+
+def parse_numbers(spec) -> list[int]:
+    """Expand ``"1-300"``, ``[1, "5-9"]`` or ``7`` into card numbers."""
+    if isinstance(spec, (int, str)):
+        spec = [spec]
+    numbers = []
+    for item in spec:
+        if isinstance(item, str) and "-" in item:
+            first, last = (int(part) for part in item.split("-", 1))
+            numbers.extend(range(first, last + 1))
+        else:
+            numbers.append(int(item))
+    return numbers
+
+
+@dataclass(frozen=True)
+class Slot:
+    count: int
+    rarities: tuple[int, ...]  # Indices into PackTable.rarities
+    cumulative: tuple[float, ...]  # Running totals of the rarity weights
+
+
+class PackTable:
+    """Everything needed to rip packs from one set."""
+
+    def __init__(
+        self,
+        pools: dict[str, list[int]],
+        slots: list[tuple[int, dict[str, float]]],
+        *,
+        packs_per_box: int = DEFAULT_PACKS_PER_BOX,
+        boxes_per_case: int = DEFAULT_BOXES_PER_CASE,
+    ) -> None:
+        self.rarities = tuple(pools)
+        self._pools = [list(pools[name]) for name in self.rarities]
+        # All pools back to back, so one pack's shuffle state is a single dict.
+        self._cards = [number for pool in self._pools for number in pool]
+        self._starts = list(accumulate((len(pool) for pool in self._pools), initial=0))[:-1]
+        seen: set[int] = set()
+        for name, pool in zip(self.rarities, self._pools):
+            if not pool:
+                raise ValueError(f"rarity {name!r} has no cards")
+            if seen.intersection(pool):
+                raise ValueError(f"rarity {name!r} repeats cards from another rarity")
+            seen.update(pool)
+
+        self.slots = []
+        for count, weights in slots:
+            unknown = set(weights) - set(pools)
+            if unknown:
+                raise ValueError(f"slot uses unknown rarities: {', '.join(sorted(unknown))}")
+            chosen = [(self.rarities.index(name), float(w)) for name, w in weights.items() if w > 0]
+            if count < 1 or not chosen:
+                raise ValueError("every slot needs a positive count and at least one weighted rarity")
+            indices, values = zip(*chosen)
+            self.slots.append(Slot(int(count), indices, tuple(accumulate(values))))
+        if self.pack_size > len(seen):
+            raise ValueError(f"packs of {self.pack_size} cards need more than the {len(seen)} cards in the set")
+        self.packs_per_box = packs_per_box
+        self.boxes_per_case = boxes_per_case
+
+    @classmethod
+    def uniform(cls, numbers: Iterable[int], pack_size: int = DEFAULT_PACK_SIZE) -> "PackTable":
+        numbers = sorted(numbers)
+        return cls({"base": numbers}, [(min(pack_size, len(numbers)), {"base": 1})])
+
+    @classmethod
+    def from_config(cls, config: dict, numbers: Iterable[int]) -> "PackTable":
+        """Build a table from ``packs.json``, limited to cards in ``numbers``."""
+        available = set(numbers)
+        pools = {
+            name: [n for n in parse_numbers(rarity["cards"]) if n in available]
+            for name, rarity in config["rarities"].items()
+        }
+        slots = [(slot["count"], slot["rarities"]) for slot in config["slots"]]
+        return cls(
+            pools,
+            slots,
+            packs_per_box=config.get("packs_per_box", DEFAULT_PACKS_PER_BOX),
+            boxes_per_case=config.get("boxes_per_case", DEFAULT_BOXES_PER_CASE),
+        )
+
+    @property
+    def pack_size(self) -> int:
+        return sum(slot.count for slot in self.slots)
+
+    def rip(self, rng: random.Random) -> list[tuple[int, int]]:
+        """Draw one pack as ``(card number, rarity index)`` pairs."""
+        cards, starts, pools = self._cards, self._starts, self._pools
+        drawn = [0] * len(pools)
+        # Partial Fisher-Yates without touching the pools: `moved` records the
+        # positions this pack has swapped, everything else is still in place.
+        moved: dict[int, int] = {}
+        get = moved.get
+        rand = rng.random
+        pack = []
+        append = pack.append
+        for slot in self.slots:
+            rarities, cumulative = slot.rarities, slot.cumulative
+            if len(rarities) == 1 and drawn[rarities[0]] + slot.count <= len(pools[rarities[0]]):
+                # Common case, one rarity with room for the whole slot: no
+                # rarity draw and no exhaustion check per card.
+                r = rarities[0]
+                start, end, first = starts[r], starts[r] + len(pools[r]), starts[r] + drawn[r]
+                for i in range(first, first + slot.count):
+                    j = i + int(rand() * (end - i))
+                    append((get(j, cards[j]), r))
+                    moved[j] = get(i, cards[i])
+                drawn[r] += slot.count
+                continue
+            for _ in range(slot.count):
+                r = rarities[bisect_right(cumulative, rand() * cumulative[-1])]
+                d = drawn[r]
+                size = len(pools[r])
+                if d == size:
+                    r = self._fallback(slot, drawn, rand)
+                    d, size = drawn[r], len(pools[r])
+                start = starts[r]
+                j = start + d + int(rand() * (size - d))
+                append((get(j, cards[j]), r))
+                moved[j] = get(start + d, cards[start + d])
+                drawn[r] = d + 1
+        return pack
+
+    def _fallback(self, slot: Slot, drawn: list[int], rand) -> int:
+        # The chosen rarity ran out inside this pack: redraw among the slot's
+        # rarities that still have cards, then among any rarity at all.
+        weights = [b - a for a, b in zip((0.0, *slot.cumulative), slot.cumulative)]
+        open_ = [(r, w) for r, w in zip(slot.rarities, weights) if drawn[r] < len(self._pools[r])]
+        if not open_:
+            open_ = [(r, 1.0) for r in range(len(self._pools)) if drawn[r] < len(self._pools[r])]
+        indices, values = zip(*open_)
+        totals = list(accumulate(values))
+        return indices[bisect_right(totals, rand() * totals[-1])]
+
+    def rip_many(self, count: int, rng: random.Random) -> list[list[tuple[int, int]]]:
+        rip = self.rip
+        return [rip(rng) for _ in range(count)]
+
+    def summarize(self, count: int, rng: random.Random) -> dict:
+        """Rip ``count`` packs and return hit counts instead of the packs."""
+        pulls: Counter[tuple[int, int]] = Counter()
+        update, rip = pulls.update, self.rip
+        for _ in range(count):
+            update(rip(rng))
+        cards: Counter[int] = Counter()
+        rarities: Counter[int] = Counter()
+        for (number, r), hits in pulls.items():
+            cards[number] += hits
+            rarities[r] += hits
+        return {
+            "packs": count,
+            "cards": {str(number): hits for number, hits in sorted(cards.items())},
+            "rarities": {self.rarities[r]: hits for r, hits in sorted(rarities.items())},
+        }
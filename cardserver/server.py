@@ -0,0 +1,514 @@
+"""HTTP server for the viewer, its static files and baked card assets.
+
+This module defines the routes and a simple thread-per-connection server;
+:mod:`cardserver.aioserver` serves the same routes from an event loop and is
+what ``python -m cardserver serve`` runs by default.
+
+Routes:
+
+``GET /api/sets``
+    Sets available in the asset store.
+``GET /api/sets/{slug}/manifest``
+    Tier file names for every card in a set (revalidated via ETag).
+``GET /api/sets/{slug}/atlas``
+    Atlas pages and per-card UV rects, if the set has been baked into atlases.
+``GET /api/sets/{slug}/cards/{number}/{face}?tier=mid``
+    Redirect to the immutable URL of one card face at the requested tier.
+``GET /api/sets/{slug}/cards/{number}/exports/{kind}?size=&frames=&fps=&background=&format=json``
+    Redirect to a turntable, flip, sprite sheet or thumbnail of a card
+    rendered earlier with these options, or its index entry; 404 until then.
+``POST /api/sets/{slug}/cards/{number}/exports/{kind}?size=&frames=&fps=&background=``
+    Render that export unless it exists, and return its index entry.  Sizes
+    and frame counts are capped lower than for ``python -m cardserver
+    export``, and a card renders one kind at a time.
+``GET /api/sets/{slug}/pack?seed=``
+    One pack drawn from the set's rarity table (random seed unless given).
+``GET /api/sets/{slug}/packs?packs=|boxes=|cases=&seed=&format=packs|summary``
+    Many packs at once, or just how often each card and rarity was pulled.
+``GET /api/catalog/sets?year=&limit=&cursor=``
+    A page of catalogued sets.
+``GET /api/catalog/sets/{slug}``
+    Name, year and card count of one set.
+``GET /api/catalog/cards?set=&year=&player=&team=&number=&limit=&cursor=``
+    A page of card metadata matching every given filter.
+``GET /api/collections/{name}?limit=&cursor=``
+    A page of a saved collection's cards in display order.
+``GET /api/collections/{name}/changes?since=&limit=&cursor=``
+    Cards saved or removed after revision ``since``.
+``POST /api/collections/{name}/changes``
+    Save a batch of ``{"upserts": [...], "deletes": [...]}`` as one revision.
+``GET /assets/{slug}/{file}``
+    Content-addressed tier images and bundles served with immutable cache
+    headers; single byte ranges are honoured so bundles can be read in parts.
+``GET /sw.js``
+    The service worker, with the app shell and bundles to precache filled in.
+``GET /vendor/three/{path}``
+    Vendored three.js (``python -m cardserver vendor``); 503 with the command
+    to run until it has been built.
+``GET /{path}``
+    The viewer itself (``index.html``, ``js/``) from the repository root.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+from cardserver.assets import FACES, AssetStore
+from cardserver.catalog import Catalog
+from cardserver.collection import CollectionStore
+from cardserver.export import export_cards, find_export
+from cardserver.packs import PackTable, new_seed
+from cardserver.shell import VENDOR_MISSING, is_vendored, service_worker
+from cardserver.tiers import TIERS_BY_NAME
+from cardserver.web import (
+    IMMUTABLE,
+    REVALIDATE,
+    HTTPError,
+    Request,
+    Response,
+    Router,
+    error_response,
+    file_response,
+    json_response,
+    etag_for,
+    is_not_modified,
+    not_modified,
+    redirect,
+)
+
+STATIC_ROOT = Path(__file__).resolve().parent.parent
+STATIC_SUFFIXES = {".html", ".js", ".mjs", ".css", ".json", ".wasm", ".svg", ".png", ".ico", ".webmanifest"}
+STATIC_EXCLUDE = {"cardserver", "data"}
+MAX_BULK_PACKS = 100_000
+MAX_SUMMARY_PACKS = 2_000_000
+MAX_DELTA_BYTES = 8 * 1024 * 1024
+MAX_EXPORT_SIZE = 512
+MAX_EXPORT_FRAMES = 120
+
+_COLLECTION_NAME_RE = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+
+class StaticFiles:
+    """Serves the viewer's own files with content-hash ETags."""
+
+    def __init__(self, root: Path = STATIC_ROOT) -> None:
+        self.root = root.resolve()
+        self._etags: dict[Path, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, relative: str) -> Path | None:
+        parts = Path(relative).parts
+        if not parts or parts[0] in STATIC_EXCLUDE or any(p.startswith(".") for p in parts):
+            return None
+        path = (self.root / relative).resolve()
+        if self.root not in path.parents or path.suffix not in STATIC_SUFFIXES or not path.is_file():
+            return None
+        return path
+
+    def files(self) -> Iterator[Path]:
+        """Every file :meth:`resolve` would serve."""
+        for directory, subdirs, names in os.walk(self.root):
+            relative = Path(directory).relative_to(self.root)
+            subdirs[:] = [d for d in subdirs if not d.startswith(".") and (relative.parts or d not in STATIC_EXCLUDE)]
+            for name in names:
+                path = self.resolve(str(relative / name))
+                if path is not None:
+                    yield path
+
+    def etag(self, path: Path) -> str:
+        stat = path.stat()
+        with self._lock:
+            cached = self._etags.get(path)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()[:20]
+        etag = f'"{digest}"'
+        with self._lock:
+            self._etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+
+def _int_param(request: Request, name: str) -> int | None:
+    value = request.query.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer") from None
+
+
+def build_router(
+    store: AssetStore,
+    static: StaticFiles | None = None,
+    catalog: Catalog | None = None,
+    collections: CollectionStore | None = None,
+) -> Router:
+    router = Router()
+    static = static or StaticFiles()
+
+    def load_manifest(slug: str) -> tuple[dict, bytes]:
+        try:
+            loaded = store.manifest(slug)
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        if loaded is None:
+            raise HTTPError(404, f"unknown set: {slug}")
+        return loaded
+
+    @router.route("GET", "/api/sets")
+    def list_sets(request: Request) -> Response:
+        sets = []
+        for slug in store.sets():
+            manifest, _ = load_manifest(slug)
+            sets.append({"set": slug, "name": manifest["name"], "count": manifest["count"]})
+        return json_response(request, {"sets": sets})
+
+    @router.route("GET", "/api/sets/{slug}/manifest")
+    def set_manifest(request: Request, slug: str) -> Response:
+        _, raw = load_manifest(slug)
+        return json_response(request, raw)
+
+    @router.route("GET", "/api/sets/{slug}/atlas")
+    def set_atlas(request: Request, slug: str) -> Response:
+        load_manifest(slug)
+        loaded = store.atlas(slug)
+        if loaded is None:
+            raise HTTPError(404, f"set {slug} has no atlas")
+        return json_response(request, loaded[1])
+
+    @router.route("GET", "/api/sets/{slug}/cards/{number}/{face}")
+    def card_face(request: Request, slug: str, number: str, face: str) -> Response:
+        manifest, _ = load_manifest(slug)
+        tier = request.query.get("tier", "mid")
+        if face not in FACES or tier not in TIERS_BY_NAME:
+            raise HTTPError(400, "face must be front/back and tier one of " + ", ".join(TIERS_BY_NAME))
+        entry = manifest["cards"].get(number.lstrip("0") or "0", {}).get(face)
+        if not entry or tier not in entry:
+            raise HTTPError(404, f"no {face} for card {number} in {slug}")
+        return redirect(f"/assets/{slug}/{entry[tier]['file']}")
+
+    def export_options(request: Request, slug: str, number: str) -> tuple[str, dict]:
+        manifest, _ = load_manifest(slug)
+        number = number.lstrip("0") or "0"
+        if number not in manifest["cards"]:
+            raise HTTPError(404, f"no card {number} in {slug}")
+        options = {name: _int_param(request, name) for name in ("size", "frames", "fps")}
+        options = {name: value for name, value in options.items() if value is not None}
+        return number, {**options, "background": request.query.get("background") or None}
+
+    @router.route("GET", "/api/sets/{slug}/cards/{number}/exports/{kind}")
+    def card_export(request: Request, slug: str, number: str, kind: str) -> Response:
+        number, options = export_options(request, slug, number)
+        try:
+            entry = find_export(store, slug, int(number), kind, **options)
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        if entry is None:
+            raise HTTPError(404, f"no {kind} of card {number} in {slug} with these options; POST to render it")
+        url = f"/assets/{slug}/{entry['file']}"
+        if request.query.get("format") == "json":
+            return json_response(request, {**entry, "url": url})
+        return redirect(url)
+
+    rendering: set[tuple[str, str, str]] = set()
+    rendering_lock = threading.Lock()
+
+    @router.route("POST", "/api/sets/{slug}/cards/{number}/exports/{kind}")
+    def render_card_export(request: Request, slug: str, number: str, kind: str) -> Response:
+        number, options = export_options(request, slug, number)
+        if options.get("size", 0) > MAX_EXPORT_SIZE:
+            raise HTTPError(400, f"size is limited to {MAX_EXPORT_SIZE} here; use python -m cardserver export")
+        if options.get("frames", 0) > MAX_EXPORT_FRAMES:
+            raise HTTPError(400, f"frames are limited to {MAX_EXPORT_FRAMES} here; use python -m cardserver export")
+        job = (slug, number, kind)
+        with rendering_lock:
+            if job in rendering:
+                raise HTTPError(409, f"the {kind} of card {number} is already rendering")
+            rendering.add(job)
+        try:
+            report = export_cards(store, slug, [int(number)], (kind,), workers=1, **options)
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        finally:
+            with rendering_lock:
+                rendering.discard(job)
+        entry = report.cards[number][kind]
+        return json_response(request, {**entry, "url": f"/assets/{slug}/{entry['file']}"}, cache_control="no-store")
+
+    tables: dict[str, tuple[bytes, bytes | None, PackTable]] = {}
+
+    def pack_table(slug: str) -> PackTable:
+        manifest, raw = load_manifest(slug)
+        config = store.pack_config(slug)
+        cached = tables.get(slug)
+        # The cached JSON bytes are reused until the file changes, so identity
+        # is enough to tell whether the table is stale.
+        if cached and cached[0] is raw and cached[1] is (config and config[1]):
+            return cached[2]
+        numbers = [int(number) for number in manifest["cards"]]
+        try:
+            table = PackTable.from_config(config[0], numbers) if config else PackTable.uniform(numbers)
+        except (KeyError, TypeError, ValueError) as error:
+            raise HTTPError(500, f"bad packs.json for {slug}: {error}") from None
+        tables[slug] = (raw, config and config[1], table)
+        return table
+
+    def seeded(request: Request) -> tuple[int, random.Random, str]:
+        seed = _int_param(request, "seed")
+        # Unseeded rips are fresh every time; seeded ones can be cached.
+        cache_control = "no-store" if seed is None else REVALIDATE
+        seed = new_seed() if seed is None else seed
+        return seed, random.Random(seed), cache_control
+
+    @router.route("GET", "/api/sets/{slug}/pack")
+    def rip_pack(request: Request, slug: str) -> Response:
+        table = pack_table(slug)
+        seed, rng, cache_control = seeded(request)
+        cards = [{"number": number, "rarity": table.rarities[r]} for number, r in table.rip(rng)]
+        return json_response(request, {"set": slug, "seed": seed, "cards": cards}, cache_control=cache_control)
+
+    @router.route("GET", "/api/sets/{slug}/packs")
+    def rip_bulk(request: Request, slug: str) -> Response:
+        table = pack_table(slug)
+        boxes = _int_param(request, "boxes")
+        cases = _int_param(request, "cases")
+        count = _int_param(request, "packs")
+        if count is None:
+            count = (boxes or 0) * table.packs_per_box + (cases or 0) * table.packs_per_box * table.boxes_per_case
+        summary = request.query.get("format", "packs") == "summary"
+        limit = MAX_SUMMARY_PACKS if summary else MAX_BULK_PACKS
+        if not 1 <= count <= limit:
+            raise HTTPError(400, f"ask for between 1 and {limit} packs (packs=, boxes= or cases=)")
+        seed, rng, cache_control = seeded(request)
+        payload = {"set": slug, "seed": seed}
+        if summary:
+            payload.update(table.summarize(count, rng))
+        else:
+            # Cards are [number, rarity index] pairs to keep big responses small.
+            payload.update(rarities=list(table.rarities), packs=table.rip_many(count, rng))
+        return json_response(request, payload, cache_control=cache_control)
+
+    if catalog is not None:
+        add_catalog_routes(router, catalog)
+    if collections is not None:
+        add_collection_routes(router, collections)
+
+    @router.route("GET", "/assets/{slug}/{filename}")
+    def asset(request: Request, slug: str, filename: str) -> Response:
+        try:
+            path = store.asset_path(slug, filename)
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        if path is None:
+            raise HTTPError(404, "no such asset")
+        return file_response(request, path, etag=f'"{path.stem}"', cache_control=IMMUTABLE)
+
+    @router.route("GET", "/")
+    def index(request: Request) -> Response:
+        return static_file(request, "index.html")
+
+    @router.route("GET", "/sw.js")
+    def worker(request: Request) -> Response:
+        body = service_worker(static.root / "sw.js", static, store)
+        etag = etag_for(body)
+        if is_not_modified(request, etag):
+            return not_modified(etag, REVALIDATE)
+        headers = {"Content-Type": "text/javascript; charset=utf-8", "ETag": etag, "Cache-Control": REVALIDATE}
+        return Response(200, headers, body)
+
+    @router.route("GET", "/vendor/three/{path*}")
+    def vendored(request: Request, path: str) -> Response:
+        resolved = static.resolve(f"vendor/three/{path}")
+        if resolved is not None:
+            return file_response(request, resolved, etag=static.etag(resolved), cache_control=REVALIDATE)
+        if not is_vendored(static.root):
+            raise HTTPError(503, VENDOR_MISSING)
+        raise HTTPError(404, "not found")
+
+    @router.route("GET", "/{path*}")
+    def static_file(request: Request, path: str) -> Response:
+        resolved = static.resolve(path.lstrip("/"))
+        if resolved is None:
+            raise HTTPError(404, "not found")
+        return file_response(request, resolved, etag=static.etag(resolved), cache_control=REVALIDATE)
+
+    return router
+
+
+def add_catalog_routes(router: Router, catalog: Catalog) -> None:
+    @router.route("GET", "/api/catalog/sets")
+    def catalog_sets(request: Request) -> Response:
+        page = catalog.sets(
+            year=_int_param(request, "year"), limit=_int_param(request, "limit"), cursor=request.query.get("cursor")
+        )
+        return json_response(request, page)
+
+    @router.route("GET", "/api/catalog/sets/{slug}")
+    def catalog_set(request: Request, slug: str) -> Response:
+        found = catalog.get_set(slug)
+        if found is None:
+            raise HTTPError(404, f"unknown set: {slug}")
+        return json_response(request, found)
+
+    @router.route("GET", "/api/catalog/cards")
+    def catalog_cards(request: Request) -> Response:
+        query = request.query
+        try:
+            page = catalog.cards(
+                set_slug=query.get("set") or None,
+                year=_int_param(request, "year"),
+                player=query.get("player") or None,
+                team=query.get("team") or None,
+                number=_int_param(request, "number"),
+                limit=_int_param(request, "limit"),
+                cursor=query.get("cursor") or None,
+            )
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        return json_response(request, page)
+
+
+def add_collection_routes(router: Router, collections: CollectionStore) -> None:
+    def collection_name(name: str) -> str:
+        if not _COLLECTION_NAME_RE.fullmatch(name):
+            raise HTTPError(400, "collection names are 1 to 64 letters, digits, '.', '_' or '-'")
+        return name
+
+    @router.route("GET", "/api/collections/{name}")
+    def collection_cards(request: Request, name: str) -> Response:
+        try:
+            page = collections.cards(
+                collection_name(name), limit=_int_param(request, "limit"), cursor=request.query.get("cursor") or None
+            )
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        return json_response(request, page)
+
+    @router.route("GET", "/api/collections/{name}/changes")
+    def collection_changes(request: Request, name: str) -> Response:
+        try:
+            page = collections.changes(
+                collection_name(name),
+                _int_param(request, "since") or 0,
+                limit=_int_param(request, "limit"),
+                cursor=request.query.get("cursor") or None,
+            )
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        return json_response(request, page)
+
+    @router.route("POST", "/api/collections/{name}/changes")
+    def save_changes(request: Request, name: str) -> Response:
+        if len(request.body) > MAX_DELTA_BYTES:
+            raise HTTPError(413, f"deltas are limited to {MAX_DELTA_BYTES} bytes")
+        try:
+            delta = request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(400, "body must be JSON") from None
+        if not isinstance(delta, dict):
+            raise HTTPError(400, 'body must be {"upserts": [...], "deletes": [...]}')
+        upserts, deletes = delta.get("upserts") or [], delta.get("deletes") or []
+        if not isinstance(upserts, list) or not isinstance(deletes, list):
+            raise HTTPError(400, "upserts and deletes must be lists")
+        try:
+            saved = collections.apply(collection_name(name), upserts, deletes)
+        except ValueError as error:
+            raise HTTPError(400, str(error)) from None
+        return json_response(request, saved, cache_control="no-store")
+
+
+class CardRequestHandler(BaseHTTPRequestHandler):
+    """Adapts :mod:`http.server` requests to a :class:`Router`."""
+
+    router: Router
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_HEAD(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def do_PUT(self) -> None:
+        self._handle()
+
+    def do_DELETE(self) -> None:
+        self._handle()
+
+    def _handle(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        request = Request.from_target(self.command, self.path, self.headers, body)
+        try:
+            response = self.router.dispatch(request)
+        except Exception:  # noqa: BLE001 - keep serving other clients
+            self.log_error("unhandled error for %s", self.path)
+            response = error_response(500, "internal server error")
+        self._send(response)
+
+    def _send(self, response: Response) -> None:
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        if response.status != 304:
+            self.send_header("Content-Length", str(response.content_length))
+        self.end_headers()
+        if self.command == "HEAD" or response.status == 304:
+            return
+        if response.file is not None:
+            with response.file.open("rb") as source:
+                if response.file_range is None:
+                    shutil.copyfileobj(source, self.wfile)
+                else:
+                    start, remaining = response.file_range
+                    source.seek(start)
+                    while remaining > 0:
+                        chunk = source.read(min(remaining, 64 * 1024))
+                        if not chunk:
+                            break
+                        self.wfile.write(chunk)
+                        remaining -= len(chunk)
+        else:
+            self.wfile.write(response.body)
+
+
+def make_server(
+    host: str,
+    port: int,
+    store: AssetStore,
+    catalog: Catalog | None = None,
+    collections: CollectionStore | None = None,
+) -> ThreadingHTTPServer:
+    router = build_router(store, catalog=catalog, collections=collections)
+    handler = type("BoundCardRequestHandler", (CardRequestHandler,), {"router": router})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(
+    host: str,
+    port: int,
+    store: AssetStore,
+    catalog: Catalog | None = None,
+    collections: CollectionStore | None = None,
+) -> None:
+    server = make_server(host, port, store, catalog, collections)
+    print(f"Serving card viewer on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
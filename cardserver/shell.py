@@ -0,0 +1,242 @@
+"""Self-hosted three.js and the service worker that keeps the viewer offline.
+
+``python -m cardserver vendor --three-root node_modules/three`` copies what
+the viewer loads from three@0.134.0 into ``vendor/three/`` at the repository
+root, which is served like the rest of the viewer:
+
+``three.module.js``
+    The core library.  With esbuild on ``PATH`` (or given via ``--esbuild``)
+    it is bundled from an entry module that re-exports only the names the
+    viewer and the copied loaders use, so everything else is shaken out;
+    without it the full module is copied.
+``examples/jsm/``
+    The example modules the viewer imports (the KTX2 loader) and everything
+    they import in turn.
+``basis/``
+    The Basis Universal transcoder the KTX2 loader runs in a worker.
+
+``vendor/three/vendor.json`` records the version, the kept exports and the
+sizes.  The directory is not checked in; until it has been built, the server
+answers ``/vendor/three/...`` with a 503 saying how to build it, and ``serve``
+warns at start-up, rather than quietly loading three.js from elsewhere.
+
+:func:`service_worker` renders ``sw.js`` for the server: the shell file list
+and the bundles to precache are filled in, and the cache version is a hash of
+their content, so a browser installs a new worker (and drops the old shell
+cache) exactly when something in the shell or a precached bundle changed.
+Only thumb bundles are precached, smallest sets first and a few megabytes in
+all, so pack rips work offline without a first visit pulling every set; other
+bundles go into the worker's runtime cache as the viewer fetches them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from cardserver.assets import AssetStore
+
+if TYPE_CHECKING:
+    from cardserver.server import StaticFiles
+
+THREE_VERSION = "0.134.0"
+VENDOR_DIR = Path("vendor") / "three"
+VENDOR_MISSING = (
+    f"three.js has not been vendored: run 'python -m cardserver vendor --three-root <path to the "
+    f"three@{THREE_VERSION} npm package>' to build {VENDOR_DIR.as_posix()}/"
+)
+
+#: Vendored path prefix -> path in the three npm package.
+VENDOR_SOURCES = {
+    "three.module.js": "build/three.module.js",
+    "examples/jsm/": "examples/jsm/",
+    "basis/": "examples/js/libs/basis/",
+}
+#: Example modules the viewer imports, relative to ``examples/jsm``.
+EXAMPLE_MODULES = ("loaders/KTX2Loader.js",)
+BASIS_FILES = ("basis_transcoder.js", "basis_transcoder.wasm")
+
+#: Sources that use three.js, relative to the repository root.
+VIEWER_SOURCES = ("index.html", "app.py", "js/*.js")
+#: Repository paths precached as the app shell, besides ``/``.
+SHELL_PATTERNS = ("index.html", "js/*.js", "vendor/three/**/*")
+#: Tiers whose bundles are precached, and the most bytes spent on them.
+PRECACHE_TIERS = ("thumb",)
+PRECACHE_BUNDLE_BYTES = 8 * 1024 * 1024
+
+_NAMESPACE_RE = re.compile(r"\bTHREE\.([A-Za-z_$][\w$]*)")
+_NAMED_IMPORT_RE = re.compile(r"import\s*\{([^}]*)\}\s*from\s*['\"]three['\"]")
+_RELATIVE_IMPORT_RE = re.compile(r"(?:from|import)\s*\(?\s*['\"](\.{1,2}/[^'\"]+)['\"]")
+_SW_CONSTANT_RE = re.compile(r"^const (SHELL_VERSION|SHELL_FILES|PRECACHE_BUNDLES) = .*;$", re.MULTILINE)
+
+
+def three_exports(sources: Iterable[Path]) -> list[str]:
+    """Names taken from ``three`` by ``sources``: ``THREE.X`` uses and named imports."""
+    names: set[str] = set()
+    for path in sources:
+        text = path.read_text(encoding="utf-8")
+        names.update(_NAMESPACE_RE.findall(text))
+        for group in _NAMED_IMPORT_RE.findall(text):
+            for item in group.split(","):
+                name = item.strip().split(" as ")[0].strip()
+                if name:
+                    names.add(name)
+    return sorted(names)
+
+
+def vendor_three(three_root: Path, root: Path, *, esbuild: str | None = None) -> dict:
+    """Build ``root/vendor/three`` from the three npm package at ``three_root``.
+
+    Returns the ``vendor.json`` record.  Raises :class:`ValueError` if
+    ``three_root`` is not three@0.134.0, the version the viewer is written for.
+    """
+    three_root = Path(three_root)
+    package = three_root / "package.json"
+    module = three_root / VENDOR_SOURCES["three.module.js"]
+    if not package.is_file() or not module.is_file():
+        raise ValueError(f"{three_root} is not a three.js package (missing build/three.module.js)")
+    version = json.loads(package.read_text(encoding="utf-8")).get("version")
+    if version != THREE_VERSION:
+        raise ValueError(f"{three_root} is three@{version}; the viewer needs three@{THREE_VERSION}")
+
+    out = root / VENDOR_DIR
+    if out.exists():
+        shutil.rmtree(out)
+    out.mkdir(parents=True)
+
+    examples = _copy_examples(three_root, out / "examples" / "jsm")
+    for name in BASIS_FILES:
+        target = out / "basis" / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(three_root / VENDOR_SOURCES["basis/"] / name, target)
+
+    sources = [path for pattern in VIEWER_SOURCES for path in sorted(root.glob(pattern))]
+    # Drop anything that only looks like a use (``THREE.js`` in a comment)
+    library = module.read_text(encoding="utf-8")
+    exports = [name for name in three_exports([*sources, *examples]) if re.search(rf"\b{re.escape(name)}\b", library)]
+    esbuild = esbuild or shutil.which("esbuild")
+    if esbuild:
+        _bundle(esbuild, module, exports, out / "three.module.js")
+    else:
+        shutil.copyfile(module, out / "three.module.js")
+
+    record = {
+        "three": THREE_VERSION,
+        "treeShaken": bool(esbuild),
+        "exports": exports,
+        "bytes": (out / "three.module.js").stat().st_size,
+        "fullBytes": module.stat().st_size,
+    }
+    (out / "vendor.json").write_text(json.dumps(record, indent=2) + "\n", encoding="utf-8")
+    return record
+
+
+def _copy_examples(three_root: Path, target: Path) -> list[Path]:
+    """Copy :data:`EXAMPLE_MODULES` and their relative imports; returns the copies.
+
+    Examples of this release import the core as ``../../../build/three.module.js``;
+    that is rewritten to the bare ``three`` so the import map hands them the
+    vendored module instead of a second copy of the library.
+    """
+    jsm = (three_root / VENDOR_SOURCES["examples/jsm/"]).resolve()
+    module = (three_root / VENDOR_SOURCES["three.module.js"]).resolve()
+    copied: list[Path] = []
+    queue = [jsm / name for name in EXAMPLE_MODULES]
+    seen: set[Path] = set()
+    while queue:
+        source = queue.pop().resolve()
+        if source in seen:
+            continue
+        seen.add(source)
+        text = source.read_text(encoding="utf-8")
+        for specifier in set(_RELATIVE_IMPORT_RE.findall(text)):
+            imported = (source.parent / specifier).resolve()
+            if imported == module:
+                text = re.sub(rf"(['\"]){re.escape(specifier)}\1", "'three'", text)
+            else:
+                queue.append(imported)
+        destination = target / source.relative_to(jsm)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.write_text(text, encoding="utf-8")
+        copied.append(destination)
+    return copied
+
+
+def _bundle(esbuild: str, module: Path, exports: list[str], outfile: Path) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        entry = Path(tmp, "three-entry.js")
+        entry.write_text(f"export {{ {', '.join(exports)} }} from {json.dumps(module.resolve().as_posix())};\n")
+        subprocess.run(
+            [
+                esbuild, str(entry), "--bundle", "--format=esm", "--minify",
+                "--legal-comments=eof", f"--outfile={outfile}",
+            ],
+            check=True,
+            capture_output=True,
+        )
+
+
+def is_vendored(root: Path) -> bool:
+    """Whether :func:`vendor_three` has built ``root/vendor/three``."""
+    return (root / VENDOR_DIR / "three.module.js").is_file()
+
+
+def shell_files(static: StaticFiles) -> list[tuple[str, str]]:
+    """``(url, etag)`` of every shell file, ``/`` first."""
+    root = static.root
+    files = {
+        path
+        for pattern in SHELL_PATTERNS
+        for path in root.glob(pattern)
+        if path.name != "vendor.json" and static.resolve(path.relative_to(root).as_posix()) is not None
+    }
+    index = root / "index.html"
+    shell = [("/", static.etag(index))] if index in files else []
+    shell += sorted(("/" + path.relative_to(root).as_posix(), static.etag(path)) for path in files)
+    return shell
+
+
+def precache_bundles(store: AssetStore) -> list[tuple[str, str]]:
+    """``(url, etag)`` of the bundles to precache, smallest first, up to the byte cap."""
+    bundles = []
+    for slug in store.sets():
+        loaded = store.manifest(slug)
+        if loaded is None:
+            continue
+        for tier, bundle in loaded[0].get("bundles", {}).items():
+            if tier in PRECACHE_TIERS:
+                bundles.append((PRECACHE_TIERS.index(tier), bundle["bytes"], f"/assets/{slug}/{bundle['file']}"))
+    chosen, total = [], 0
+    for _, size, url in sorted(bundles):
+        if total + size > PRECACHE_BUNDLE_BYTES:
+            break
+        chosen.append((url, url.rsplit("/", 1)[1].split(".")[0]))  # Content-addressed names
+        total += size
+    return chosen
+
+
+def service_worker(template: Path, static: StaticFiles, store: AssetStore) -> bytes:
+    """``sw.js`` with its shell files, bundles and cache version filled in."""
+    shell = shell_files(static)
+    bundles = precache_bundles(store)
+    digest = hashlib.sha256(template.read_bytes())
+    for url, etag in [*shell, *bundles]:
+        digest.update(f"{url} {etag}\n".encode())
+    values = {
+        "SHELL_VERSION": digest.hexdigest()[:16],
+        "SHELL_FILES": [url for url, _ in shell],
+        "PRECACHE_BUNDLES": [url for url, _ in bundles],
+    }
+    text, count = _SW_CONSTANT_RE.subn(
+        lambda match: f"const {match.group(1)} = {json.dumps(values[match.group(1)])};",
+        template.read_text(encoding="utf-8"),
+    )
+    if count != len(values):
+        raise ValueError(f"{template} does not declare {', '.join(values)}")
+    return text.encode()
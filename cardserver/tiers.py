@@ -0,0 +1,182 @@
+"""Texture resolution tiers and the encoders that produce them.
+
+Every card face is stored at a fixed set of resolutions so the viewer can
+request the smallest image that still looks sharp at the current zoom level.
+Baking real scans needs Pillow; placeholder tiers are written with a tiny
+stdlib PNG encoder so a fresh checkout can serve a full set without extra
+dependencies.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+try:  # Pillow is only needed to resample real scans.
+    from PIL import Image
+except ImportError:  # pragma: no cover - exercised only without Pillow
+    Image = None
+
+
+@dataclass(frozen=True)
+class Tier:
+    """One pre-generated resolution of a card face."""
+
+    name: str
+    width: int
+    height: int
+    quality: int
+
+
+#: Ordered smallest to largest; the client walks this list to pick a tier.
+TIERS: tuple[Tier, ...] = (
+    Tier("thumb", 125, 175, 70),
+    Tier("mid", 500, 700, 82),
+    Tier("full", 1000, 1400, 90),
+)
+
+TIERS_BY_NAME = {tier.name: tier for tier in TIERS}
+
+#: Size of the blurry preview inlined in manifests as a data URI. It is a few
+#: hundred bytes, so a card can be drawn before any tier file has arrived.
+PREVIEW_SIZE = (8, 11)
+
+
+@dataclass(frozen=True)
+class EncodedTier:
+    """Encoded bytes for one tier plus the metadata recorded in manifests."""
+
+    tier: Tier
+    data: bytes
+    ext: str
+    width: int
+    height: int
+
+    @property
+    def digest(self) -> str:
+        return content_hash(self.data)
+
+    @property
+    def filename(self) -> str:
+        return f"{self.digest}.{self.ext}"
+
+
+def content_hash(data: bytes) -> str:
+    """Return the short content hash used for file names and ETags."""
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+def require_pillow() -> None:
+    if Image is None:
+        raise RuntimeError(
+            "Pillow is required to process card scans; install it with "
+            "'pip install Pillow'"
+        )
+
+
+def encode_image_tiers(source: Path, tiers: tuple[Tier, ...] = TIERS) -> list[EncodedTier]:
+    """Resample ``source`` into every tier as JPEG.
+
+    Each tier is fitted inside the tier box keeping the scan's aspect ratio,
+    and the image is never upscaled past its original size.
+    """
+    require_pillow()
+    with Image.open(source) as image:
+        return encode_tiers(image.convert("RGB"), tiers)
+
+
+def encode_tiers(image: "Image.Image", tiers: tuple[Tier, ...] = TIERS) -> list[EncodedTier]:
+    """Like :func:`encode_image_tiers` for an already opened RGB image."""
+    encoded = []
+    for tier in tiers:
+        resized = image.copy()
+        resized.thumbnail((tier.width, tier.height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, "JPEG", quality=tier.quality, optimize=True, progressive=True)
+        encoded.append(
+            EncodedTier(tier, buffer.getvalue(), "jpg", resized.width, resized.height)
+        )
+    return encoded
+
+
+def encode_image_preview(source: Path) -> str:
+    """Return a :data:`PREVIEW_SIZE` PNG of ``source`` as a data URI."""
+    require_pillow()
+    with Image.open(source) as image:
+        return encode_preview(image.convert("RGB"))
+
+
+def encode_preview(image: "Image.Image") -> str:
+    """Like :func:`encode_image_preview` for an already opened RGB image."""
+    buffer = io.BytesIO()
+    image.resize(PREVIEW_SIZE, Image.BOX).save(buffer, "PNG", optimize=True)
+    return data_uri(buffer.getvalue(), "image/png")
+
+
+def data_uri(data: bytes, mime: str) -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def encode_placeholder_tiers(
+    label: int, face: str, tiers: tuple[Tier, ...] = TIERS
+) -> list[EncodedTier]:
+    """Render a flat-coloured placeholder face for every tier.
+
+    Fronts get a hue derived from the card number so adjacent cards are easy
+    to tell apart; backs share one colour, and therefore one file per tier.
+    """
+    color = _placeholder_color(label, face)
+    return [
+        EncodedTier(tier, placeholder_png(tier.width, tier.height, color), "png", tier.width, tier.height)
+        for tier in tiers
+    ]
+
+
+def placeholder_preview(label: int, face: str) -> str:
+    """Data URI preview matching :func:`encode_placeholder_tiers`."""
+    return data_uri(placeholder_png(*PREVIEW_SIZE, _placeholder_color(label, face)), "image/png")
+
+
+def _placeholder_color(label: int, face: str) -> tuple[int, int, int]:
+    if face == "back":
+        return (40, 70, 140)
+    return _hsv_to_rgb(((label * 47) % 360) / 360.0, 0.45, 0.9)
+
+
+def placeholder_png(width: int, height: int, color: tuple[int, int, int]) -> bytes:
+    """Encode a ``width`` x ``height`` RGB PNG with a white card border."""
+    border = max(1 if width < 25 else 2, width // 25)
+    fill = bytes(color)
+    white = b"\xff\xff\xff"
+    edge_row = b"\x00" + white * width
+    body_row = b"\x00" + white * border + fill * (width - 2 * border) + white * border
+    raw = b"".join(edge_row if y < border or y >= height - border else body_row for y in range(height))
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(payload))
+            + kind
+            + payload
+            + struct.pack(">I", zlib.crc32(kind + payload) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _hsv_to_rgb(h: float, s: float, v: float) -> tuple[int, int, int]:
+    i = int(h * 6) % 6
+    f = h * 6 - int(h * 6)
+    p, q, t = v * (1 - s), v * (1 - f * s), v * (1 - (1 - f) * s)
+    r, g, b = [(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)][i]
+    return int(r * 255), int(g * 255), int(b * 255)
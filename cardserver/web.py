@@ -0,0 +1,231 @@
+"""Transport-independent request routing.
+
+Handlers receive a :class:`Request` and return a :class:`Response`; the
+server modules only translate between sockets and these two types, so the
+same routes can sit behind any server implementation.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+mimetypes.add_type("text/javascript", ".js")
+mimetypes.add_type("text/javascript", ".mjs")
+mimetypes.add_type("image/ktx2", ".ktx2")
+mimetypes.add_type("application/wasm", ".wasm")
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, str] = field(default_factory=dict)
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @classmethod
+    def from_target(cls, method: str, target: str, headers, body: bytes = b"") -> "Request":
+        """Build a request from a raw request target such as ``/a?b=c``."""
+        parts = urlsplit(target)
+        return cls(
+            method=method.upper(),
+            path=unquote(parts.path),
+            query=dict(parse_qsl(parts.query)),
+            headers={key.lower(): value for key, value in headers.items()},
+            body=body,
+        )
+
+    def header(self, name: str, default: str | None = None) -> str | None:
+        return self.headers.get(name.lower(), default)
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+@dataclass
+class Response:
+    status: int = 200
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    #: When set, the body is streamed from this file instead of ``body``.
+    file: Path | None = None
+    #: ``(start, length)`` of the part of ``file`` to send for a range request.
+    file_range: tuple[int, int] | None = None
+
+    @property
+    def content_length(self) -> int:
+        if self.file_range is not None:
+            return self.file_range[1]
+        return self.file.stat().st_size if self.file is not None else len(self.body)
+
+
+class HTTPError(Exception):
+    """Raised by handlers to short-circuit with an error response."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+Handler = Callable[..., Response]
+
+
+class Router:
+    """Maps ``(method, path pattern)`` pairs to handlers.
+
+    Patterns use ``{name}`` placeholders that match one path segment, or
+    ``{name*}`` to match the rest of the path; matches are passed to the
+    handler as keyword arguments.
+    """
+
+    def __init__(self) -> None:
+        self._routes: list[tuple[str, re.Pattern, Handler]] = []
+
+    def route(self, method: str, pattern: str) -> Callable[[Handler], Handler]:
+        def placeholder(match: re.Match) -> str:
+            body = ".+" if match[2] else "[^/]+"
+            return f"(?P<{match[1]}>{body})"
+
+        regex = re.compile("^" + re.sub(r"\{(\w+)(\*?)\}", placeholder, pattern) + "$")
+
+        def decorator(handler: Handler) -> Handler:
+            self._routes.append((method.upper(), regex, handler))
+            return handler
+
+        return decorator
+
+    def dispatch(self, request: Request) -> Response:
+        method = "GET" if request.method == "HEAD" else request.method
+        allowed = False
+        for route_method, regex, handler in self._routes:
+            match = regex.match(request.path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                return handler(request, **match.groupdict())
+            except HTTPError as error:
+                return error_response(error.status, error.message)
+        if allowed:
+            return error_response(405, "method not allowed")
+        return error_response(404, "not found")
+
+
+def etag_for(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:20] + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    candidates = request.header("if-none-match")
+    if not candidates:
+        return False
+    return candidates.strip() == "*" or etag in (c.strip() for c in candidates.split(","))
+
+
+def is_unmodified_since(request: Request, mtime: float) -> bool:
+    """``If-Modified-Since`` check; only consulted without ``If-None-Match``."""
+    since = request.header("if-modified-since")
+    if not since or request.header("if-none-match"):
+        return False
+    try:
+        return int(mtime) <= parsedate_to_datetime(since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(304, {"ETag": etag, "Cache-Control": cache_control})
+
+
+def json_response(
+    request: Request, payload, *, status: int = 200, cache_control: str = REVALIDATE
+) -> Response:
+    body = payload if isinstance(payload, bytes) else json.dumps(payload, separators=(",", ":")).encode()
+    etag = etag_for(body)
+    if status == 200 and is_not_modified(request, etag):
+        return not_modified(etag, cache_control)
+    return Response(
+        status,
+        {"Content-Type": "application/json", "ETag": etag, "Cache-Control": cache_control},
+        body,
+    )
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Return ``(start, length)`` for a single ``bytes=`` range.
+
+    ``None`` means the header is absent or not something this server splits
+    (several ranges, other units) and the whole file should be sent.  Raises
+    :class:`HTTPError` 416 when the range lies outside the file.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if not first:
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPError(416, f"range not satisfiable for {size} bytes")
+    return start, end - start + 1
+
+
+def file_response(
+    request: Request, path: Path, *, etag: str, cache_control: str, content_type: str | None = None
+) -> Response:
+    stat = path.stat()
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    if is_not_modified(request, etag) or is_unmodified_since(request, stat.st_mtime):
+        response = not_modified(etag, cache_control)
+        response.headers["Last-Modified"] = last_modified
+        return response
+    content_type = content_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers = {
+        "Content-Type": content_type,
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if_range = request.header("if-range")
+    if if_range is None or if_range.strip() in (etag, last_modified):
+        size = stat.st_size
+        try:
+            part = parse_range(request.header("range"), size)
+        except HTTPError as error:
+            response = error_response(error.status, error.message)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+        if part is not None:
+            start, length = part
+            headers["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+            return Response(206, headers, file=path, file_range=part)
+    return Response(200, headers, file=path)
+
+
+def redirect(location: str, *, status: int = 302) -> Response:
+    return Response(status, {"Location": location, "Cache-Control": REVALIDATE})
+
+
+def error_response(status: int, message: str) -> Response:
+    body = json.dumps({"error": message}).encode()
+    return Response(status, {"Content-Type": "application/json", "Cache-Control": "no-store"}, body)
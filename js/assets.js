@@ -0,0 +1,127 @@
+// Client for the local card-asset server (python -m cardserver serve).
+//
+// Sets are described by a manifest listing, per card face, the file of every
+// pre-generated resolution tier. Tier files are content-addressed, so once a
+// URL has been fetched the browser never has to revalidate it. Sets baked
+// with bundles also list one file per tier holding all of its images, so a
+// folder's cards can be read out of a single download (see bundle.js).
+import { CardBundle } from './bundle.js';
+
+export const TIER_ORDER = ['thumb', 'mid', 'full'];
+
+const DEG2RAD = Math.PI / 180;
+
+// Bundles up to this size are downloaded whole; larger ones are read with
+// one range request for the index and one per image.
+const WHOLE_BUNDLE_BYTES = 8 * 1024 * 1024;
+
+export function slugify(name) {
+    return name.toLowerCase().replace(/[^a-z0-9]+/g, '-').replace(/^-+|-+$/g, '');
+}
+
+// Height in device pixels that a card of `cardHeight` world units covers when
+// it sits `distance` units in front of `camera`.
+export function projectedCardHeight(camera, renderer, cardHeight, distance) {
+    const visibleHeight = 2 * Math.max(distance, 1e-3) * Math.tan(DEG2RAD * camera.fov / 2);
+    return (cardHeight / visibleHeight) * renderer.domElement.height;
+}
+
+export class AssetClient {
+    #baseUrl;
+    #manifests = new Map();
+    #bundles = new Map();
+
+    constructor(baseUrl = '') {
+        this.#baseUrl = baseUrl.replace(/\/$/, '');
+    }
+
+    // Resolves to the set manifest, or null if the server does not know the set.
+    manifest(setSlug) {
+        if (!this.#manifests.has(setSlug)) {
+            const request = fetch(`${this.#baseUrl}/api/sets/${encodeURIComponent(setSlug)}/manifest`)
+                .then((response) => {
+                    if (response.status === 404) return null;
+                    if (!response.ok) throw new Error(`Manifest request failed (${response.status})`);
+                    return response.json();
+                })
+                .catch((error) => {
+                    this.#manifests.delete(setSlug);
+                    throw error;
+                });
+            this.#manifests.set(setSlug, request);
+        }
+        return this.#manifests.get(setSlug);
+    }
+
+    // Draws a pack on the server from the set's rarity table. Resolves to
+    // { set, seed, cards: [{ number, rarity }] }; pass the returned seed back
+    // to get the same pack again.
+    async pack(setSlug, seed = null) {
+        const query = seed === null ? '' : `?seed=${encodeURIComponent(seed)}`;
+        const response = await fetch(`${this.#baseUrl}/api/sets/${encodeURIComponent(setSlug)}/pack${query}`);
+        if (!response.ok) throw new Error(`Pack request failed (${response.status})`);
+        return response.json();
+    }
+
+    // Smallest tier that is at least `pixelHeight` tall, falling back to the
+    // largest tier the manifest has.
+    tierFor(manifest, pixelHeight) {
+        const tiers = manifest.tiers.filter((tier) => TIER_ORDER.includes(tier.name));
+        const fit = tiers.find((tier) => tier.height >= pixelHeight);
+        return (fit || tiers[tiers.length - 1]).name;
+    }
+
+    // Inline data URI of the face's blurry preview, if the set was baked
+    // with previews.
+    previewUrl(manifest, number, face) {
+        return manifest.cards[String(number)]?.[face]?.preview || null;
+    }
+
+    faceUrl(manifest, number, face, tier) {
+        const found = this.#faceFile(manifest, number, face, tier);
+        return found && `${this.#baseUrl}/assets/${manifest.set}/${found.file}`;
+    }
+
+    // Resolves to the set's bundle for `tier`, or null if the set was baked
+    // without bundles. Shared by every card of the set.
+    bundle(manifest, tier) {
+        const info = manifest.bundles?.[tier];
+        if (!info) return Promise.resolve(null);
+        const url = `${this.#baseUrl}/assets/${manifest.set}/${info.file}`;
+        if (!this.#bundles.has(url)) {
+            const request = (info.bytes <= WHOLE_BUNDLE_BYTES ? CardBundle.load(url) : CardBundle.open(url, info.indexBytes))
+                .catch((error) => {
+                    this.#bundles.delete(url);
+                    throw error;
+                });
+            this.#bundles.set(url, request);
+        }
+        return this.#bundles.get(url);
+    }
+
+    // A `load()` for SharedTextures that reads the same file as faceUrl() out
+    // of the tier's bundle, falling back to the single file if the bundle
+    // cannot be read. Null when the set has no bundle for the tier.
+    faceLoader(manifest, number, face, tier) {
+        const found = this.#faceFile(manifest, number, face, tier);
+        if (!found || !manifest.bundles?.[found.tier]) return null;
+        return async () => {
+            try {
+                const bundle = await this.bundle(manifest, found.tier);
+                if (bundle.has(found.file)) return await bundle.image(found.file);
+            } catch (error) {
+                console.warn('Bundle read failed, fetching the file instead:', error);
+            }
+            const response = await fetch(`${this.#baseUrl}/assets/${manifest.set}/${found.file}`);
+            if (!response.ok) throw new Error(`HTTP ${response.status} for ${found.file}`);
+            return response.blob();
+        };
+    }
+
+    #faceFile(manifest, number, face, tier) {
+        const entry = manifest.cards[String(number)]?.[face];
+        if (!entry) return null;
+        const name = entry[tier] ? tier : TIER_ORDER.find((candidate) => entry[candidate]);
+        return { tier: name, file: entry[name].file };
+    }
+}
@@ -0,0 +1,93 @@
+import * as THREE from 'three';
+
+// Texture atlases baked by `python -m cardserver atlas`.
+//
+// An atlas packs a whole set's fronts into a few pages; each card is a UV
+// rectangle on one page. Card face materials remap their UVs into that
+// rectangle in the vertex shader, so every card of a set can draw from the
+// same page texture: one decode and one GPU upload per page, not per card.
+
+export const FULL_RECT = Object.freeze([0, 0, 1, 1]);
+
+const UV_VERTEX = `
+#include <uv_vertex>
+#ifdef USE_UV
+    vUv = atlasRect.xy + vUv * atlasRect.zw;
+#endif
+`;
+
+const INSTANCED_UV_VERTEX = `
+#include <uv_vertex>
+#ifdef USE_UV
+    vUv = instanceAtlasRect.xy + vUv * instanceAtlasRect.zw;
+#endif
+`;
+
+// MeshBasicMaterial whose map is sampled through an `atlasRect`
+// ([u, v, width, height]); with FULL_RECT it behaves like a plain material.
+// All card face materials share one compiled program.
+export function createCardFaceMaterial(parameters = {}) {
+    const material = new THREE.MeshBasicMaterial(parameters);
+    const atlasRect = new THREE.Vector4(...FULL_RECT);
+    material.userData.atlasRect = atlasRect;
+    material.onBeforeCompile = (shader) => {
+        shader.uniforms.atlasRect = { value: atlasRect };
+        shader.vertexShader = 'uniform vec4 atlasRect;\n' +
+            shader.vertexShader.replace('#include <uv_vertex>', UV_VERTEX);
+    };
+    material.customProgramCacheKey = () => 'card-face-atlas';
+    return material;
+}
+
+// MeshBasicMaterial for an InstancedMesh whose instances each show their own
+// region of `texture`, read from the per-instance `instanceAtlasRect`
+// attribute. One such mesh draws every card on an atlas page in one call.
+export function createInstancedAtlasMaterial(texture) {
+    const material = new THREE.MeshBasicMaterial({ map: texture });
+    material.onBeforeCompile = (shader) => {
+        shader.vertexShader = 'attribute vec4 instanceAtlasRect;\n' +
+            shader.vertexShader.replace('#include <uv_vertex>', INSTANCED_UV_VERTEX);
+    };
+    material.customProgramCacheKey = () => 'card-atlas-instanced';
+    return material;
+}
+
+export function setAtlasRect(material, rect) {
+    material.userData.atlasRect.fromArray(rect);
+}
+
+export class AtlasLibrary {
+    #baseUrl;
+    #atlases = new Map();
+
+    constructor(baseUrl = '') {
+        this.#baseUrl = baseUrl.replace(/\/$/, '');
+    }
+
+    // Resolves to the set's atlas description, or null if it was never baked.
+    atlas(setSlug) {
+        if (!this.#atlases.has(setSlug)) {
+            const request = fetch(`${this.#baseUrl}/api/sets/${encodeURIComponent(setSlug)}/atlas`)
+                .then((response) => (response.ok ? response.json() : null))
+                .catch((error) => {
+                    console.warn(`Atlas for ${setSlug} unavailable, loading cards individually:`, error);
+                    return null;
+                });
+            this.#atlases.set(setSlug, request);
+        }
+        return this.#atlases.get(setSlug);
+    }
+
+    // `{ url, rect }` locating card `number` in `atlas`, or null if the card
+    // is not packed. KTX2 pages are preferred when the bake produced them.
+    region(atlas, number) {
+        const card = atlas.cards[String(number)];
+        if (!card) return null;
+        return { url: this.pageUrl(atlas, card.page), rect: card.uv };
+    }
+
+    pageUrl(atlas, pageIndex) {
+        const page = atlas.pages[pageIndex];
+        return `${this.#baseUrl}/assets/${atlas.set}/${page.ktx2 || page.file}`;
+    }
+}
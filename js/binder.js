@@ -0,0 +1,196 @@
+import * as THREE from 'three';
+import { createInstancedAtlasMaterial } from './atlas.js';
+import { CardBvh } from './picking.js';
+
+// Binder view: a whole collection laid out as card fronts on a plane.
+//
+// Cards are grouped by atlas page and each group is a single InstancedMesh
+// whose instances carry their transform and their atlas rect, so N cards
+// cost one draw call per page rather than one per card. Picking goes through
+// a BVH over the card rectangles, rebuilt with every layout.
+
+const POCKETS_PER_ROW = 3; // Standard 9-pocket binder page
+const POCKET_ROWS = 3;
+
+const _matrix = new THREE.Matrix4();
+const _position = new THREE.Vector3();
+const _rotation = new THREE.Quaternion();
+const _scale = new THREE.Vector3();
+const _box = new THREE.Box3();
+const _halfCard = new THREE.Vector3();
+const _ray = new THREE.Ray();
+const _inverse = new THREE.Matrix4();
+
+export class BinderView {
+    #group = new THREE.Group();
+    #meshes = [];
+    #entries = [];
+    #cardWidth;
+    #cardHeight;
+    #gap;
+    #bounds = { width: 0, height: 0 };
+    #bvh = null;
+
+    constructor(scene, { cardWidth, cardHeight, gap = 0.15 }) {
+        this.#cardWidth = cardWidth;
+        this.#cardHeight = cardHeight;
+        this.#gap = gap;
+        this.#group.visible = false;
+        scene.add(this.#group);
+    }
+
+    get object() {
+        return this.#group;
+    }
+
+    get count() {
+        return this.#entries.length;
+    }
+
+    // One InstancedMesh per atlas page; each is culled as a whole.
+    get pageMeshes() {
+        return this.#meshes;
+    }
+
+    get drawCalls() {
+        return this.#meshes.length;
+    }
+
+    // The entry passed to show() at `index`.
+    entry(index) {
+        return this.#entries[index];
+    }
+
+    // Index of the first card `raycaster` hits, or -1.
+    pick(raycaster) {
+        if (!this.#bvh || !this.#group.visible) return -1;
+        this.#group.updateMatrixWorld();
+        _ray.copy(raycaster.ray).applyMatrix4(_inverse.copy(this.#group.matrixWorld).invert());
+        const { origin, direction } = _ray;
+        return this.#bvh.raycast(origin.x, origin.y, origin.z, direction.x, direction.y, direction.z, raycaster.far);
+    }
+
+    // World-space size of the current layout, centred on the origin.
+    get bounds() {
+        return { ...this.#bounds };
+    }
+
+    // `entries` is an array of `{ texture, rect }`, in display order. Textures
+    // are owned by the caller; the view only creates meshes around them.
+    show(entries, { layout = 'grid', aspect = 16 / 9 } = {}) {
+        this.clear();
+        this.#entries = entries;
+
+        const byTexture = new Map();
+        entries.forEach((entry, index) => {
+            if (!byTexture.has(entry.texture)) byTexture.set(entry.texture, []);
+            byTexture.get(entry.texture).push(index);
+        });
+        for (const [texture, indices] of byTexture) {
+            const geometry = new THREE.PlaneGeometry(1, 1);
+            const rects = new Float32Array(indices.length * 4);
+            indices.forEach((entryIndex, i) => rects.set(entries[entryIndex].rect, i * 4));
+            geometry.setAttribute('instanceAtlasRect', new THREE.InstancedBufferAttribute(rects, 4));
+
+            const mesh = new THREE.InstancedMesh(geometry, createInstancedAtlasMaterial(texture), indices.length);
+            mesh.userData.entryIndices = Int32Array.from(indices);
+            this.#meshes.push(mesh);
+            this.#group.add(mesh);
+        }
+        this.setLayout(layout, aspect);
+        this.#group.visible = true;
+    }
+
+    // 'grid' fills rows to roughly match `aspect`; 'spread' lays the cards out
+    // as open binder spreads of two 3x3 pages, stacked top to bottom.
+    setLayout(layout, aspect = 16 / 9) {
+        const slot = layout === 'spread' ? this.#spreadLayout() : this.#gridLayout(aspect);
+        let minX = Infinity, maxX = -Infinity, minY = Infinity, maxY = -Infinity;
+        const positions = new Float32Array(this.#entries.length * 2);
+        for (let i = 0; i < this.#entries.length; i++) {
+            const [x, y] = slot(i);
+            positions[i * 2] = x;
+            positions[i * 2 + 1] = y;
+            minX = Math.min(minX, x); maxX = Math.max(maxX, x);
+            minY = Math.min(minY, y); maxY = Math.max(maxY, y);
+        }
+        const centerX = (minX + maxX) / 2;
+        const centerY = (minY + maxY) / 2;
+        const boxes = new Float32Array(this.#entries.length * 6);
+        for (let i = 0; i < this.#entries.length; i++) {
+            const x = positions[i * 2] - centerX;
+            const y = positions[i * 2 + 1] - centerY;
+            boxes.set([x - this.#cardWidth / 2, y - this.#cardHeight / 2, 0, x + this.#cardWidth / 2, y + this.#cardHeight / 2, 0], i * 6);
+        }
+        this.#bvh = new CardBvh(boxes);
+        this.#bounds = {
+            width: this.#entries.length ? maxX - minX + this.#cardWidth : 0,
+            height: this.#entries.length ? maxY - minY + this.#cardHeight : 0
+        };
+
+        _scale.set(this.#cardWidth, this.#cardHeight, 1);
+        for (const mesh of this.#meshes) {
+            _box.makeEmpty();
+            mesh.userData.entryIndices.forEach((entryIndex, i) => {
+                _position.set(positions[entryIndex * 2] - centerX, positions[entryIndex * 2 + 1] - centerY, 0);
+                mesh.setMatrixAt(i, _matrix.compose(_position, _rotation, _scale));
+                _box.expandByPoint(_position);
+            });
+            mesh.instanceMatrix.needsUpdate = true;
+            // The base geometry's own bounds say nothing about where the
+            // instances are; cover all of them so the page culls as a unit.
+            _box.expandByVector(_halfCard.set(this.#cardWidth / 2, this.#cardHeight / 2, 0));
+            mesh.geometry.boundingSphere = _box.getBoundingSphere(new THREE.Sphere());
+        }
+    }
+
+    // Distance at which a camera with `fov` and `aspect` sees the whole layout.
+    fitDistance(fov, aspect, margin = 1.05) {
+        const halfTan = Math.tan(THREE.MathUtils.degToRad(fov) / 2);
+        const forHeight = this.#bounds.height / 2 / halfTan;
+        const forWidth = this.#bounds.width / 2 / (halfTan * aspect);
+        return Math.max(forHeight, forWidth) * margin;
+    }
+
+    hide() {
+        this.#group.visible = false;
+    }
+
+    clear() {
+        for (const mesh of this.#meshes) {
+            this.#group.remove(mesh);
+            mesh.geometry.dispose();
+            mesh.material.dispose();
+            mesh.dispose();
+        }
+        this.#meshes = [];
+        this.#entries = [];
+        this.#bvh = null;
+        this.#group.visible = false;
+    }
+
+    #gridLayout(aspect) {
+        const stepX = this.#cardWidth + this.#gap;
+        const stepY = this.#cardHeight + this.#gap;
+        const columns = Math.max(1, Math.ceil(Math.sqrt(this.#entries.length * aspect * stepY / stepX)));
+        return (i) => [(i % columns) * stepX, -Math.floor(i / columns) * stepY];
+    }
+
+    #spreadLayout() {
+        const stepX = this.#cardWidth + this.#gap;
+        const stepY = this.#cardHeight + this.#gap;
+        const pageWidth = POCKETS_PER_ROW * stepX;
+        const pageHeight = POCKET_ROWS * stepY;
+        const perPage = POCKETS_PER_ROW * POCKET_ROWS;
+        const spine = this.#cardWidth / 2;
+        const spreadGap = this.#cardHeight / 2;
+        return (i) => {
+            const page = Math.floor(i / perPage);
+            const pocket = i % perPage;
+            const spread = Math.floor(page / 2);
+            const x = (page % 2) * (pageWidth + spine) + (pocket % POCKETS_PER_ROW) * stepX;
+            const y = -(spread * (pageHeight + spreadGap) + Math.floor(pocket / POCKETS_PER_ROW) * stepY);
+            return [x, y];
+        };
+    }
+}
@@ -0,0 +1,110 @@
+// Reader for set bundles (cardserver/bundle.py): every image of one tier in a
+// single file behind a binary index.
+//
+// Small bundles are fetched whole in one request and their images handed out
+// as Blob slices, which share the downloaded bytes instead of copying them.
+// Large bundles only fetch their index up front; each image is then read
+// with an HTTP range request. A server that ignores ranges answers with the
+// whole file, which simply turns the bundle into an in-memory one.
+
+const MAGIC = 0x4b415043; // "CPAK" read as a little-endian u32
+const VERSION = 1;
+const HEADER_BYTES = 24;
+const CARD_BYTES = 12;
+const IMAGE_BYTES = 24;
+const NO_IMAGE = 0xffffffff;
+const IMAGE_TYPES = [['jpg', 'image/jpeg'], ['png', 'image/png'], ['webp', 'image/webp']];
+
+// Parses the header and index at the start of `buffer` (an ArrayBuffer) into
+// { cards: Map(number -> { front, back }), images: Map(file -> image) }, where
+// an image is { file, type, width, height, offset, length } and `file` is
+// the matching tier file name, "<hash>.<ext>".
+export function parseBundleIndex(buffer) {
+    const view = new DataView(buffer);
+    if (buffer.byteLength < HEADER_BYTES || view.getUint32(0, true) !== MAGIC || view.getUint16(4, true) !== VERSION) {
+        throw new Error('Not a version 1 card bundle');
+    }
+    const cardCount = view.getUint32(8, true);
+    const imageCount = view.getUint32(12, true);
+    const dataOffset = view.getUint32(16, true);
+    if (buffer.byteLength < dataOffset) throw new Error('Truncated card bundle index');
+
+    const images = [];
+    let position = HEADER_BYTES + cardCount * CARD_BYTES;
+    for (let i = 0; i < imageCount; i++, position += IMAGE_BYTES) {
+        const hash = Array.from(new Uint8Array(buffer, position, 10), (b) => b.toString(16).padStart(2, '0')).join('');
+        const [ext, type] = IMAGE_TYPES[view.getUint8(position + 10)];
+        images.push({
+            file: `${hash}.${ext}`,
+            type,
+            width: view.getUint16(position + 12, true),
+            height: view.getUint16(position + 14, true),
+            offset: dataOffset + view.getUint32(position + 16, true),
+            length: view.getUint32(position + 20, true)
+        });
+    }
+    const cards = new Map();
+    for (let i = 0; i < cardCount; i++) {
+        const base = HEADER_BYTES + i * CARD_BYTES;
+        const front = view.getUint32(base + 4, true);
+        const back = view.getUint32(base + 8, true);
+        cards.set(view.getUint32(base, true), {
+            front: front === NO_IMAGE ? null : images[front],
+            back: back === NO_IMAGE ? null : images[back]
+        });
+    }
+    return { cards, images: new Map(images.map((image) => [image.file, image])) };
+}
+
+export class CardBundle {
+    #url;
+    #index;
+    #blob; // The whole bundle, or null while images come from range requests
+
+    constructor(url, index, blob = null) {
+        this.#url = url;
+        this.#index = index;
+        this.#blob = blob;
+    }
+
+    // Fetches the whole bundle in one request.
+    static async load(url) {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`Bundle request failed (${response.status})`);
+        const blob = await response.blob();
+        const header = new DataView(await blob.slice(0, HEADER_BYTES).arrayBuffer());
+        const dataOffset = header.byteLength === HEADER_BYTES ? header.getUint32(16, true) : HEADER_BYTES;
+        return new CardBundle(url, parseBundleIndex(await blob.slice(0, dataOffset).arrayBuffer()), blob);
+    }
+
+    // Fetches only the first `indexBytes` (the manifest records the size).
+    static async open(url, indexBytes) {
+        const response = await fetch(url, { headers: { Range: `bytes=0-${indexBytes - 1}` } });
+        if (!response.ok) throw new Error(`Bundle request failed (${response.status})`);
+        const blob = await response.blob();
+        const index = parseBundleIndex(await blob.slice(0, indexBytes).arrayBuffer());
+        return new CardBundle(url, index, response.status === 206 ? null : blob);
+    }
+
+    get cards() {
+        return this.#index.cards;
+    }
+
+    has(file) {
+        return this.#index.images.has(file);
+    }
+
+    // Resolves to the encoded image stored as tier file `file`.
+    async image(file) {
+        const image = this.#index.images.get(file);
+        if (!image) throw new Error(`${file} is not in this bundle`);
+        const end = image.offset + image.length;
+        if (this.#blob) return this.#blob.slice(image.offset, end, image.type);
+        const response = await fetch(this.#url, { headers: { Range: `bytes=${image.offset}-${end - 1}` } });
+        if (!response.ok) throw new Error(`Bundle range request failed (${response.status})`);
+        const blob = await response.blob();
+        if (response.status === 206) return blob.slice(0, blob.size, image.type);
+        this.#blob = blob; // Range ignored: keep the whole file for later images
+        return blob.slice(image.offset, end, image.type);
+    }
+}
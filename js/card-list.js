@@ -0,0 +1,147 @@
+// Virtualized card list for the controls panel.
+//
+// Replaces a <select> that was rebuilt through innerHTML on every added card.
+// Only the rows inside the scrolled viewport (plus a few either side) exist in
+// the DOM; they are recycled as the list scrolls, and adding cards only grows
+// a spacer. Labels are pulled from `label(index)` when a row is drawn, so the
+// list holds no copy of the cards and renaming one redraws at most one row.
+export class CardList {
+    #container;
+    #spacer;
+    #rows = [];
+    #rowHeight;
+    #overscan;
+    #label;
+    #onSelect;
+    #length = 0;
+    #selected = -1;
+    #frameHandle = null;
+
+    // `container` is an empty scrollable element; `onSelect(index)` runs when a
+    // row is clicked or picked with the keyboard.
+    constructor(container, { label, onSelect, rowHeight = 28, overscan = 4 }) {
+        this.#container = container;
+        this.#label = label;
+        this.#onSelect = onSelect;
+        this.#rowHeight = rowHeight;
+        this.#overscan = overscan;
+        this.#spacer = document.createElement('div');
+        this.#spacer.className = 'card-list-spacer';
+        container.append(this.#spacer);
+        container.setAttribute('role', 'listbox');
+        container.tabIndex = 0;
+        container.addEventListener('scroll', () => this.#schedule());
+        container.addEventListener('click', (event) => {
+            const row = event.target.closest('.card-list-row');
+            if (row) this.#onSelect(Number(row.dataset.index));
+        });
+        container.addEventListener('keydown', (event) => this.#onKeyDown(event));
+        this.#update();
+    }
+
+    get length() {
+        return this.#length;
+    }
+
+    // Replaces the whole list, e.g. after a pack rip swapped every card.
+    set length(length) {
+        this.#length = length;
+        if (this.#selected >= length) this.#selected = -1;
+        this.#rows.forEach((row) => delete row.dataset.index); // Same indices, different cards
+        this.#update();
+    }
+
+    get selected() {
+        return this.#selected;
+    }
+
+    append(count = 1) {
+        this.#length += count;
+        this.#update();
+    }
+
+    // Highlights `index` (-1 for none) and scrolls it into view.
+    select(index) {
+        this.#selected = index;
+        if (index >= 0) {
+            const top = index * this.#rowHeight;
+            const { scrollTop, clientHeight } = this.#container;
+            if (top < scrollTop) {
+                this.#container.scrollTop = top;
+            } else if (top + this.#rowHeight > scrollTop + clientHeight) {
+                this.#container.scrollTop = top + this.#rowHeight - clientHeight;
+            }
+        }
+        this.#schedule();
+    }
+
+    // Redraws the label of row `index` if it is on screen.
+    refresh(index) {
+        const row = this.#rows.find((candidate) => Number(candidate.dataset.index) === index);
+        if (row) row.textContent = this.#label(index);
+    }
+
+    #update() {
+        this.#spacer.style.height = `${this.#length * this.#rowHeight}px`;
+        this.#container.toggleAttribute('data-empty', this.#length === 0);
+        this.#schedule();
+    }
+
+    // Scroll events can fire several times a frame; draw once per frame.
+    #schedule() {
+        if (this.#frameHandle !== null) return;
+        this.#frameHandle = requestAnimationFrame(() => {
+            this.#frameHandle = null;
+            this.#draw();
+        });
+    }
+
+    #draw() {
+        const first = Math.max(0, Math.floor(this.#container.scrollTop / this.#rowHeight) - this.#overscan);
+        const visible = Math.ceil(this.#container.clientHeight / this.#rowHeight) + 2 * this.#overscan;
+        const last = Math.min(this.#length, first + visible);
+        while (this.#rows.length < last - first) {
+            const row = document.createElement('div');
+            row.className = 'card-list-row';
+            row.setAttribute('role', 'option');
+            row.style.height = `${this.#rowHeight}px`;
+            this.#spacer.append(row);
+            this.#rows.push(row);
+        }
+        this.#rows.forEach((row, slot) => {
+            const index = first + slot;
+            row.hidden = index >= last;
+            if (row.hidden) return;
+            if (Number(row.dataset.index) !== index) {
+                row.dataset.index = index;
+                row.id = `${this.#container.id}-${index}`;
+                row.style.transform = `translateY(${index * this.#rowHeight}px)`;
+                row.textContent = this.#label(index);
+            }
+            row.setAttribute('aria-selected', String(index === this.#selected));
+        });
+        if (this.#selected >= first && this.#selected < last) {
+            this.#container.setAttribute('aria-activedescendant', `${this.#container.id}-${this.#selected}`);
+        } else {
+            this.#container.removeAttribute('aria-activedescendant');
+        }
+    }
+
+    #onKeyDown(event) {
+        if (this.#length === 0) return;
+        const page = Math.max(1, Math.floor(this.#container.clientHeight / this.#rowHeight));
+        const moves = { ArrowDown: 1, ArrowUp: -1, PageDown: page, PageUp: -page };
+        let index;
+        if (event.key in moves) {
+            index = Math.min(this.#length - 1, Math.max(0, this.#selected + moves[event.key]));
+        } else if (event.key === 'Home') {
+            index = 0;
+        } else if (event.key === 'End') {
+            index = this.#length - 1;
+        } else {
+            return;
+        }
+        event.preventDefault();
+        if (index !== this.#selected) this.#onSelect(index);
+    }
+}
@@ -0,0 +1,77 @@
+import * as THREE from 'three';
+import { FULL_RECT, createCardFaceMaterial, setAtlasRect } from './atlas.js';
+
+// Reusable card meshes.
+//
+// Every card shares one unit box geometry (scaled per card to its width and
+// height) and one edge material. Only the front and back face materials are
+// per card, because their maps and fade opacity differ. Released meshes keep
+// those materials and go back on a free list, so ripping pack after pack
+// reuses the same objects instead of allocating and disposing GPU buffers.
+export class CardPool {
+    #geometry;
+    #edgeMaterial = new THREE.MeshBasicMaterial({ color: 0xffffff });
+    // Face materials always have a map, so swapping textures never changes the
+    // shader variant; blank faces show this 1x1 white texture.
+    #blankTexture = new THREE.DataTexture(new Uint8Array([255, 255, 255, 255]), 1, 1, THREE.RGBAFormat);
+    #free = [];
+    #maxFree;
+    #live = 0;
+
+    constructor({ thickness, maxFree = 64 }) {
+        this.#geometry = new THREE.BoxGeometry(1, 1, thickness);
+        this.#blankTexture.needsUpdate = true;
+        this.#maxFree = maxFree;
+    }
+
+    get geometry() {
+        return this.#geometry;
+    }
+
+    get blankTexture() {
+        return this.#blankTexture;
+    }
+
+    get stats() {
+        return { live: this.#live, free: this.#free.length };
+    }
+
+    acquire() {
+        const card = this.#free.pop() || this.#create();
+        this.#live++;
+        return card;
+    }
+
+    // Returns `card` to the pool. Textures are left to the caller, which knows
+    // which of them are shared; the face maps are reset to the blank texture.
+    release(card) {
+        this.#live--;
+        card.removeFromParent();
+        for (const material of [card.material[4], card.material[5]]) {
+            material.map = this.#blankTexture;
+            material.opacity = 0;
+            setAtlasRect(material, FULL_RECT);
+        }
+        card.visible = false;
+        card.geometry = this.#geometry; // Level of detail may have swapped in an impostor
+        card.position.set(0, 0, 0);
+        card.rotation.set(0, 0, 0);
+        card.scale.set(1, 1, 1);
+        card.userData = {};
+        if (this.#free.length < this.#maxFree) {
+            this.#free.push(card);
+        } else {
+            card.material[4].dispose();
+            card.material[5].dispose();
+        }
+    }
+
+    #create() {
+        const face = () => createCardFaceMaterial({ color: 0xffffff, map: this.#blankTexture, transparent: true, opacity: 0 });
+        const edge = this.#edgeMaterial;
+        // Box material order: right, left, top, bottom, front, back.
+        const card = new THREE.Mesh(this.#geometry, [edge, edge, edge, edge, face(), face()]);
+        card.visible = false;
+        return card;
+    }
+}
@@ -0,0 +1,55 @@
+// Client for the card catalog (/api/catalog on the local card server).
+//
+// Nothing is fetched up front: a set's metadata is requested the first time a
+// card from that folder is shown, then kept for the rest of the session.
+
+const PAGE_SIZE = 500;
+
+export class CatalogClient {
+    #baseUrl;
+    #sets = new Map();
+
+    constructor(baseUrl = '') {
+        this.#baseUrl = baseUrl.replace(/\/$/, '');
+    }
+
+    // Resolves to Map(number -> { number, player, team }) for every catalogued
+    // card in the set; empty when the set is not in the catalog.
+    setCards(setSlug) {
+        if (!this.#sets.has(setSlug)) {
+            const request = this.#fetchSet(setSlug).catch((error) => {
+                this.#sets.delete(setSlug);
+                throw error;
+            });
+            this.#sets.set(setSlug, request);
+        }
+        return this.#sets.get(setSlug);
+    }
+
+    async card(setSlug, number) {
+        return (await this.setCards(setSlug)).get(Number(number)) || null;
+    }
+
+    // One page of cards matching `filters` ({ set, year, player, team, number }).
+    async search(filters = {}, { cursor = null, limit = 100 } = {}) {
+        const params = new URLSearchParams({ limit: String(limit) });
+        Object.entries(filters).forEach(([name, value]) => {
+            if (value !== undefined && value !== null && value !== '') params.set(name, String(value));
+        });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`${this.#baseUrl}/api/catalog/cards?${params}`);
+        if (!response.ok) throw new Error(`Catalog request failed (${response.status})`);
+        return response.json();
+    }
+
+    async #fetchSet(setSlug) {
+        const cards = new Map();
+        let cursor = null;
+        do {
+            const page = await this.search({ set: setSlug }, { cursor, limit: PAGE_SIZE });
+            page.cards.forEach((card) => cards.set(card.number, card));
+            cursor = page.next;
+        } while (cursor);
+        return cards;
+    }
+}
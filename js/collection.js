@@ -0,0 +1,137 @@
+// Client for saved collections (/api/collections on the local card server).
+//
+// A collection is read back a page at a time, so the first cards can be shown
+// long before a large collection has finished loading. Edits are recorded per
+// card and field as they happen and sent as one delta once things have been
+// quiet for `delayMs` (or straight away when the page is hidden): only cards
+// that were added, re-skinned or moved since the last save travel, however
+// large the collection is.
+
+const PAGE_SIZE = 500;
+const RETRY_MS = 5000;
+
+let nextLocalId = 0;
+
+export class CollectionClient {
+    #baseUrl;
+    #name;
+    #delayMs;
+    #pending = new Map(); // card id -> fields changed since the last save
+    #deleted = new Set();
+    #timer = null;
+    #saving = null;
+    #revision = 0;
+    #stats = { saves: 0, savedCards: 0, failures: 0, lastSaveMs: 0 };
+
+    constructor(name, { baseUrl = '', delayMs = 500 } = {}) {
+        this.#name = name;
+        this.#baseUrl = baseUrl.replace(/\/$/, '');
+        this.#delayMs = delayMs;
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') this.flush({ keepalive: true }).catch(() => {}); // Retried while the page lives
+        });
+    }
+
+    // A new card id; ids are chosen here so cards can be saved in any order.
+    static newId() {
+        if (crypto.randomUUID) return crypto.randomUUID();
+        return `${Date.now().toString(36)}-${(nextLocalId++).toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    }
+
+    get name() {
+        return this.#name;
+    }
+
+    // Revision of the last page read or delta saved.
+    get revision() {
+        return this.#revision;
+    }
+
+    get stats() {
+        return { ...this.#stats, pending: this.#pending.size + this.#deleted.size };
+    }
+
+    // Yields the saved cards page by page, in display order. The first page
+    // carries `count`, the size of the whole collection.
+    async *pages({ limit = PAGE_SIZE } = {}) {
+        let cursor = null;
+        do {
+            const params = new URLSearchParams({ limit: String(limit) });
+            if (cursor) params.set('cursor', cursor);
+            const response = await fetch(`${this.#url()}?${params}`);
+            if (!response.ok) throw new Error(`Collection request failed (${response.status})`);
+            const page = await response.json();
+            if (!cursor) this.#revision = page.revision;
+            cursor = page.next;
+            yield page;
+        } while (cursor);
+    }
+
+    // Merges `fields` (any of position, set, number, name, front, back,
+    // transform) into the next delta for card `id`.
+    record(id, fields) {
+        this.#deleted.delete(id);
+        this.#pending.set(id, { ...this.#pending.get(id), ...fields });
+        this.#schedule();
+    }
+
+    remove(id) {
+        this.#pending.delete(id);
+        this.#deleted.add(id);
+        this.#schedule();
+    }
+
+    // Sends everything recorded so far as one delta. A failed save is merged
+    // back under anything recorded since and retried a little later.
+    async flush({ keepalive = false } = {}) {
+        clearTimeout(this.#timer);
+        this.#timer = null;
+        if (this.#saving) await this.#saving.catch(() => {});
+        if (this.#pending.size === 0 && this.#deleted.size === 0) return;
+        const upserts = [...this.#pending].map(([id, fields]) => ({ id, ...fields }));
+        const deletes = [...this.#deleted];
+        const unsent = this.#pending;
+        const unsentDeletes = this.#deleted;
+        this.#pending = new Map();
+        this.#deleted = new Set();
+        const start = performance.now();
+        this.#saving = fetch(`${this.#url()}/changes`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ upserts, deletes }),
+            keepalive
+        }).then(async (response) => {
+            if (!response.ok) throw new Error(`Collection save failed (${response.status})`);
+            const saved = await response.json();
+            this.#revision = saved.revision;
+            this.#stats.saves++;
+            this.#stats.savedCards += upserts.length + deletes.length;
+            this.#stats.lastSaveMs = performance.now() - start;
+        });
+        try {
+            await this.#saving;
+        } catch (error) {
+            this.#stats.failures++;
+            for (const [id, fields] of unsent) {
+                if (!this.#deleted.has(id)) this.#pending.set(id, { ...fields, ...this.#pending.get(id) });
+            }
+            unsentDeletes.forEach((id) => { if (!this.#pending.has(id)) this.#deleted.add(id); });
+            this.#schedule(RETRY_MS);
+            throw error;
+        } finally {
+            this.#saving = null;
+        }
+    }
+
+    #schedule(delay = this.#delayMs) {
+        clearTimeout(this.#timer);
+        this.#timer = setTimeout(() => {
+            this.#timer = null;
+            this.flush().catch((error) => console.warn('Saving the collection failed:', error));
+        }, delay);
+    }
+
+    #url() {
+        return `${this.#baseUrl}/api/collections/${encodeURIComponent(this.#name)}`;
+    }
+}
@@ -0,0 +1,65 @@
+// Image decode worker used by ImageDecoder (image-decoder.js).
+//
+// Request:  { id, source: Blob | string (URL), maxSize, encode }
+// Response: { id, bitmap, width, height, blob } with the ImageBitmap
+//           transferred, or { id, error }.
+// `width`/`height` are the source dimensions before any downscaling. With
+// `encode`, a downscaled image is also returned re-encoded as `blob` so it can
+// be cached instead of the original; `blob` is absent otherwise. Bitmaps
+// are flipped vertically here because WebGL ignores UNPACK_FLIP_Y_WEBGL for
+// ImageBitmaps; textures built from them use flipY = false.
+'use strict';
+
+async function toBlob(source) {
+    if (typeof source !== 'string') return source;
+    const response = await fetch(source, { mode: 'cors' });
+    if (!response.ok) throw new Error(`HTTP ${response.status} for ${source}`);
+    return response.blob();
+}
+
+// `bitmap` is already flipped, so resizing keeps its orientation.
+async function resize(bitmap, width, height) {
+    try {
+        return await createImageBitmap(bitmap, { resizeWidth: width, resizeHeight: height, resizeQuality: 'high' });
+    } catch {
+        // Browsers without resize options: scale through an OffscreenCanvas.
+        const canvas = new OffscreenCanvas(width, height);
+        const context = canvas.getContext('2d');
+        context.imageSmoothingQuality = 'high';
+        context.drawImage(bitmap, 0, 0, width, height);
+        return canvas.transferToImageBitmap();
+    }
+}
+
+// Encodes a flipped bitmap the right way up.
+async function encode(bitmap) {
+    if (typeof OffscreenCanvas === 'undefined') return undefined;
+    const canvas = new OffscreenCanvas(bitmap.width, bitmap.height);
+    const context = canvas.getContext('2d');
+    context.translate(0, bitmap.height);
+    context.scale(1, -1);
+    context.drawImage(bitmap, 0, 0);
+    return canvas.convertToBlob({ type: 'image/webp', quality: 0.9 });
+}
+
+async function decode({ source, maxSize, encode: wantBlob }) {
+    const blob = await toBlob(source);
+    const full = await createImageBitmap(blob, { imageOrientation: 'flipY', premultiplyAlpha: 'none' });
+    const { width, height } = full;
+    const scale = Math.min(1, maxSize / width, maxSize / height);
+    if (scale === 1) return { bitmap: full, width, height };
+
+    const bitmap = await resize(full, Math.max(1, Math.round(width * scale)), Math.max(1, Math.round(height * scale)));
+    full.close();
+    return { bitmap, width, height, blob: wantBlob ? await encode(bitmap) : undefined };
+}
+
+self.onmessage = async (event) => {
+    const { id } = event.data;
+    try {
+        const result = await decode(event.data);
+        self.postMessage({ id, ...result }, [result.bitmap]);
+    } catch (error) {
+        self.postMessage({ id, error: String(error && error.message || error) });
+    }
+};
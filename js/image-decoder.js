@@ -0,0 +1,102 @@
+import * as THREE from 'three';
+
+// Decodes card images off the main thread.
+//
+// Files, blobs and URLs are handed to a small pool of workers that decode them
+// with createImageBitmap and downscale anything larger than `maxSize`, so a
+// 1200-dpi scan never reaches the GPU at full size and never blocks the UI.
+// Decoded bitmaps are transferred back, not copied. Browsers without worker
+// createImageBitmap fall back to an <img> decoded from an object URL.
+export class ImageDecoder {
+    #workers = [];
+    #pending = new Map();
+    #nextId = 1;
+    #maxSize;
+
+    constructor({ maxSize = 4096, poolSize = Math.min(4, Math.max(1, (navigator.hardwareConcurrency || 2) - 1)) } = {}) {
+        this.#maxSize = maxSize;
+        if (typeof Worker === 'undefined' || typeof createImageBitmap === 'undefined') return;
+        for (let i = 0; i < poolSize; i++) {
+            const worker = new Worker(new URL('./decode-worker.js', import.meta.url));
+            const slot = { worker, busy: 0 };
+            worker.onmessage = (event) => this.#settle(slot, event.data);
+            this.#workers.push(slot);
+        }
+    }
+
+    get maxSize() {
+        return this.#maxSize;
+    }
+
+    // Decodes still in flight.
+    get pending() {
+        return this.#pending.size;
+    }
+
+    // Resolves to `{ image, width, height, flipY, blob }`, where width/height
+    // are the source dimensions and `image` may be smaller. `source` is a
+    // File/Blob or a URL string. With `encode`, a downscaled image also comes
+    // back re-encoded as `blob`; it is undefined when nothing was scaled.
+    decode(source, { encode = false } = {}) {
+        if (this.#workers.length === 0) return this.#decodeOnMainThread(source, encode);
+        const slot = this.#workers.reduce((best, candidate) => (candidate.busy < best.busy ? candidate : best));
+        const id = this.#nextId++;
+        // Workers resolve relative URLs against their own script, not the page
+        const message = typeof source === 'string' ? new URL(source, document.baseURI).href : source;
+        slot.busy++;
+        return new Promise((resolve, reject) => {
+            this.#pending.set(id, { resolve, reject });
+            slot.worker.postMessage({ id, source: message, maxSize: this.#maxSize, encode });
+        });
+    }
+
+    // Decodes `source` into a new texture ready for upload.
+    async decodeTexture(source) {
+        const { image, flipY } = await this.decode(source);
+        const texture = new THREE.Texture(image);
+        texture.flipY = flipY;
+        texture.needsUpdate = true;
+        return texture;
+    }
+
+    dispose() {
+        this.#workers.forEach(({ worker }) => worker.terminate());
+        this.#workers = [];
+        this.#pending.forEach(({ reject }) => reject(new Error('Image decoder disposed')));
+        this.#pending.clear();
+    }
+
+    #settle(slot, { id, bitmap, width, height, blob, error }) {
+        slot.busy--;
+        const request = this.#pending.get(id);
+        if (!request) {
+            bitmap?.close();
+            return;
+        }
+        this.#pending.delete(id);
+        if (error) request.reject(new Error(error));
+        else request.resolve({ image: bitmap, width, height, flipY: false, blob });
+    }
+
+    async #decodeOnMainThread(source, encode) {
+        const url = typeof source === 'string' ? source : URL.createObjectURL(source);
+        try {
+            const img = new Image();
+            img.crossOrigin = 'anonymous';
+            img.src = url;
+            await img.decode();
+            const { naturalWidth: width, naturalHeight: height } = img;
+            const scale = Math.min(1, this.#maxSize / width, this.#maxSize / height);
+            if (scale === 1) return { image: img, width, height, flipY: true };
+
+            const canvas = document.createElement('canvas');
+            canvas.width = Math.max(1, Math.round(width * scale));
+            canvas.height = Math.max(1, Math.round(height * scale));
+            canvas.getContext('2d').drawImage(img, 0, 0, canvas.width, canvas.height);
+            const blob = encode ? await new Promise((resolve) => canvas.toBlob(resolve, 'image/webp', 0.9)) : undefined;
+            return { image: canvas, width, height, flipY: true, blob: blob ?? undefined };
+        } finally {
+            if (typeof source !== 'string') URL.revokeObjectURL(url);
+        }
+    }
+}
@@ -0,0 +1,170 @@
+import * as THREE from 'three';
+
+// Level of detail and culling for what the viewer draws.
+//
+// Run once per frame before rendering. A card that covers only a few dozen
+// pixels is drawn as an impostor: the same front and back materials on two
+// quads, without the four edge faces that cost a draw call each and are
+// invisible at that size. Textures of objects that are hidden or outside the
+// camera frustum are reported to a TextureResidency as idle, which evicts
+// them from the GPU. Which texture tier a card loads is decided by the app
+// (see projectedCardHeight in assets.js); this class only reports how large
+// each card is on screen.
+
+const BLANK_SIZE = 1;
+
+// Front (material 4) and back (material 5) of a card as two quads `thickness`
+// apart, with the same UVs as the matching faces of a unit BoxGeometry.
+export function createImpostorGeometry(thickness) {
+    const z = thickness / 2;
+    const geometry = new THREE.BufferGeometry();
+    geometry.setAttribute('position', new THREE.Float32BufferAttribute([
+        -0.5, 0.5, z, 0.5, 0.5, z, -0.5, -0.5, z, 0.5, -0.5, z,
+        0.5, 0.5, -z, -0.5, 0.5, -z, 0.5, -0.5, -z, -0.5, -0.5, -z
+    ], 3));
+    geometry.setAttribute('normal', new THREE.Float32BufferAttribute([
+        0, 0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1,
+        0, 0, -1, 0, 0, -1, 0, 0, -1, 0, 0, -1
+    ], 3));
+    geometry.setAttribute('uv', new THREE.Float32BufferAttribute([
+        0, 1, 1, 1, 0, 0, 1, 0,
+        0, 1, 1, 1, 0, 0, 1, 0
+    ], 2));
+    geometry.setIndex([0, 2, 1, 2, 3, 1, 4, 6, 5, 6, 7, 5]);
+    geometry.addGroup(0, 6, 4);
+    geometry.addGroup(6, 6, 5);
+    return geometry;
+}
+
+const _frustum = new THREE.Frustum();
+const _viewProjection = new THREE.Matrix4();
+const _position = new THREE.Vector3();
+const NO_OBJECTS = [];
+
+export class CardLod {
+    #camera;
+    #renderer;
+    #boxGeometry;
+    #impostorGeometry;
+    #impostorPixels;
+    #residency;
+    #needed = new Set(); // Reused every update, as is everything below
+    #seen = new Set();
+    #last = { viewProjection: new THREE.Matrix4(), cards: null, cardCount: -1, objects: null, objectCount: -1, keep: [] };
+    #stats = { impostors: 0, culled: 0, onScreenTextures: 0, reused: 0 };
+
+    // `geometry` is the cards' shared box; `residency` a TextureResidency.
+    constructor(camera, renderer, { geometry, thickness, residency, impostorPixels = 48 }) {
+        this.#camera = camera;
+        this.#renderer = renderer;
+        this.#boxGeometry = geometry;
+        this.#impostorGeometry = createImpostorGeometry(thickness);
+        this.#impostorPixels = impostorPixels;
+        this.#residency = residency;
+    }
+
+    // Counts from the last update that walked the cards; `reused` counts the
+    // updates that did not need to.
+    get stats() {
+        return { ...this.#stats };
+    }
+
+    // Height in device pixels that `card` covers, or 0 when it is outside the
+    // view frustum.
+    screenHeight(card) {
+        if (!_frustum.intersectsObject(card)) return 0;
+        const distance = _position.setFromMatrixPosition(card.matrixWorld).distanceTo(this.#camera.position);
+        const visibleHeight = 2 * Math.max(distance, 1e-3) * Math.tan(THREE.MathUtils.degToRad(this.#camera.fov) / 2);
+        return (card.userData.cardHeight / visibleHeight) * this.#renderer.domElement.height;
+    }
+
+    // `cards`: the app's card meshes (pooled unit boxes). `objects`: other
+    // meshes whose textures are managed the same way, e.g. binder pages.
+    // Textures of cards in `keep` count as needed even while hidden.
+    // `settled` promises that no card moved, faded or changed texture since the
+    // last update (e.g. a frame drawn only to spin the selected card); if the
+    // camera, `cards`, `objects` and `keep` are unchanged too, the last result
+    // is handed to the residency again instead of walking every card.
+    update(cards, { objects = NO_OBJECTS, keep = NO_OBJECTS, settled = false } = {}) {
+        const now = performance.now();
+        this.#camera.updateMatrixWorld();
+        _viewProjection.multiplyMatrices(this.#camera.projectionMatrix, this.#camera.matrixWorldInverse);
+        if (settled && this.#unchanged(cards, objects, keep)) {
+            this.#stats.reused++;
+            this.#residency.update(this.#needed, this.#seen, now);
+            return;
+        }
+        this.#remember(cards, objects, keep);
+        _frustum.setFromProjectionMatrix(_viewProjection);
+        const needed = this.#needed;
+        const seen = this.#seen;
+        needed.clear();
+        seen.clear();
+        let impostors = 0;
+        let culled = 0;
+
+        for (const card of cards) {
+            if (card.visible) card.updateMatrixWorld(); // Hidden cards of a large collection cost nothing here
+            const height = card.visible && card.parent ? this.screenHeight(card) : 0;
+            const onScreen = height > 0;
+            if (card.visible && !onScreen) culled++;
+            if (onScreen) {
+                const impostor = height < this.#impostorPixels;
+                card.geometry = impostor ? this.#impostorGeometry : this.#boxGeometry;
+                if (impostor) impostors++;
+            }
+            this.#collect(card.material, onScreen || keep.includes(card) ? needed : seen);
+        }
+        for (const object of objects) {
+            const onScreen = object.visible && object.parent?.visible !== false && _frustum.intersectsObject(object);
+            if (!onScreen) culled++;
+            this.#collect(object.material, onScreen ? needed : seen);
+        }
+
+        this.#residency.update(needed, seen, now);
+        this.#stats.impostors = impostors;
+        this.#stats.culled = culled;
+        this.#stats.onScreenTextures = needed.size;
+    }
+
+    dispose() {
+        this.#impostorGeometry.dispose();
+    }
+
+    #unchanged(cards, objects, keep) {
+        const last = this.#last;
+        if (!last.viewProjection.equals(_viewProjection)) return false;
+        if (last.cards !== cards || last.cardCount !== cards.length) return false;
+        if (last.objects !== objects || last.objectCount !== objects.length) return false;
+        if (last.keep.length !== keep.length) return false;
+        for (let i = 0; i < keep.length; i++) {
+            if (last.keep[i] !== keep[i]) return false;
+        }
+        return true;
+    }
+
+    #remember(cards, objects, keep) {
+        const last = this.#last;
+        last.viewProjection.copy(_viewProjection);
+        last.cards = cards;
+        last.cardCount = cards.length;
+        last.objects = objects;
+        last.objectCount = objects.length;
+        last.keep.length = keep.length;
+        for (let i = 0; i < keep.length; i++) last.keep[i] = keep[i];
+    }
+
+    #collect(material, into) {
+        if (!Array.isArray(material)) {
+            this.#collectMap(material, into);
+            return;
+        }
+        for (let i = 0; i < material.length; i++) this.#collectMap(material[i], into);
+    }
+
+    #collectMap(material, into) {
+        const texture = material?.map;
+        // Tiny placeholder textures are not worth the re-upload
+        if (texture?.image && texture.image.width > BLANK_SIZE) into.add(texture);
+    }
+}
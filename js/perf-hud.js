@@ -0,0 +1,187 @@
+// Performance HUD and sample recorder.
+//
+// Only loaded when the page is opened with `?perf` (or through
+// `tradingCardApp.enablePerf()`), so a normal session never imports this
+// module and the render loop never times a frame. Once started, every drawn
+// frame and a once-a-second idle tick record one sample into a fixed-size
+// ring buffer; the overlay reads the newest samples a few times a second and
+// the buffer can be downloaded as JSON for offline comparison.
+
+// Sample columns, in the order they are stored and exported.
+export const PERF_FIELDS = [
+    'time', // performance.now() when the sample was taken
+    'frameMs', // time since the previous drawn frame; 0 for idle ticks
+    'renderMs', // CPU time spent inside renderer.render()
+    'drawCalls',
+    'triangles',
+    'geometries',
+    'textures',
+    'liveCards',
+    'textureBytes', // estimated bytes of shared textures resident on the GPU
+    'pendingDecodes', // decoder jobs plus shared textures still loading
+    'cacheHits', // cumulative texture cache hits
+    'cacheMisses'
+];
+
+const IDLE_SAMPLE_MS = 1000;
+const HUD_REFRESH_MS = 250;
+const HUD_WINDOW = 120; // Frames summarised by the overlay
+
+export class PerfMonitor {
+    #scheduler;
+    #readMetrics;
+    #capacity;
+    #columns;
+    #head = 0;
+    #count = 0;
+    #lastFrameTime = null;
+    #removeListener = null;
+    #idleTimer = null;
+    #hud = null;
+    #hudTimer = null;
+
+    // `readMetrics()` returns the app's `metrics` object; it is called once
+    // per sample, right after a frame has been drawn.
+    constructor(scheduler, readMetrics, { capacity = 3600 } = {}) {
+        this.#scheduler = scheduler;
+        this.#readMetrics = readMetrics;
+        this.#capacity = capacity;
+        this.#columns = PERF_FIELDS.map(() => new Float64Array(capacity));
+    }
+
+    get running() {
+        return this.#removeListener !== null;
+    }
+
+    get size() {
+        return this.#count;
+    }
+
+    start({ hud = true } = {}) {
+        if (this.running) return this;
+        this.#removeListener = this.#scheduler.addFrameListener((time, delta, renderMs) => {
+            const frameMs = this.#lastFrameTime === null ? 0 : time - this.#lastFrameTime;
+            this.#lastFrameTime = time;
+            this.#record(frameMs, renderMs);
+        });
+        // Decodes and cache traffic happen between frames too
+        this.#idleTimer = setInterval(() => {
+            if (this.#scheduler.idle) {
+                this.#lastFrameTime = null;
+                this.#record(0, 0);
+            }
+        }, IDLE_SAMPLE_MS);
+        if (hud) this.#showHud();
+        return this;
+    }
+
+    stop() {
+        if (!this.running) return;
+        this.#removeListener();
+        this.#removeListener = null;
+        clearInterval(this.#idleTimer);
+        clearInterval(this.#hudTimer);
+        this.#hud?.remove();
+        this.#hud = null;
+        this.#lastFrameTime = null;
+    }
+
+    clear() {
+        this.#head = 0;
+        this.#count = 0;
+    }
+
+    // Samples oldest first as plain objects keyed by PERF_FIELDS.
+    samples(limit = this.#count) {
+        const count = Math.min(limit, this.#count);
+        const first = (this.#head - count + this.#capacity) % this.#capacity;
+        const result = new Array(count);
+        for (let i = 0; i < count; i++) {
+            const slot = (first + i) % this.#capacity;
+            const sample = {};
+            PERF_FIELDS.forEach((field, column) => { sample[field] = this.#columns[column][slot]; });
+            result[i] = sample;
+        }
+        return result;
+    }
+
+    toJSON() {
+        return {
+            userAgent: navigator.userAgent,
+            devicePixelRatio: window.devicePixelRatio,
+            viewport: [window.innerWidth, window.innerHeight],
+            capturedAt: new Date().toISOString(),
+            fields: PERF_FIELDS,
+            samples: this.samples().map((sample) => PERF_FIELDS.map((field) => sample[field]))
+        };
+    }
+
+    download(filename = `card-perf-${Date.now()}.json`) {
+        const url = URL.createObjectURL(new Blob([JSON.stringify(this.toJSON())], { type: 'application/json' }));
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = filename;
+        link.click();
+        setTimeout(() => URL.revokeObjectURL(url), 0);
+    }
+
+    #record(frameMs, renderMs) {
+        const metrics = this.#readMetrics();
+        const values = [
+            performance.now(),
+            frameMs,
+            renderMs,
+            metrics.drawCalls,
+            metrics.triangles,
+            metrics.geometries,
+            metrics.textures,
+            metrics.cards.live,
+            metrics.sharedTextures.bytes,
+            metrics.pendingDecodes + metrics.sharedTextures.pending,
+            metrics.textureCache.hits,
+            metrics.textureCache.misses
+        ];
+        const slot = this.#head;
+        values.forEach((value, column) => { this.#columns[column][slot] = value; });
+        this.#head = (slot + 1) % this.#capacity;
+        this.#count = Math.min(this.#count + 1, this.#capacity);
+    }
+
+    #showHud() {
+        const hud = document.createElement('div');
+        hud.style.cssText = 'position:fixed;top:8px;right:8px;z-index:1000;padding:6px 8px;' +
+            'background:rgba(0,0,0,0.7);color:#0f0;font:11px/1.4 monospace;white-space:pre;border-radius:4px;';
+        const text = document.createElement('div');
+        const button = document.createElement('button');
+        button.textContent = 'Download JSON';
+        button.style.cssText = 'margin-top:4px;font:11px monospace;cursor:pointer;';
+        button.addEventListener('click', () => this.download());
+        hud.append(text, button);
+        document.body.appendChild(hud);
+        this.#hud = hud;
+        this.#hudTimer = setInterval(() => { text.textContent = this.#summary(); }, HUD_REFRESH_MS);
+    }
+
+    #summary() {
+        const recent = this.samples(HUD_WINDOW);
+        if (recent.length === 0) return 'waiting for frames…';
+        const latest = recent[recent.length - 1];
+        const frames = recent.map((sample) => sample.frameMs).filter((ms) => ms > 0).sort((a, b) => a - b);
+        const renders = recent.map((sample) => sample.renderMs).filter((ms) => ms > 0);
+        const mean = frames.length ? frames.reduce((sum, ms) => sum + ms, 0) / frames.length : 0;
+        const p95 = frames.length ? frames[Math.min(frames.length - 1, Math.floor(frames.length * 0.95))] : 0;
+        const render = renders.length ? renders.reduce((sum, ms) => sum + ms, 0) / renders.length : 0;
+        const lookups = latest.cacheHits + latest.cacheMisses;
+        return [
+            `fps     ${mean ? (1000 / mean).toFixed(0) : '-'}  (p95 ${p95.toFixed(1)} ms)`,
+            `render  ${render.toFixed(2)} ms`,
+            `calls   ${latest.drawCalls}  tris ${latest.triangles}`,
+            `geoms   ${latest.geometries}  tex ${latest.textures}`,
+            `cards   ${latest.liveCards}`,
+            `texMB   ${(latest.textureBytes / (1024 * 1024)).toFixed(1)}`,
+            `decodes ${latest.pendingDecodes}`,
+            `cache   ${lookups ? ((100 * latest.cacheHits) / lookups).toFixed(0) : '-'}% of ${lookups}`,
+            `samples ${this.#count}/${this.#capacity}`
+        ].join('\n');
+    }
+}
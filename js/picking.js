@@ -0,0 +1,141 @@
+// Ray picking against large numbers of cards.
+//
+// CardBvh is a bounding-volume hierarchy over axis-aligned boxes, built once
+// per layout into flat typed arrays. A pick walks it with a preallocated
+// stack, nearest node first, and only tests the boxes of leaves the ray
+// actually crosses, so hovering over a binder of thousands of cards touches a
+// few dozen boxes instead of every instance. Nothing is allocated per pick.
+
+const LEAF_SIZE = 4;
+const STACK_SIZE = 64; // Depth of a median-split tree over 2^32 boxes is far below this
+
+// Entry distance of the ray (origin o, inverse direction i) into the box at
+// `offset` in `b`, or Infinity if it misses or the box lies beyond `far`.
+function hitBox(b, offset, ox, oy, oz, ix, iy, iz, far) {
+    let t1 = (b[offset] - ox) * ix;
+    let t2 = (b[offset + 3] - ox) * ix;
+    let near = Math.min(t1, t2);
+    let exit = Math.max(t1, t2);
+    t1 = (b[offset + 1] - oy) * iy;
+    t2 = (b[offset + 4] - oy) * iy;
+    near = Math.max(near, Math.min(t1, t2));
+    exit = Math.min(exit, Math.max(t1, t2));
+    t1 = (b[offset + 2] - oz) * iz;
+    t2 = (b[offset + 5] - oz) * iz;
+    near = Math.max(near, Math.min(t1, t2));
+    exit = Math.min(exit, Math.max(t1, t2));
+    if (exit < Math.max(near, 0) || near > far) return Infinity;
+    return Math.max(near, 0);
+}
+
+export class CardBvh {
+    #boxes; // 6 floats per item: min x, y, z, max x, y, z
+    #items; // Item indices, grouped so every leaf owns a contiguous run
+    #bounds; // 6 floats per node
+    #nodes; // 2 per node: leaf: first slot in #items and count; inner: right child and 0
+    #nodeCount = 0;
+    #stack = new Uint32Array(STACK_SIZE);
+
+    // `boxes`: Float32Array of min x, y, z, max x, y, z per item.
+    constructor(boxes) {
+        const count = boxes.length / 6;
+        this.#boxes = boxes;
+        this.#items = new Uint32Array(count);
+        for (let i = 0; i < count; i++) this.#items[i] = i;
+        this.#bounds = new Float32Array(Math.max(1, 2 * count) * 6);
+        this.#nodes = new Uint32Array(Math.max(1, 2 * count) * 2);
+        if (count > 0) this.#build(0, count);
+    }
+
+    get size() {
+        return this.#items.length;
+    }
+
+    // Index of the item whose box the ray enters first, or -1. The ray is given
+    // in the boxes' space as origin and direction components.
+    raycast(ox, oy, oz, dx, dy, dz, far = Infinity) {
+        if (this.#nodeCount === 0) return -1;
+        // A zero component would turn an edge-on slab into 0 * Infinity = NaN
+        const ix = 1 / (dx || 1e-12);
+        const iy = 1 / (dy || 1e-12);
+        const iz = 1 / (dz || 1e-12);
+        const bounds = this.#bounds;
+        const nodes = this.#nodes;
+        const stack = this.#stack;
+        let best = -1;
+        let bestDistance = far;
+        let top = 0;
+        if (hitBox(bounds, 0, ox, oy, oz, ix, iy, iz, bestDistance) === Infinity) return -1;
+        stack[top++] = 0;
+        while (top > 0) {
+            const node = stack[--top];
+            const count = nodes[node * 2 + 1];
+            if (count > 0) {
+                const first = nodes[node * 2];
+                for (let i = first; i < first + count; i++) {
+                    const item = this.#items[i];
+                    const distance = hitBox(this.#boxes, item * 6, ox, oy, oz, ix, iy, iz, bestDistance);
+                    if (distance !== Infinity && (distance < bestDistance || best < 0)) {
+                        best = item;
+                        bestDistance = distance;
+                    }
+                }
+                continue;
+            }
+            const left = node + 1;
+            const right = nodes[node * 2];
+            const leftDistance = hitBox(bounds, left * 6, ox, oy, oz, ix, iy, iz, bestDistance);
+            const rightDistance = hitBox(bounds, right * 6, ox, oy, oz, ix, iy, iz, bestDistance);
+            // Push the farther child first so the nearer one is searched first
+            // and can rule the other out.
+            if (leftDistance <= rightDistance) {
+                if (rightDistance !== Infinity) stack[top++] = right;
+                if (leftDistance !== Infinity) stack[top++] = left;
+            } else {
+                if (leftDistance !== Infinity) stack[top++] = left;
+                stack[top++] = right;
+            }
+        }
+        return best;
+    }
+
+    // Builds the subtree for items[start, end) depth first, so a node's left
+    // child always directly follows it.
+    #build(start, end) {
+        const node = this.#nodeCount++;
+        const bounds = this.#bounds;
+        const boxes = this.#boxes;
+        let minCx = Infinity, minCy = Infinity, minCz = Infinity;
+        let maxCx = -Infinity, maxCy = -Infinity, maxCz = -Infinity;
+        bounds.fill(Infinity, node * 6, node * 6 + 3);
+        bounds.fill(-Infinity, node * 6 + 3, node * 6 + 6);
+        for (let i = start; i < end; i++) {
+            const offset = this.#items[i] * 6;
+            for (let axis = 0; axis < 3; axis++) {
+                bounds[node * 6 + axis] = Math.min(bounds[node * 6 + axis], boxes[offset + axis]);
+                bounds[node * 6 + 3 + axis] = Math.max(bounds[node * 6 + 3 + axis], boxes[offset + 3 + axis]);
+            }
+            const cx = boxes[offset] + boxes[offset + 3];
+            const cy = boxes[offset + 1] + boxes[offset + 4];
+            const cz = boxes[offset + 2] + boxes[offset + 5];
+            minCx = Math.min(minCx, cx); maxCx = Math.max(maxCx, cx);
+            minCy = Math.min(minCy, cy); maxCy = Math.max(maxCy, cy);
+            minCz = Math.min(minCz, cz); maxCz = Math.max(maxCz, cz);
+        }
+        const extents = [maxCx - minCx, maxCy - minCy, maxCz - minCz];
+        const axis = extents.indexOf(Math.max(...extents));
+        if (end - start <= LEAF_SIZE || extents[axis] === 0) {
+            this.#nodes[node * 2] = start;
+            this.#nodes[node * 2 + 1] = end - start;
+            return node;
+        }
+        // Median split along the widest spread of box centres
+        const centre = (item) => boxes[item * 6 + axis] + boxes[item * 6 + 3 + axis];
+        this.#items.subarray(start, end).sort((a, b) => centre(a) - centre(b));
+        const middle = (start + end) >> 1;
+        this.#build(start, middle);
+        this.#nodes[node * 2] = this.#build(middle, end);
+        this.#nodes[node * 2 + 1] = 0;
+        return node;
+    }
+}
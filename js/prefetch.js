@@ -0,0 +1,109 @@
+// Idle-time prefetching with a concurrency cap and a memory budget.
+//
+// Callers describe what they will probably need next as jobs in priority
+// order; `schedule()` replaces the previous wish list, so queued jobs that
+// are no longer wanted are dropped and running ones see their AbortSignal
+// fire. Jobs only start from requestIdleCallback, never more than
+// `concurrency` at a time, and not at all once the estimated bytes of
+// finished and running jobs would exceed `budgetBytes`. Finished jobs count
+// until `forget()` hands their bytes back, once what they loaded is gone.
+const requestIdle = window.requestIdleCallback
+    ? (callback) => window.requestIdleCallback(callback, { timeout: 500 })
+    : (callback) => setTimeout(() => callback({ timeRemaining: () => 8, didTimeout: false }), 50);
+
+export class PrefetchQueue {
+    #concurrency;
+    #budgetBytes;
+    #queue = []; // [{ key, bytes, run }]
+    #running = new Map(); // key -> { controller, bytes }
+    #done = new Map(); // key -> bytes
+    #bytes = 0;
+    #idleHandle = null;
+    #stats = { started: 0, completed: 0, cancelled: 0, failed: 0, skipped: 0 };
+
+    constructor({ concurrency = 2, budgetBytes = 64 * 1024 * 1024 } = {}) {
+        this.#concurrency = concurrency;
+        this.#budgetBytes = budgetBytes;
+    }
+
+    get stats() {
+        return { ...this.#stats, queued: this.#queue.length, running: this.#running.size, bytes: this.#bytes };
+    }
+
+    // `jobs`: [{ key, bytes, run(signal) -> Promise }], most wanted first.
+    // Keys already prefetched are skipped; running jobs missing from `jobs`
+    // are aborted.
+    schedule(jobs) {
+        const wanted = new Set(jobs.map((job) => job.key));
+        for (const [key, running] of this.#running) {
+            if (!wanted.has(key)) {
+                running.controller.abort();
+                this.#stats.cancelled++;
+            }
+        }
+        this.#stats.cancelled += this.#queue.filter((job) => !wanted.has(job.key)).length;
+        this.#queue = jobs.filter((job) => !this.#done.has(job.key) && !this.#running.has(job.key));
+        this.#requestIdle();
+    }
+
+    // Returns a key's share of the budget once its textures were evicted or its
+    // card disposed; the key may then be prefetched again.
+    forget(key) {
+        const bytes = this.#done.get(key);
+        if (bytes === undefined) return;
+        this.#done.delete(key);
+        this.#bytes -= bytes;
+    }
+
+    clear() {
+        this.schedule([]);
+        this.#done.clear();
+        this.#bytes = [...this.#running.values()].reduce((sum, running) => sum + running.bytes, 0);
+    }
+
+    #requestIdle() {
+        if (this.#idleHandle !== null || this.#queue.length === 0) return;
+        this.#idleHandle = requestIdle((deadline) => {
+            this.#idleHandle = null;
+            this.#startJobs(deadline);
+        });
+    }
+
+    #startJobs(deadline) {
+        while (this.#queue.length > 0 && this.#running.size < this.#concurrency &&
+            (deadline.didTimeout || deadline.timeRemaining() > 1)) {
+            const job = this.#queue.shift();
+            if (this.#bytes + job.bytes > this.#budgetBytes) {
+                this.#stats.skipped++;
+                continue;
+            }
+            this.#start(job);
+        }
+        if (this.#running.size < this.#concurrency) this.#requestIdle();
+    }
+
+    async #start({ key, bytes, run }) {
+        const controller = new AbortController();
+        this.#running.set(key, { controller, bytes });
+        this.#bytes += bytes;
+        this.#stats.started++;
+        let succeeded = false;
+        try {
+            await run(controller.signal);
+            succeeded = !controller.signal.aborted;
+        } catch (error) {
+            if (!controller.signal.aborted) {
+                this.#stats.failed++;
+                console.warn('Prefetch failed:', error);
+            }
+        }
+        this.#running.delete(key);
+        if (succeeded) {
+            this.#done.set(key, bytes);
+            this.#stats.completed++;
+        } else {
+            this.#bytes -= bytes;
+        }
+        this.#requestIdle();
+    }
+}
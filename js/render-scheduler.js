@@ -0,0 +1,113 @@
+// On-demand render loop.
+//
+// Nothing is drawn unless something changed: callers either `invalidate()`
+// after a one-off change (drag, zoom, texture upload) or register an
+// animation that runs once per frame for as long as it reports it is still
+// moving (rotation, flips, fades). When neither is pending no
+// requestAnimationFrame is outstanding at all, so an idle viewer costs no
+// CPU or GPU time.
+export class RenderScheduler {
+    #render;
+    #animations = new Set();
+    #frameListeners = new Set();
+    #dirty = false;
+    #frameHandle = null;
+    #inTick = false;
+    #lastFrameTime = null;
+    #idleSince = performance.now();
+    #frameInterval = 1000 / 60; // Refined from observed frame deltas
+    #stats = { rendered: 0, skipped: 0, invalidations: 0 };
+
+    // `render(time, deltaSeconds, invalidated)` draws one frame; `invalidated`
+    // is false when only running animations asked for it.
+    constructor(render) {
+        this.#render = render;
+    }
+
+    // Frames drawn, and frames an unconditional loop would have drawn but this
+    // scheduler skipped because nothing changed.
+    get stats() {
+        const idleFrames = this.#frameHandle === null ? this.#idleFrames(performance.now()) : 0;
+        return { ...this.#stats, skipped: this.#stats.skipped + idleFrames };
+    }
+
+    // True when no frame is queued or running and no animation is active.
+    get idle() {
+        return this.#frameHandle === null && !this.#inTick && this.#animations.size === 0;
+    }
+
+    resetStats() {
+        this.#stats = { rendered: 0, skipped: 0, invalidations: 0 };
+        if (this.#frameHandle === null) this.#idleSince = performance.now();
+    }
+
+    invalidate() {
+        this.#stats.invalidations++;
+        this.#dirty = true;
+        this.#schedule();
+    }
+
+    // `update(deltaSeconds, time)` runs before every frame until it returns
+    // false. Returns a function that removes the animation early.
+    addAnimation(update) {
+        this.#animations.add(update);
+        this.#schedule();
+        return () => this.#animations.delete(update);
+    }
+
+    // `listener(time, deltaSeconds, renderMs)` is called after every frame that
+    // was drawn. Returns a function that removes it. Frames are only timed
+    // while at least one listener is registered.
+    addFrameListener(listener) {
+        this.#frameListeners.add(listener);
+        return () => this.#frameListeners.delete(listener);
+    }
+
+    #schedule() {
+        // Work queued while a frame is running is picked up at the end of it.
+        if (this.#frameHandle !== null || this.#inTick) return;
+        const now = performance.now();
+        this.#stats.skipped += this.#idleFrames(now);
+        this.#lastFrameTime = null;
+        this.#frameHandle = requestAnimationFrame((time) => this.#tick(time));
+    }
+
+    #idleFrames(now) {
+        return Math.floor((now - this.#idleSince) / this.#frameInterval);
+    }
+
+    #tick(time) {
+        this.#frameHandle = null;
+        this.#inTick = true;
+        const delta = this.#lastFrameTime === null ? 1 / 60 : (time - this.#lastFrameTime) / 1000;
+        if (this.#lastFrameTime !== null) {
+            this.#frameInterval = this.#frameInterval * 0.9 + (time - this.#lastFrameTime) * 0.1;
+        }
+        this.#lastFrameTime = time;
+
+        const animated = this.#animations.size > 0;
+        for (const update of this.#animations) {
+            if (update(delta, time) === false) this.#animations.delete(update);
+        }
+        if (this.#dirty || animated) {
+            const invalidated = this.#dirty;
+            this.#dirty = false;
+            if (this.#frameListeners.size === 0) {
+                this.#render(time, delta, invalidated);
+            } else {
+                const start = performance.now();
+                this.#render(time, delta, invalidated);
+                const renderMs = performance.now() - start;
+                this.#frameListeners.forEach((listener) => listener(time, delta, renderMs));
+            }
+            this.#stats.rendered++;
+        }
+
+        this.#inTick = false;
+        if (this.#animations.size > 0 || this.#dirty) {
+            this.#frameHandle = requestAnimationFrame((next) => this.#tick(next));
+        } else {
+            this.#idleSince = performance.now();
+        }
+    }
+}
@@ -0,0 +1,180 @@
+// Adaptive render resolution.
+//
+// At full quality the scene is drawn straight to the canvas, with the canvas's
+// own MSAA. Lower levels draw into an offscreen target that is scaled onto the
+// canvas, so resolution and MSAA sample count can change from one frame to the
+// next without resizing the canvas or recreating the WebGL context. While
+// something is moving, the governor watches frame intervals: a window of late
+// frames steps quality down one level (MSAA first, then render scale), and
+// after enough windows on target it tries one level up again, waiting twice as
+// long before the next try whenever a try has to be undone. Once nothing has
+// been drawn for `stillMs` it draws one frame at full resolution with full
+// MSAA, so a card at rest, and any screenshot of it, is always sharp.
+import * as THREE from 'three';
+
+const WINDOW = 20; // Frames per decision
+const LATE_FACTOR = 1.25; // A frame this much over budget counts as late
+const UPGRADE_WINDOWS = 6; // On-target windows before trying a level up
+const MAX_UPGRADE_WINDOWS = 96;
+const MAX_FRAME_MS = 250; // Longer gaps are pauses, not slow frames
+const SCALES = [0.85, 0.7, 0.6, 0.5];
+
+const _size = new THREE.Vector2();
+
+export class ResolutionGovernor {
+    #renderer;
+    #scheduler;
+    #levels;
+    #level = 0; // Quality used while moving, 0 is full
+    #targetMs;
+    #stillMs;
+    #frames = 0;
+    #late = 0;
+    #goodWindows = 0;
+    #upgradeWindows = UPGRADE_WINDOWS;
+    #probing = false;
+    #lastFrame = -Infinity;
+    #stillTimer = null;
+    #settling = false;
+    #plainTarget = null;
+    #msaaTarget = null;
+    #blitScene = new THREE.Scene();
+    #blitCamera = new THREE.OrthographicCamera(-1, 1, 1, -1, 0, 1);
+    #blitMaterial = new THREE.MeshBasicMaterial({ blending: THREE.NoBlending, depthTest: false, depthWrite: false });
+    #stats = { downgrades: 0, upgrades: 0, failedUpgrades: 0, sharpFrames: 0 };
+
+    // Full quality uses whatever MSAA the canvas was created with, so create
+    // `renderer` with `antialias`; lower MSAA levels need WebGL2.
+    constructor(renderer, scheduler, { targetFps = 60, stillMs = 200, minScale = 0.5 } = {}) {
+        this.#renderer = renderer;
+        this.#scheduler = scheduler;
+        this.#targetMs = 1000 / targetFps;
+        this.#stillMs = stillMs;
+        const gl = renderer.getContext();
+        const samples = gl.getParameter(gl.SAMPLES);
+        this.#levels = [{ scale: 1, samples, direct: true }];
+        if (renderer.capabilities.isWebGL2) {
+            for (let s = samples >> 1; s >= 2; s >>= 1) this.#levels.push({ scale: 1, samples: s });
+        }
+        if (samples > 0) this.#levels.push({ scale: 1, samples: 0 });
+        for (const scale of SCALES) if (scale >= minScale) this.#levels.push({ scale, samples: 0 });
+        this.#blitScene.add(new THREE.Mesh(new THREE.PlaneGeometry(2, 2), this.#blitMaterial));
+    }
+
+    get stats() {
+        const { scale, samples } = this.#levels[this.#level];
+        return {
+            ...this.#stats,
+            level: this.#level,
+            scale,
+            samples,
+            pixelRatio: Math.round(this.#renderer.getPixelRatio() * scale * 100) / 100
+        };
+    }
+
+    // Draws one frame; call from the render scheduler's render callback.
+    // `deltaSeconds` is the scheduler's time since the previous frame.
+    render(scene, camera, deltaSeconds) {
+        const sharp = this.#settling;
+        this.#settling = false;
+        this.#lastFrame = performance.now();
+        if (sharp) {
+            this.#draw(scene, camera, this.#levels[0]);
+            this.#stats.sharpFrames++;
+            return;
+        }
+        this.#draw(scene, camera, this.#levels[this.#level]);
+        const frameMs = deltaSeconds * 1000;
+        if (frameMs < MAX_FRAME_MS) this.#observe(frameMs);
+        if (this.#level > 0) this.#waitForStill();
+    }
+
+    dispose() {
+        clearTimeout(this.#stillTimer);
+        this.#plainTarget?.dispose();
+        this.#msaaTarget?.dispose();
+        this.#blitMaterial.dispose();
+        this.#blitScene.children[0].geometry.dispose();
+    }
+
+    #draw(scene, camera, { scale, samples, direct = false }) {
+        const renderer = this.#renderer;
+        if (direct) {
+            renderer.setRenderTarget(null);
+            renderer.render(scene, camera);
+            return;
+        }
+        renderer.getDrawingBufferSize(_size);
+        const width = Math.max(1, Math.round(_size.x * scale));
+        const height = Math.max(1, Math.round(_size.y * scale));
+        const target = this.#targetFor(samples);
+        target.setSize(width, height); // No-op unless the size changed
+        renderer.setRenderTarget(target);
+        renderer.render(scene, camera);
+        renderer.setRenderTarget(null);
+        this.#blitMaterial.map = target.texture;
+        renderer.render(this.#blitScene, this.#blitCamera);
+    }
+
+    #targetFor(samples) {
+        if (samples === 0) {
+            this.#plainTarget ??= new THREE.WebGLRenderTarget(1, 1);
+            return this.#plainTarget;
+        }
+        if (this.#msaaTarget?.samples !== samples) {
+            // The sample count is fixed when the buffers are allocated
+            this.#msaaTarget?.dispose();
+            this.#msaaTarget = new THREE.WebGLMultisampleRenderTarget(1, 1);
+            this.#msaaTarget.samples = samples;
+        }
+        return this.#msaaTarget;
+    }
+
+    #observe(frameMs) {
+        this.#frames++;
+        if (frameMs > this.#targetMs * LATE_FACTOR) this.#late++;
+        if (this.#frames < WINDOW) return;
+        const late = this.#late;
+        this.#frames = 0;
+        this.#late = 0;
+        if (late > WINDOW / 4) {
+            if (this.#probing) {
+                this.#stats.failedUpgrades++;
+                this.#upgradeWindows = Math.min(MAX_UPGRADE_WINDOWS, this.#upgradeWindows * 2);
+            }
+            this.#probing = false;
+            this.#goodWindows = 0;
+            if (this.#level < this.#levels.length - 1) {
+                this.#level++;
+                this.#stats.downgrades++;
+            }
+        } else if (late === 0) {
+            if (this.#probing) this.#upgradeWindows = UPGRADE_WINDOWS;
+            this.#probing = false;
+            if (this.#level > 0 && ++this.#goodWindows >= this.#upgradeWindows) {
+                this.#level--;
+                this.#probing = true;
+                this.#goodWindows = 0;
+                this.#stats.upgrades++;
+            }
+        } else {
+            this.#goodWindows = 0;
+        }
+    }
+
+    // One timer per still period, re-armed while frames keep coming.
+    #waitForStill() {
+        if (this.#stillTimer !== null) return;
+        const check = () => {
+            const quiet = performance.now() - this.#lastFrame;
+            if (quiet < this.#stillMs) {
+                this.#stillTimer = setTimeout(check, this.#stillMs - quiet);
+                return;
+            }
+            this.#stillTimer = null;
+            this.#settling = true;
+            this.#scheduler.invalidate();
+        };
+        this.#stillTimer = setTimeout(check, this.#stillMs);
+    }
+}
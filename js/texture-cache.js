@@ -0,0 +1,187 @@
+// Persistent cache of card images in IndexedDB.
+//
+// Entries are encoded image blobs (server tiers, atlas pages, downscaled
+// uploads) keyed by the same 20-hex-digit SHA-256 prefix the asset server uses
+// to name its files, so a content-addressed URL maps straight to its key with
+// no lookup. Anything else (other URLs, uploaded files) is remembered through
+// an alias to the hash of what was stored for it. Total size is held under
+// `budgetBytes` by evicting the least recently used entries. Where IndexedDB
+// is unavailable (private browsing, blocked storage) every lookup misses and
+// nothing is stored.
+const DB_VERSION = 1;
+const HASH_RE = /\/([0-9a-f]{20})\.(?:jpg|png|webp|ktx2)(?:[?#]|$)/;
+
+function request(idbRequest) {
+    return new Promise((resolve, reject) => {
+        idbRequest.onsuccess = () => resolve(idbRequest.result);
+        idbRequest.onerror = () => reject(idbRequest.error);
+    });
+}
+
+function transactionDone(transaction) {
+    return new Promise((resolve, reject) => {
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = transaction.onabort = () => reject(transaction.error);
+    });
+}
+
+async function fetchBlob(url) {
+    const response = await fetch(url, { mode: 'cors' });
+    if (!response.ok) throw new Error(`HTTP ${response.status} for ${url}`);
+    return response.blob();
+}
+
+export class TextureCache {
+    #name;
+    #budgetBytes;
+    #db;
+    #entries = new Map(); // hash -> { hash, bytes, lastUsed }
+    #bytes = 0;
+    #stats = { hits: 0, misses: 0, evictions: 0 };
+
+    constructor({ name = 'card-textures', budgetBytes = 256 * 1024 * 1024 } = {}) {
+        this.#name = name;
+        this.#budgetBytes = budgetBytes;
+        this.#db = this.#open().catch((error) => {
+            console.warn('Texture cache disabled:', error);
+            return null;
+        });
+    }
+
+    // The content hash in a content-addressed asset URL, or null.
+    static hashFromUrl(url) {
+        return HASH_RE.exec(url)?.[1] ?? null;
+    }
+
+    // SHA-256 prefix of the blob's bytes, in the asset server's format.
+    static async hashBlob(blob) {
+        const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return Array.from(new Uint8Array(digest).slice(0, 10), (b) => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    get budgetBytes() {
+        return this.#budgetBytes;
+    }
+
+    get stats() {
+        return { ...this.#stats, entries: this.#entries.size, bytes: this.#bytes };
+    }
+
+    // Whether `hash` is stored, from the in-memory index (no IndexedDB read).
+    has(hash) {
+        return this.#entries.has(hash);
+    }
+
+    async get(hash) {
+        const db = await this.#db;
+        const entry = db && this.#entries.get(hash);
+        if (!entry) {
+            this.#stats.misses++;
+            return null;
+        }
+        const blob = await request(db.transaction('blobs').objectStore('blobs').get(hash));
+        if (!blob) {
+            this.#forget(hash);
+            this.#stats.misses++;
+            return null;
+        }
+        this.#stats.hits++;
+        entry.lastUsed = Date.now();
+        const transaction = db.transaction('entries', 'readwrite');
+        transaction.objectStore('entries').put(entry);
+        return blob;
+    }
+
+    // The hash stored under `alias`, or null.
+    async resolve(alias) {
+        const db = await this.#db;
+        if (!db) return null;
+        return (await request(db.transaction('aliases').objectStore('aliases').get(alias))) ?? null;
+    }
+
+    async put(hash, blob, { alias = null } = {}) {
+        const db = await this.#db;
+        if (!db || blob.size > this.#budgetBytes) return;
+        const entry = { hash, bytes: blob.size, lastUsed: Date.now() };
+        const transaction = db.transaction(['entries', 'blobs', 'aliases'], 'readwrite');
+        transaction.objectStore('entries').put(entry);
+        transaction.objectStore('blobs').put(blob, hash);
+        if (alias) transaction.objectStore('aliases').put(hash, alias);
+        await transactionDone(transaction);
+        this.#forget(hash);
+        this.#entries.set(hash, entry);
+        this.#bytes += entry.bytes;
+        await this.#evict();
+    }
+
+    // Returns the blob behind `url`, from the cache when possible and
+    // otherwise from `load()` or the network (storing it for next time).
+    async fetch(url, load = null) {
+        const contentHash = TextureCache.hashFromUrl(url);
+        const hash = contentHash ?? (await this.resolve(url));
+        const cached = hash && (await this.get(hash));
+        if (cached) return cached;
+        if (!hash) this.#stats.misses++;
+
+        const blob = load ? await load() : await fetchBlob(url);
+        const key = contentHash ?? (await TextureCache.hashBlob(blob));
+        this.put(key, blob, { alias: contentHash ? null : url }).catch((error) => console.warn('Texture cache write failed:', error));
+        return blob;
+    }
+
+    async clear() {
+        const db = await this.#db;
+        if (!db) return;
+        const transaction = db.transaction(['entries', 'blobs', 'aliases'], 'readwrite');
+        ['entries', 'blobs', 'aliases'].forEach((store) => transaction.objectStore(store).clear());
+        await transactionDone(transaction);
+        this.#entries.clear();
+        this.#bytes = 0;
+    }
+
+    async #open() {
+        if (typeof indexedDB === 'undefined') throw new Error('IndexedDB is not available');
+        const open = indexedDB.open(this.#name, DB_VERSION);
+        open.onupgradeneeded = () => {
+            const db = open.result;
+            db.createObjectStore('entries', { keyPath: 'hash' });
+            db.createObjectStore('blobs');
+            db.createObjectStore('aliases');
+        };
+        const db = await request(open);
+        // Sizes and access times are small enough to keep in memory, so
+        // eviction never has to scan the database.
+        const entries = await request(db.transaction('entries').objectStore('entries').getAll());
+        for (const entry of entries) {
+            this.#entries.set(entry.hash, entry);
+            this.#bytes += entry.bytes;
+        }
+        return db;
+    }
+
+    #forget(hash) {
+        const entry = this.#entries.get(hash);
+        if (!entry) return;
+        this.#entries.delete(hash);
+        this.#bytes -= entry.bytes;
+    }
+
+    async #evict() {
+        if (this.#bytes <= this.#budgetBytes) return;
+        const db = await this.#db;
+        const victims = [];
+        const byAge = [...this.#entries.values()].sort((a, b) => a.lastUsed - b.lastUsed);
+        for (const entry of byAge) {
+            if (this.#bytes <= this.#budgetBytes) break;
+            this.#forget(entry.hash);
+            victims.push(entry.hash);
+        }
+        this.#stats.evictions += victims.length;
+        const transaction = db.transaction(['entries', 'blobs'], 'readwrite');
+        for (const hash of victims) {
+            transaction.objectStore('entries').delete(hash);
+            transaction.objectStore('blobs').delete(hash);
+        }
+        await transactionDone(transaction);
+    }
+}
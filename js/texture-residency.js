@@ -0,0 +1,196 @@
+// Texture residency under a memory budget.
+//
+// Fed once per frame with the textures that are about to be drawn and the
+// ones that are still referenced but off screen (see CardLod). Off-screen
+// textures lose their GPU copy after `idleEvictMs`; their decoded image stays
+// on the texture, so three.js uploads it again the next time it is drawn.
+//
+// `budgetBytes` bounds the decoded textures held at all, each of which costs
+// its size again on the GPU whenever it is drawn. Over budget, the least
+// recently drawn off-screen textures that have a reloader (a URL or cache key
+// to decode from again) are evicted from the GPU and give up their decoded
+// image. The first frame that needs one again starts the reload; until it
+// lands the face shows a 1x1 placeholder.
+import { textureBytes } from './textures.js';
+
+let placeholder = null;
+
+function placeholderImage() {
+    if (!placeholder) {
+        placeholder = document.createElement('canvas');
+        placeholder.width = placeholder.height = 1;
+        const context = placeholder.getContext('2d');
+        context.fillStyle = '#fff';
+        context.fillRect(0, 0, 1, 1);
+    }
+    return placeholder;
+}
+
+export class TextureResidency {
+    #budgetBytes;
+    #idleEvictMs;
+    #onChange;
+    #onEvict;
+    #entries = new Map(); // texture -> { bytes, version, lastUsed, onGpu, dropped, reloading, failed }
+    #reloaders = new WeakMap(); // texture -> { reload, available }
+    #gpuBytes = 0;
+    #heldBytes = 0;
+    #wakeTimer = null;
+    #stats = { evictions: 0, dropped: 0, reloads: 0 };
+
+    // `onChange()` is called when a frame should be drawn: an eviction is due
+    // while nothing is rendering, or a reloaded image has arrived.
+    // `onEvict(texture)` is called whenever a texture loses its GPU copy.
+    constructor({ budgetBytes = 256 * 1024 * 1024, idleEvictMs = 3000, onChange = null, onEvict = null } = {}) {
+        this.#budgetBytes = budgetBytes;
+        this.#idleEvictMs = idleEvictMs;
+        this.#onChange = onChange;
+        this.#onEvict = onEvict;
+    }
+
+    get budgetBytes() {
+        return this.#budgetBytes;
+    }
+
+    set budgetBytes(bytes) {
+        this.#budgetBytes = bytes;
+        this.#onChange?.();
+    }
+
+    get stats() {
+        return {
+            ...this.#stats,
+            textures: this.#entries.size,
+            gpuBytes: this.#gpuBytes,
+            heldBytes: this.#heldBytes,
+            budgetBytes: this.#budgetBytes
+        };
+    }
+
+    // `reload()` resolves to a fresh image for `texture` after its decoded copy
+    // was dropped; `available()` says whether that is currently possible (e.g.
+    // the blob is still in the texture cache). Textures without a reloader only
+    // ever lose their GPU copy.
+    setReloader(texture, reload, available = () => true) {
+        this.#reloaders.set(texture, { reload, available });
+    }
+
+    // `needed`: textures drawn this frame or kept warm. `idle`: textures still
+    // referenced by something off screen. Anything in neither is forgotten.
+    update(needed, idle, now = performance.now()) {
+        for (const texture of needed) {
+            const entry = this.#entry(texture, now);
+            entry.lastUsed = now;
+            if (entry.dropped && texture.image !== placeholderImage()) this.#restored(entry); // Replaced by its owner
+            if (entry.dropped && !entry.failed) this.#reload(texture, entry);
+            if (!entry.onGpu) {
+                entry.onGpu = true;
+                this.#gpuBytes += entry.bytes;
+            }
+        }
+        let nextDue = Infinity;
+        const candidates = [];
+        for (const texture of idle) {
+            if (needed.has(texture)) continue;
+            const entry = this.#entry(texture, now);
+            if (entry.onGpu && now - entry.lastUsed >= this.#idleEvictMs) {
+                this.#evictGpu(texture, entry);
+            } else if (entry.onGpu) {
+                nextDue = Math.min(nextDue, entry.lastUsed + this.#idleEvictMs);
+            }
+            if (!entry.dropped) candidates.push([texture, entry]);
+        }
+        for (const [texture, entry] of this.#entries) {
+            if (needed.has(texture) || idle.has(texture)) continue;
+            // Released by its owner, who disposes it
+            if (entry.onGpu) this.#gpuBytes -= entry.bytes;
+            if (!entry.dropped) this.#heldBytes -= entry.bytes;
+            this.#entries.delete(texture);
+        }
+        if (this.#heldBytes > this.#budgetBytes) {
+            candidates.sort((a, b) => a[1].lastUsed - b[1].lastUsed);
+            for (const [texture, entry] of candidates) {
+                if (this.#heldBytes <= this.#budgetBytes) break;
+                this.#drop(texture, entry);
+            }
+        }
+        this.#scheduleWake(nextDue - now);
+    }
+
+    #entry(texture, now) {
+        let entry = this.#entries.get(texture);
+        if (!entry) {
+            // Assume a texture seen for the first time has been uploaded (the
+            // prefetcher warms hidden cards); eviction corrects it cheaply.
+            entry = { bytes: textureBytes(texture), version: texture.version, lastUsed: now, onGpu: true, dropped: false, reloading: null, failed: false };
+            this.#gpuBytes += entry.bytes;
+            this.#heldBytes += entry.bytes;
+            this.#entries.set(texture, entry);
+        } else if (entry.version !== texture.version && !entry.dropped) {
+            // A new image was put on the same texture (uploads reuse theirs)
+            const bytes = textureBytes(texture);
+            if (entry.onGpu) this.#gpuBytes += bytes - entry.bytes;
+            this.#heldBytes += bytes - entry.bytes;
+            entry.bytes = bytes;
+            entry.version = texture.version;
+        }
+        return entry;
+    }
+
+    #evictGpu(texture, entry) {
+        texture.dispose(); // Frees the GPU copy only; the image stays for re-upload
+        entry.onGpu = false;
+        this.#gpuBytes -= entry.bytes;
+        this.#stats.evictions++;
+        this.#onEvict?.(texture);
+    }
+
+    #drop(texture, entry) {
+        const reloader = this.#reloaders.get(texture);
+        if (!reloader?.available()) return;
+        if (entry.onGpu) this.#evictGpu(texture, entry);
+        texture.image.close?.();
+        texture.image = placeholderImage();
+        entry.dropped = true;
+        entry.failed = false;
+        this.#heldBytes -= entry.bytes;
+        this.#stats.dropped++;
+    }
+
+    #restored(entry) {
+        entry.dropped = false;
+        this.#heldBytes += entry.bytes;
+    }
+
+    #reload(texture, entry) {
+        if (entry.reloading) return;
+        entry.reloading = this.#reloaders.get(texture).reload().then(
+            (image) => {
+                entry.reloading = null;
+                if (texture.image !== placeholderImage()) {
+                    image.close?.(); // Replaced while reloading
+                    return;
+                }
+                texture.image = image;
+                texture.needsUpdate = true;
+                entry.version = texture.version;
+                this.#restored(entry);
+                this.#stats.reloads++;
+                this.#onChange?.();
+            },
+            (error) => {
+                entry.reloading = null;
+                entry.failed = true; // Not retried every frame; the placeholder stays
+                console.warn('Texture reload failed:', error);
+            }
+        );
+    }
+
+    #scheduleWake(delay) {
+        if (this.#wakeTimer !== null || !Number.isFinite(delay) || !this.#onChange) return;
+        this.#wakeTimer = setTimeout(() => {
+            this.#wakeTimer = null;
+            this.#onChange();
+        }, Math.max(0, delay) + 16);
+    }
+}
@@ -0,0 +1,124 @@
+import * as THREE from 'three';
+
+const BASIS_TRANSCODER_PATH = '/vendor/three/basis/';
+
+// Approximate GPU memory of a texture: compressed mip levels as stored,
+// otherwise RGBA8 plus a third for the mip chain.
+export function textureBytes(texture) {
+    if (texture.isCompressedTexture) {
+        return texture.mipmaps.reduce((sum, level) => sum + level.data.byteLength, 0);
+    }
+    const image = texture.image;
+    if (!image?.width) return 0;
+    const base = image.width * image.height * 4;
+    return texture.generateMipmaps ? Math.round(base * 4 / 3) : base;
+}
+
+// Reference-counted texture loads keyed by URL.
+//
+// Cards that show the same image (a set's common back, the pages of an atlas)
+// share one decode and one GPU upload. Every `acquire(url)` must be matched by
+// a `release(url)`; the texture is disposed when the last user lets go.
+// `.ktx2` URLs are transcoded with KTX2Loader, which is only downloaded the
+// first time a compressed texture is requested; other images are decoded off
+// the main thread by `decoder` (an ImageDecoder). With a `cache` (a
+// TextureCache) the file itself comes from IndexedDB when it has been seen
+// before, so warm reloads never go to the network. With a `residency` (a
+// TextureResidency) every decoded texture can be dropped under memory
+// pressure and decoded again from its URL. `load`, when given,
+// supplies the file's bytes instead of fetching `url` (e.g. out of a set
+// bundle); the texture is still keyed and cached by `url`.
+export class SharedTextures {
+    #renderer;
+    #decoder;
+    #cache;
+    #residency;
+    #entries = new Map();
+    #bytes = 0;
+    #ktx2Loader = null;
+
+    constructor(renderer, decoder, cache = null, residency = null) {
+        this.#renderer = renderer;
+        this.#decoder = decoder;
+        this.#cache = cache;
+        this.#residency = residency;
+    }
+
+    acquire(url, load = null) {
+        let entry = this.#entries.get(url);
+        if (!entry) {
+            entry = { refs: 0, texture: null, promise: null };
+            entry.promise = this.#load(url, load).then(
+                (texture) => {
+                    texture.userData.sharedUrl = url;
+                    if (!texture.isCompressedTexture) {
+                        this.#residency?.setReloader(texture, async () => (await this.#load(url, load)).image);
+                    }
+                    entry.texture = texture;
+                    entry.bytes = textureBytes(texture);
+                    this.#bytes += entry.bytes;
+                    if (entry.refs === 0) this.#evict(url, entry);
+                    return texture;
+                },
+                (error) => {
+                    if (this.#entries.get(url) === entry) this.#entries.delete(url);
+                    throw error;
+                }
+            );
+            this.#entries.set(url, entry);
+        }
+        entry.refs++;
+        return entry.promise;
+    }
+
+    release(url) {
+        const entry = url && this.#entries.get(url);
+        if (!entry) return;
+        entry.refs--;
+        if (entry.refs === 0 && entry.texture) this.#evict(url, entry);
+    }
+
+    // Textures held, loads in flight and estimated GPU bytes of the held ones.
+    get stats() {
+        let pending = 0;
+        this.#entries.forEach((entry) => { if (!entry.texture) pending++; });
+        return { textures: this.#entries.size - pending, pending, bytes: this.#bytes };
+    }
+
+    static isShared(texture) {
+        return Boolean(texture?.userData.sharedUrl);
+    }
+
+    #evict(url, entry) {
+        if (this.#entries.get(url) === entry) this.#entries.delete(url);
+        this.#bytes -= entry.bytes;
+        entry.texture.dispose();
+        entry.texture.image?.close?.(); // Frees the decoded ImageBitmap now, not at GC
+    }
+
+    async #load(url, load) {
+        const source = this.#cache ? await this.#cache.fetch(url, load) : load ? await load() : url;
+        if (/\.ktx2(\?|$)/.test(url)) {
+            const loader = await this.#getKtx2Loader();
+            if (source === url) return loader.loadAsync(url);
+            const objectUrl = URL.createObjectURL(source);
+            try {
+                return await loader.loadAsync(objectUrl);
+            } finally {
+                URL.revokeObjectURL(objectUrl);
+            }
+        }
+        const texture = await this.#decoder.decodeTexture(source);
+        texture.anisotropy = this.#renderer.capabilities.getMaxAnisotropy();
+        return texture;
+    }
+
+    async #getKtx2Loader() {
+        if (!this.#ktx2Loader) {
+            this.#ktx2Loader = import('three/examples/jsm/loaders/KTX2Loader.js').then(({ KTX2Loader }) =>
+                new KTX2Loader().setTranscoderPath(BASIS_TRANSCODER_PATH).detectSupport(this.#renderer)
+            );
+        }
+        return this.#ktx2Loader;
+    }
+}
@@ -0,0 +1,177 @@
+// Tweens driven by the render scheduler.
+//
+// Every fade, flip and pack reveal runs through one TweenScheduler, which
+// registers a single animation with the RenderScheduler while any tween is
+// active and drops it when the last one finishes. Tweens live in a
+// preallocated pool and are stepped in place, so a running animation
+// allocates nothing per frame; callbacks are shared functions that receive
+// the tween's target instead of closures created per call.
+//
+// At most one tween runs per target and property. Starting another one
+// retargets it from wherever the value currently is, so pressing flip again
+// mid-flip or switching cards mid-fade continues smoothly instead of
+// stacking competing animations.
+
+export const Easing = {
+    linear: (t) => t,
+    inQuad: (t) => t * t,
+    outQuad: (t) => t * (2 - t),
+    inOutQuad: (t) => (t < 0.5 ? 2 * t * t : 1 - 2 * (1 - t) * (1 - t)),
+    outCubic: (t) => 1 - (1 - t) ** 3,
+    inOutCubic: (t) => (t < 0.5 ? 4 * t * t * t : 1 - 4 * (1 - t) ** 3),
+    outBack: (t) => 1 + 2.70158 * (t - 1) ** 3 + 1.70158 * (t - 1) ** 2
+};
+
+// Plain numeric properties are read and written directly.
+const PLAIN = {
+    get: (target, name) => target[name],
+    set: (target, value, name) => { target[name] = value; }
+};
+
+class Tween {
+    target = null;
+    name = null;
+    accessor = PLAIN;
+    from = 0;
+    to = 0;
+    start = 0;
+    duration = 0;
+    ease = Easing.linear;
+    onComplete = null;
+    index = -1; // Position in the active list, -1 when free
+}
+
+export class TweenScheduler {
+    #scheduler;
+    #properties = new Map(); // name -> { get(target, name), set(target, value, name) }
+    #free = [];
+    #active = [];
+    #running = false;
+    #now = 0;
+    #stats = { started: 0, retargeted: 0, completed: 0, cancelled: 0 };
+
+    // `scheduler`: the RenderScheduler that draws while tweens are running.
+    constructor(scheduler, { capacity = 64 } = {}) {
+        this.#scheduler = scheduler;
+        for (let i = 0; i < capacity; i++) this.#free.push(new Tween());
+    }
+
+    get active() {
+        return this.#active.length;
+    }
+
+    get stats() {
+        return { ...this.#stats, active: this.#active.length, pooled: this.#free.length };
+    }
+
+    // Registers a derived property, e.g. an opacity that has to be copied to
+    // several materials: `get(target)` reads it, `set(target, value)` applies it.
+    defineProperty(name, { get, set }) {
+        this.#properties.set(name, { get, set });
+    }
+
+    // Animates `target[name]` (or the property defined under `name`) to
+    // `value` over `duration` ms after `delay` ms. `onComplete(target)` runs
+    // once the value has arrived; a retarget replaces it, a cancel skips it.
+    to(target, name, value, { duration = 300, delay = 0, ease = Easing.outCubic, onComplete = null } = {}) {
+        let tween = this.#find(target, name);
+        if (tween) {
+            this.#stats.retargeted++;
+        } else {
+            tween = this.#free.pop() || new Tween();
+            tween.target = target;
+            tween.name = name;
+            tween.accessor = this.#properties.get(name) || PLAIN;
+            tween.index = this.#active.length;
+            this.#active.push(tween);
+            this.#stats.started++;
+        }
+        tween.from = tween.accessor.get(target, name);
+        tween.to = value;
+        tween.start = this.#time() + delay;
+        tween.duration = duration;
+        tween.ease = ease;
+        tween.onComplete = onComplete;
+        if (!this.#running) {
+            this.#running = true;
+            this.#scheduler.addAnimation(this.#step);
+        }
+    }
+
+    // True while a tween on `target` (and `name`, if given) is running or waiting
+    // out its delay.
+    isActive(target, name = null) {
+        return this.#find(target, name) !== null;
+    }
+
+    // Stops tweens on `target`, or only its `name` tween, where they are. Their
+    // completion callbacks do not run. Returns how many were stopped.
+    cancel(target, name = null) {
+        let cancelled = 0;
+        for (let i = this.#active.length - 1; i >= 0; i--) {
+            const tween = this.#active[i];
+            if (tween.target === target && (name === null || tween.name === name)) {
+                this.#release(tween);
+                cancelled++;
+            }
+        }
+        this.#stats.cancelled += cancelled;
+        return cancelled;
+    }
+
+    #find(target, name) {
+        for (let i = 0; i < this.#active.length; i++) {
+            const tween = this.#active[i];
+            if (tween.target === target && (name === null || tween.name === name)) return tween;
+        }
+        return null;
+    }
+
+    // Frame time while stepping, so tweens started by a completion callback
+    // line up with the frame; the clock otherwise.
+    #time() {
+        return this.#running && this.#now ? this.#now : performance.now();
+    }
+
+    #step = (delta, time) => {
+        this.#now = time;
+        // Completed tweens are swapped out of the list, so walk it by index and
+        // only advance past tweens that stay.
+        let i = 0;
+        while (i < this.#active.length) {
+            const tween = this.#active[i];
+            const elapsed = time - tween.start;
+            if (elapsed < 0) {
+                i++;
+                continue;
+            }
+            const done = elapsed >= tween.duration;
+            const progress = done ? 1 : tween.ease(elapsed / tween.duration);
+            tween.accessor.set(tween.target, tween.from + (tween.to - tween.from) * progress, tween.name);
+            if (!done) {
+                i++;
+                continue;
+            }
+            const { target, onComplete } = tween;
+            this.#release(tween);
+            this.#stats.completed++;
+            onComplete?.(target);
+        }
+        this.#now = 0;
+        if (this.#active.length > 0) return true;
+        this.#running = false;
+        return false;
+    };
+
+    #release(tween) {
+        const last = this.#active.pop();
+        if (last !== tween) {
+            this.#active[tween.index] = last;
+            last.index = tween.index;
+        }
+        tween.index = -1;
+        tween.target = null;
+        tween.onComplete = null;
+        this.#free.push(tween);
+    }
+}
@@ -0,0 +1,114 @@
+// Service worker: offline app shell and card bundles.
+//
+// The card server fills in the three constants below when it serves this file
+// (see cardserver/shell.py). The version is a hash of every shell file's
+// content and of every precached bundle, so any change to the page, its
+// modules, the vendored three.js or a precached bundle yields a new worker:
+// it precaches the new shell into a cache of its own and deletes the old one
+// when it takes over. Served as-is the version stays 'dev', nothing is cached
+// and every request goes to the network.
+//
+// Strategies:
+// - shell (page, js/, vendor/): precached, answered from the cache
+// - /assets/: content-addressed and immutable, so cache first; the thumb
+//   bundles in PRECACHE_BUNDLES (a few MB, smallest sets first) are fetched on
+//   install so pack rips work offline, everything else as the viewer uses it
+// - /api/ reads: network first, falling back to the last response after
+//   NETWORK_TIMEOUT_MS so a flaky connection does not stall the viewer
+// - pack rips and every write: network only
+const SHELL_VERSION = 'dev';
+const SHELL_FILES = [];
+const PRECACHE_BUNDLES = [];
+
+const SHELL_CACHE = `shell-${SHELL_VERSION}`;
+const ASSET_CACHE = 'assets';
+const API_CACHE = 'api';
+const ASSET_LIMIT = 4000; // Entries; trimmed oldest first
+const NETWORK_TIMEOUT_MS = 3000;
+const NETWORK_ONLY = /^\/api\/sets\/[^/]+\/packs?$/;
+
+let assetWrites = 0;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil((async () => {
+        if (SHELL_VERSION !== 'dev') {
+            const shell = await caches.open(SHELL_CACHE);
+            await shell.addAll(SHELL_FILES);
+            // Bundles are optional: fetch the missing ones, and do not fail
+            // the install over one that could not be fetched.
+            const assets = await caches.open(ASSET_CACHE);
+            await Promise.all(PRECACHE_BUNDLES.map(async (url) => {
+                if (!(await assets.match(url))) await assets.add(url).catch(() => {});
+            }));
+        }
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter((name) => name.startsWith('shell-') && name !== SHELL_CACHE)
+            .map((name) => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', (event) => {
+    const { request } = event;
+    if (SHELL_VERSION === 'dev' || request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin || NETWORK_ONLY.test(url.pathname)) return;
+    if (url.pathname.startsWith('/assets/')) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname.startsWith('/api/')) {
+        event.respondWith(networkFirst(request));
+    } else if (request.mode === 'navigate' || url.pathname.startsWith('/js/') || url.pathname.startsWith('/vendor/')) {
+        event.respondWith(fromShell(request));
+    }
+});
+
+async function fromShell(request) {
+    const shell = await caches.open(SHELL_CACHE);
+    // Query strings (?perf, ?collection=...) select behaviour, not content
+    const cached = await shell.match(request, { ignoreSearch: true });
+    return cached || fetch(request);
+}
+
+async function cacheFirst(request) {
+    const assets = await caches.open(ASSET_CACHE);
+    // A cached bundle is returned whole even for a Range request; the bundle
+    // reader keeps the full file when a range is not honoured.
+    const cached = await assets.match(request.url);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.status === 200) {
+        await assets.put(request.url, response.clone());
+        if (++assetWrites % 100 === 0) trim(assets);
+    }
+    return response;
+}
+
+async function networkFirst(request) {
+    const api = await caches.open(API_CACHE);
+    const network = fetch(request).then((response) => {
+        if (response.ok) api.put(request, response.clone());
+        return response;
+    });
+    network.catch(() => {}); // Handled below once it matters
+    const timeout = new Promise((resolve) => setTimeout(resolve, NETWORK_TIMEOUT_MS));
+    try {
+        const response = await Promise.race([network, timeout]);
+        if (response) return response;
+        return (await api.match(request)) || (await network);
+    } catch (error) {
+        const cached = await api.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+async function trim(cache) {
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - ASSET_LIMIT)).map((key) => cache.delete(key)));
+}
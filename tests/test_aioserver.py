@@ -0,0 +1,213 @@
+"""asyncio server: byte ranges, conditional requests and compression."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import http.client
+import json
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from cardserver.aioserver import CompressionCache, accepted_encoding, identity_etag, precompress, start_server
+from cardserver.assets import AssetStore
+from cardserver.server import StaticFiles, build_router
+from cardserver.tiers import content_hash
+from cardserver.web import Router, json_response
+
+ASSET = bytes(range(256)) * 40
+SCRIPT = b"".join(b"export const value%d = %d;\n" % (i, i) for i in range(200))
+
+
+class Served:
+    def __init__(self, port: int, compression: CompressionCache, asset: str) -> None:
+        self.port = port
+        self.compression = compression
+        self.asset = asset
+
+    def get(self, path: str, headers: dict | None = None, method: str = "GET"):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        try:
+            connection.request(method, path, headers=headers or {})
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+
+@contextmanager
+def running(router: Router, compression: CompressionCache):
+    """Serve ``router`` from a loop thread; yields the bound port."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    holder = {}
+
+    async def run() -> None:
+        server = await start_server("127.0.0.1", 0, router, compression=compression)
+        holder["server"] = server
+        holder["port"] = server.sockets[0].getsockname()[1]
+        ready.set()
+
+    thread = threading.Thread(target=lambda: (loop.run_until_complete(run()), loop.run_forever()), daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    try:
+        yield holder["port"]
+    finally:
+
+        async def shutdown() -> None:
+            holder["server"].close()
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
+
+
+@pytest.fixture
+def served(tmp_path):
+    store = AssetStore(tmp_path / "store")
+    asset = f"{content_hash(ASSET)}.cpak"
+    store.write_asset("demo", asset, ASSET)
+    root = tmp_path / "site"
+    (root / "js").mkdir(parents=True)
+    (root / "index.html").write_bytes(b"<!doctype html><title>cards</title>" + b"<p>card</p>" * 200)
+    (root / "js" / "app.js").write_bytes(SCRIPT)
+    static = StaticFiles(root)
+    compression = CompressionCache()
+    with running(build_router(store, static), compression) as port:
+        yield Served(port, compression, f"/assets/demo/{asset}")
+
+
+def test_accepted_encoding():
+    assert accepted_encoding(None) is None
+    assert accepted_encoding("gzip, deflate") == "gzip"
+    assert accepted_encoding("gzip;q=0") is None
+    assert accepted_encoding("identity") is None
+
+
+def test_whole_asset(served):
+    response, body = served.get(served.asset)
+    assert response.status == 200 and body == ASSET
+    assert response.getheader("Accept-Ranges") == "bytes"
+    assert response.getheader("Cache-Control").startswith("public")
+
+
+def test_range(served):
+    response, body = served.get(served.asset, {"Range": "bytes=100-299"})
+    assert response.status == 206 and body == ASSET[100:300]
+    assert response.getheader("Content-Range") == f"bytes 100-299/{len(ASSET)}"
+    response, body = served.get(served.asset, {"Range": "bytes=-10"})
+    assert response.status == 206 and body == ASSET[-10:]
+    response, body = served.get(served.asset, {"Range": f"bytes={len(ASSET) - 5}-"})
+    assert body == ASSET[-5:]
+
+
+def test_unsatisfiable_and_multiple_ranges(served):
+    response, _ = served.get(served.asset, {"Range": f"bytes={len(ASSET)}-"})
+    assert response.status == 416
+    assert response.getheader("Content-Range") == f"bytes */{len(ASSET)}"
+    response, body = served.get(served.asset, {"Range": "bytes=0-1,5-6"})
+    assert response.status == 200 and body == ASSET
+
+
+def test_if_range(served):
+    response, _ = served.get(served.asset)
+    etag = response.getheader("ETag")
+    response, body = served.get(served.asset, {"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status == 206 and body == ASSET[:10]
+    # A stale validator gets the whole, current file instead of a mismatched piece
+    response, body = served.get(served.asset, {"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status == 200 and body == ASSET
+
+
+def test_etag_revalidation(served):
+    response, _ = served.get("/js/app.js")
+    etag = response.getheader("ETag")
+    response, body = served.get("/js/app.js", {"If-None-Match": etag})
+    assert response.status == 304 and body == b""
+    assert response.getheader("ETag") == etag
+    response, _ = served.get("/js/app.js", {"If-None-Match": '"other"'})
+    assert response.status == 200
+
+
+def test_head_has_no_body(served):
+    response, body = served.get(served.asset, method="HEAD")
+    assert response.status == 200 and body == b""
+    assert int(response.getheader("Content-Length")) == len(ASSET)
+
+
+def test_compression(served):
+    response, body = served.get("/js/app.js", {"Accept-Encoding": "gzip"})
+    assert response.status == 200
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert response.getheader("Vary") == "Accept-Encoding"
+    assert response.getheader("Accept-Ranges") is None
+    assert gzip.decompress(body) == SCRIPT and len(body) < len(SCRIPT)
+    # Compressed once, then served from the cache
+    served.get("/js/app.js", {"Accept-Encoding": "gzip"})
+    assert served.compression.stats["misses"] == 1 and served.compression.stats["hits"] >= 1
+
+
+def test_encoded_bodies_have_their_own_etag(served):
+    response, _ = served.get("/js/app.js")
+    identity = response.getheader("ETag")
+    response, _ = served.get("/js/app.js", {"Accept-Encoding": "gzip"})
+    encoded = response.getheader("ETag")
+    assert encoded == identity[:-1] + '-gz"'
+    assert identity_etag(encoded) == identity
+    for etag in (identity, encoded):
+        response, body = served.get("/js/app.js", {"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert response.status == 304 and body == b""
+        assert response.getheader("ETag") == etag
+        assert response.getheader("Vary") == "Accept-Encoding"
+    response, _ = served.get("/js/app.js", {"Accept-Encoding": "gzip", "If-None-Match": '"other-gz"'})
+    assert response.status == 200
+
+
+def test_no_compression_without_accept_encoding_or_for_ranges(served):
+    response, body = served.get("/js/app.js")
+    assert response.getheader("Content-Encoding") is None and body == SCRIPT
+    assert response.getheader("Vary") == "Accept-Encoding"
+    response, body = served.get("/js/app.js", {"Accept-Encoding": "gzip", "Range": "bytes=0-99"})
+    assert response.status == 206 and response.getheader("Content-Encoding") is None and body == SCRIPT[:100]
+    # Images are compressed already
+    response, _ = served.get(served.asset, {"Accept-Encoding": "gzip"})
+    assert response.getheader("Content-Encoding") is None
+
+
+def test_precompress_warms_the_cache(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "js" / "tiny.js").write_bytes(b"export {};\n")
+    static = StaticFiles(tmp_path)
+    compression = CompressionCache()
+    assert precompress(static, compression) == 1
+    etag = static.etag(tmp_path / "js" / "app.js")
+    cached = compression.get(etag, "gzip", lambda: pytest.fail("app.js was not precompressed"))
+    assert gzip.decompress(cached) == SCRIPT
+
+
+def test_exports_render_in_their_own_pool():
+    router = Router()
+
+    @router.route("POST", "/api/sets/{slug}/cards/{number}/exports/{kind}")
+    def render(request, slug, number, kind):
+        return json_response(request, {"thread": threading.current_thread().name}, cache_control="no-store")
+
+    @router.route("GET", "/api/sets/{slug}")
+    def read(request, slug):
+        return json_response(request, {"thread": threading.current_thread().name}, cache_control="no-store")
+
+    with running(router, CompressionCache()) as port:
+        served = Served(port, None, "")
+        _, body = served.get("/api/sets/demo/cards/1/exports/thumb", method="POST")
+        assert json.loads(body)["thread"].startswith("export")
+        _, body = served.get("/api/sets/demo")
+        assert not json.loads(body)["thread"].startswith("export")
@@ -0,0 +1,72 @@
+"""Atlas bake: page packing, gutters and UV rectangles."""
+
+from __future__ import annotations
+
+import pytest
+
+from cardserver.assets import AssetStore
+from cardserver.atlas import GUTTER, bake_atlases
+from cardserver.tiers import TIERS_BY_NAME
+
+Image = pytest.importorskip("PIL.Image")
+
+MID = TIERS_BY_NAME["mid"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AssetStore(tmp_path / "store")
+    store.generate_placeholders("demo", "Demo", 7)
+    return store
+
+
+def test_pages(store):
+    # 2048 / (500 + 16) = 3 columns, 2048 / (700 + 16) = 2 rows: 6 cards a page
+    atlas = bake_atlases(store, "demo", page_size=2048, ktx2=False)
+    assert (atlas["face"], atlas["tier"], atlas["gutter"]) == ("front", "mid", GUTTER)
+    assert [(page["width"], page["height"]) for page in atlas["pages"]] == [(2048, 2048), (2048, 1024)]
+    assert [atlas["cards"][str(n)]["page"] for n in range(1, 8)] == [0, 0, 0, 0, 0, 0, 1]
+    assert store.atlas("demo")[0] == atlas
+    for page in atlas["pages"]:
+        assert "ktx2" not in page
+        with Image.open(store.asset_path("demo", page["file"])) as image:
+            assert image.size == (page["width"], page["height"])
+
+
+def test_uv_rects(store):
+    atlas = bake_atlases(store, "demo", page_size=2048, ktx2=False)
+    cell_w, cell_h = MID.width + 2 * GUTTER, MID.height + 2 * GUTTER
+    for number, page_height, (column, row) in ((1, 2048, (0, 0)), (5, 2048, (1, 1)), (7, 1024, (0, 0))):
+        x, y = column * cell_w + GUTTER, row * cell_h + GUTTER
+        # Bottom-left origin, like three.js texture coordinates
+        assert atlas["cards"][str(number)]["uv"] == [
+            round(x / 2048, 6),
+            round(1 - (y + MID.height) / page_height, 6),
+            round(MID.width / 2048, 6),
+            round(MID.height / page_height, 6),
+        ]
+
+
+def test_cells_hold_the_card_and_its_gutter(store):
+    atlas = bake_atlases(store, "demo", page_size=2048, ktx2=False)
+    page = atlas["pages"][0]
+    entry = store.manifest("demo")[0]["cards"]["5"]["front"]["mid"]
+    with Image.open(store.asset_path("demo", page["file"])) as image, \
+            Image.open(store.asset_path("demo", entry["file"])) as card:
+        image = image.convert("RGB")
+        card = card.convert("RGB").resize((MID.width, MID.height))
+        x, y = MID.width + 2 * GUTTER + GUTTER, MID.height + 2 * GUTTER + GUTTER  # Column 1, row 1
+        assert image.crop((x, y, x + MID.width, y + MID.height)).tobytes() == card.tobytes()
+        # The gutter repeats the card's outermost pixels
+        middle = y + MID.height // 2
+        assert image.getpixel((x - GUTTER, middle)) == image.getpixel((x, middle))
+        assert image.getpixel((x + MID.width + GUTTER - 1, middle)) == image.getpixel((x + MID.width - 1, middle))
+
+
+def test_invalid_pages(store):
+    with pytest.raises(ValueError, match="power of two"):
+        bake_atlases(store, "demo", page_size=3000, ktx2=False)
+    with pytest.raises(ValueError, match="too small"):
+        bake_atlases(store, "demo", page_size=512, ktx2=False)
+    with pytest.raises(ValueError, match="unknown set"):
+        bake_atlases(store, "nope", ktx2=False)
@@ -0,0 +1,73 @@
+"""CPAK bundle writer and reader round trip."""
+
+from __future__ import annotations
+
+import pytest
+
+from cardserver.bundle import MAGIC, SUFFIX, read_index, write_bundle
+from cardserver.tiers import content_hash
+
+
+def _tier_file(tier_dir, data: bytes, ext: str, width: int = 64, height: int = 90) -> dict:
+    name = f"{content_hash(data)}.{ext}"
+    (tier_dir / name).write_bytes(data)
+    return {"file": name, "width": width, "height": height}
+
+
+def _cards(tier_dir) -> dict:
+    """Three cards: two share a back, one has none."""
+    back = _tier_file(tier_dir, b"shared back" * 10, "png", 32, 45)
+    return {
+        3: {"front": _tier_file(tier_dir, b"front three", "webp"), "back": back},
+        1: {"front": _tier_file(tier_dir, b"front one" * 3, "jpg"), "back": back},
+        2: {"front": _tier_file(tier_dir, b"front two", "webp")},
+    }
+
+
+def test_round_trip(tmp_path):
+    cards = _cards(tmp_path)
+    record = write_bundle(tmp_path, cards)
+    data = (tmp_path / record["file"]).read_bytes()
+    assert record["file"].endswith(SUFFIX) and record["bytes"] == len(data)
+    assert data[:4] == MAGIC
+
+    index = read_index(data[:record["indexBytes"]])
+    assert index.data_offset == record["indexBytes"] and index.data_offset % 8 == 0
+    assert list(index.cards) == [1, 2, 3]
+    assert index.cards[2][1] is None
+    assert len(index.images) == 4  # The shared back is stored once
+    assert index.cards[1][1] == index.cards[3][1]
+    for number, faces in cards.items():
+        for slot, face in enumerate(("front", "back")):
+            if face not in faces:
+                continue
+            image = index.images[index.cards[number][slot]]
+            assert image.filename == faces[face]["file"]
+            assert (image.width, image.height) == (faces[face]["width"], faces[face]["height"])
+            assert data[image.offset:image.offset + image.length] == (tmp_path / image.filename).read_bytes()
+
+
+def test_bundles_are_content_addressed(tmp_path):
+    cards = _cards(tmp_path)
+    first = write_bundle(tmp_path, cards)
+    assert write_bundle(tmp_path, cards) == first
+    cards[2]["back"] = _tier_file(tmp_path, b"new back", "png")
+    assert write_bundle(tmp_path, cards)["file"] != first["file"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_only_images_are_bundled(tmp_path):
+    entry = _tier_file(tmp_path, b"not an image", "txt")
+    with pytest.raises(ValueError, match="cannot bundle"):
+        write_bundle(tmp_path, {1: {"front": entry}})
+
+
+def test_read_index_rejects_bad_input(tmp_path):
+    record = write_bundle(tmp_path, _cards(tmp_path))
+    data = (tmp_path / record["file"]).read_bytes()
+    with pytest.raises(ValueError, match="header"):
+        read_index(data[:10])
+    with pytest.raises(ValueError, match="version 1"):
+        read_index(b"JUNK" + data[4:])
+    with pytest.raises(ValueError, match="index"):
+        read_index(data[:record["indexBytes"] - 8])
@@ -0,0 +1,81 @@
+"""Catalog search filters and keyset paging."""
+
+from __future__ import annotations
+
+import pytest
+
+from cardserver.catalog import Catalog, year_from_name
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = Catalog(tmp_path / "catalog.sqlite3")
+    catalog.register_set("1989-score-football", "1989 Score Football")
+    catalog.add_cards(
+        "1989-score-football",
+        [(number, f"Player {number}", "Bears" if number % 2 else "Lions") for number in range(1, 26)],
+    )
+    catalog.register_set("1990-topps", "1990 Topps")
+    catalog.add_cards("1990-topps", [(1, "Barry Sanders", "Lions"), (2, "Player 2", "Bears")])
+    yield catalog
+    catalog.close()
+
+
+def test_year_from_name():
+    assert year_from_name("1989 Score Football") == 1989
+    assert year_from_name("Score Football") is None
+
+
+def test_sets_filtered_by_year(catalog):
+    assert [s["set"] for s in catalog.sets()["sets"]] == ["1989-score-football", "1990-topps"]
+    page = catalog.sets(year=1990)
+    assert page == {"sets": [{"set": "1990-topps", "name": "1990 Topps", "year": 1990, "count": 2}], "next": None}
+
+
+def test_filters_combine(catalog):
+    page = catalog.cards(player="player 2")
+    assert page["cards"] == [
+        {"number": 2, "player": "Player 2", "team": "Lions", "set": "1989-score-football"},
+        {"number": 2, "player": "Player 2", "team": "Bears", "set": "1990-topps"},
+    ]
+    page = catalog.cards(set_slug="1990-topps", team="LIONS")
+    assert page["cards"] == [{"number": 1, "player": "Barry Sanders", "team": "Lions"}]
+    assert catalog.cards(year=1990, number=2)["cards"][0]["set"] == "1990-topps"
+    assert catalog.cards(set_slug="no-such-set") == {"cards": [], "next": None}
+
+
+def test_keyset_paging_visits_every_card_once(catalog):
+    seen, cursor = [], None
+    while True:
+        page = catalog.cards(limit=4, cursor=cursor)
+        assert len(page["cards"]) <= 4
+        seen.extend((card["set"], card["number"]) for card in page["cards"])
+        cursor = page["next"]
+        if cursor is None:
+            break
+    expected = [("1989-score-football", n) for n in range(1, 26)] + [("1990-topps", 1), ("1990-topps", 2)]
+    assert seen == expected
+
+
+def test_paging_is_stable_while_cards_are_added(catalog):
+    first = catalog.cards(set_slug="1989-score-football", limit=10)
+    catalog.add_cards("1989-score-football", [(0, "Checklist", None)], replace=False)
+    second = catalog.cards(set_slug="1989-score-football", limit=10, cursor=first["next"])
+    assert [card["number"] for card in second["cards"]] == list(range(11, 21))
+
+
+def test_last_full_page_has_no_next(catalog):
+    page = catalog.cards(set_slug="1990-topps", limit=2)
+    assert len(page["cards"]) == 2 and page["next"] is None
+
+
+def test_invalid_cursor(catalog):
+    with pytest.raises(ValueError):
+        catalog.cards(cursor="not-a-cursor")
+
+
+def test_add_cards_without_replace_keeps_imported_rows(catalog):
+    count = catalog.add_cards("1990-topps", [(1, None, None), (3, None, None)], replace=False)
+    assert count == 3
+    assert catalog.get_set("1990-topps")["count"] == 3
+    assert catalog.cards(set_slug="1990-topps", number=1)["cards"][0]["player"] == "Barry Sanders"
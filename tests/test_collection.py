@@ -0,0 +1,148 @@
+"""Collection delta saves, paged loads and change feeds."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from cardserver.assets import AssetStore
+from cardserver.collection import CollectionStore
+from cardserver.server import build_router
+from cardserver.web import Request
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CollectionStore(tmp_path / "collections.sqlite3")
+    yield store
+    store.close()
+
+
+def _load(store, name, limit):
+    cards, cursor, pages = [], None, 0
+    while True:
+        page = store.cards(name, limit=limit, cursor=cursor)
+        cards.extend(page["cards"])
+        pages += 1
+        cursor = page["next"]
+        if cursor is None:
+            return cards, pages
+
+
+def test_unknown_collection_is_empty(store):
+    assert store.cards("nobody") == {"collection": "nobody", "revision": 0, "count": 0, "cards": [], "next": None}
+    assert store.revision("nobody") == 0
+
+
+def test_delta_updates_only_the_fields_sent(store):
+    store.apply("mine", [{"id": "a", "position": 1, "set": "1989-score", "number": 7, "transform": [0, 3.14, 0]}])
+    saved = store.apply("mine", [{"id": "a", "name": "Favourite"}, {"id": "b", "position": 2, "front": "abc"}])
+    assert saved == {"collection": "mine", "revision": 2, "saved": 2, "deleted": 0}
+    cards = store.cards("mine")["cards"]
+    assert cards == [
+        {"id": "a", "position": 1, "set": "1989-score", "number": 7, "name": "Favourite", "transform": [0, 3.14, 0]},
+        {"id": "b", "position": 2, "front": "abc"},
+    ]
+    store.apply("mine", [{"id": "a", "transform": None}])
+    assert "transform" not in store.cards("mine")["cards"][0]
+
+
+def test_paged_load_in_display_order(store):
+    # Equal positions are ordered by id, so the cursor never skips a card
+    upserts = [{"id": f"card-{i:03d}", "position": i // 3} for i in range(250)]
+    store.apply("big", list(reversed(upserts)))
+    first = store.cards("big", limit=100)
+    assert first["count"] == 250 and first["revision"] == 1
+    cards, pages = _load(store, "big", 100)
+    assert pages == 3
+    assert [card["id"] for card in cards] == [change["id"] for change in upserts]
+    assert "count" not in store.cards("big", limit=100, cursor=first["next"])
+
+
+def test_deletes_leave_tombstones_in_the_change_feed(store):
+    store.apply("mine", [{"id": card_id, "position": i} for i, card_id in enumerate("abcd")])
+    revision = store.revision("mine")
+    store.apply("mine", [{"id": "e", "position": 9}], deletes=["b"])
+    store.apply("mine", [{"id": "c", "name": "renamed"}])
+    assert [card["id"] for card in store.cards("mine")["cards"]] == ["a", "c", "d", "e"]
+    changes = store.changes("mine", revision)
+    assert changes["revision"] == revision + 2
+    assert changes["cards"] == [
+        {"id": "b", "deleted": True},
+        {"id": "e", "position": 9},
+        {"id": "c", "position": 2, "name": "renamed"},
+    ]
+    # Saving a removed card again brings it back
+    store.apply("mine", [{"id": "b", "position": 1}])
+    assert len(store.cards("mine")["cards"]) == 5
+
+
+def test_change_feed_pages(store):
+    for start in range(0, 30, 10):
+        store.apply("mine", [{"id": f"c{i:02d}", "position": i} for i in range(start, start + 10)])
+    seen, cursor = [], None
+    while True:
+        page = store.changes("mine", 1, limit=7, cursor=cursor)
+        seen.extend(card["id"] for card in page["cards"])
+        cursor = page["next"]
+        if cursor is None:
+            break
+    assert seen == [f"c{i:02d}" for i in range(10, 30)]
+
+
+def test_collections_are_separate(store):
+    store.apply("one", [{"id": "a", "position": 1}])
+    store.apply("two", [{"id": "a", "position": 5}])
+    assert store.cards("one")["cards"] == [{"id": "a", "position": 1}]
+    assert store.revision("two") == 1
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"position": 1},
+        {"id": "", "position": 1},
+        {"id": "a", "position": None},
+        {"id": "a", "number": "7"},
+        {"id": "a", "number": True},
+        {"id": "a", "name": 5},
+        {"id": "a", "transform": [float("nan")]},
+        {"id": "a", "transform": [0] * 17},
+        {"id": "a", "position": 99999999999999999999999},
+        {"id": "a", "position": -(2**63) - 1},
+        {"id": "a", "number": 2**63},
+        {"id": "a", "transform": [10**400]},
+        {"id": "a", "transform": [float("inf")]},
+    ],
+)
+def test_malformed_changes_write_nothing(store, change):
+    with pytest.raises(ValueError):
+        store.apply("mine", [{"id": "ok", "position": 0}, change])
+    assert store.revision("mine") == 0
+
+
+def test_invalid_cursor(store):
+    store.apply("mine", [{"id": "a", "position": 1}])
+    with pytest.raises(ValueError):
+        store.cards("mine", cursor="nope.a")
+    with pytest.raises(ValueError):
+        store.cards("mine", cursor="99999999999999999999999.a")
+    with pytest.raises(ValueError):
+        store.changes("mine", since=2**63)
+
+
+def test_int64_bounds_are_accepted(store):
+    store.apply("mine", [{"id": "a", "position": 2**63 - 1, "number": -(2**63), "transform": [2**63 - 1, 0.5]}])
+    card = store.cards("mine")["cards"][0]
+    assert (card["position"], card["number"], card["transform"]) == (2**63 - 1, -(2**63), [2**63 - 1, 0.5])
+
+
+def test_out_of_range_delta_is_a_bad_request(store, tmp_path):
+    router = build_router(AssetStore(tmp_path / "assets"), collections=store)
+    body = json.dumps({"upserts": [{"id": "a", "position": 99999999999999999999999}]}).encode()
+    response = router.dispatch(Request.from_target("POST", "/api/collections/mine/changes", {}, body))
+    assert response.status == 400
+    assert b"64-bit" in response.body
+    response = router.dispatch(Request.from_target("GET", "/api/collections/mine/changes?since=99999999999999999999999", {}))
+    assert response.status == 400
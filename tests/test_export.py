@@ -0,0 +1,127 @@
+"""Card exports: cache keys, output shapes and the render-on-POST route."""
+
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from cardserver.assets import AssetStore
+from cardserver.export import MAX_SIZE, export_cards, find_export
+from cardserver.server import MAX_EXPORT_FRAMES, MAX_EXPORT_SIZE, build_router
+from cardserver.web import Request
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AssetStore(tmp_path / "store")
+    store.generate_placeholders("demo", "Demo", 2)
+    return store
+
+
+def _export(store, kind: str = "thumb", **options):
+    return export_cards(store, "demo", [1], (kind,), workers=1, **{"size": 32, **options})
+
+
+def test_thumb(store):
+    report = _export(store)
+    assert (report.rendered, report.cached) == (1, 0)
+    entry = report.cards["1"]["thumb"]
+    assert entry["card"] == 1 and entry["kind"] == "thumb"
+    with Image.open(store.asset_path("demo", entry["file"])) as image:
+        assert image.format == "WEBP" and image.height == 32
+        assert image.size == (entry["width"], entry["height"])
+
+
+def test_sheet_layout(store):
+    entry = _export(store, "sheet", frames=5).cards["1"]["sheet"]
+    assert (entry["frames"], entry["columns"], entry["rows"]) == (5, 3, 2)
+    with Image.open(store.asset_path("demo", entry["file"])) as image:
+        assert image.size == (3 * entry["width"], 2 * entry["height"])
+
+
+def test_unchanged_exports_are_looked_up(store):
+    first = _export(store).cards["1"]["thumb"]
+    again = _export(store)
+    assert (again.rendered, again.cached) == (0, 1)
+    assert again.cards["1"]["thumb"] == first
+    # Frames and fps do not change a thumbnail
+    assert _export(store, frames=12, fps=10).cached == 1
+
+
+def test_key_follows_options(store):
+    _export(store)
+    assert _export(store, size=48).rendered == 1
+    assert _export(store, background="#102030").rendered == 1
+    assert _export(store, "turntable", frames=4).rendered == 1
+    assert _export(store, "turntable", frames=6).rendered == 1
+    assert _export(store, "flip", fps=4).rendered == 1
+    assert _export(store, "flip", fps=5).rendered == 1
+    assert _export(store).cached == 1
+    assert len(store.exports("demo")) == 7
+
+
+def test_key_follows_tier_files(store):
+    _export(store)
+    manifest, _ = store.manifest("demo")
+    manifest["cards"]["1"]["front"] = manifest["cards"]["2"]["front"]
+    store.write_manifest("demo", manifest)
+    assert find_export(store, "demo", 1, "thumb", size=32) is None
+    assert _export(store).rendered == 1
+
+
+def test_invalid_options(store):
+    for kind, options in (
+        ("poster", {}),
+        ("thumb", {"size": MAX_SIZE + 1}),
+        ("thumb", {"size": 8}),
+        ("turntable", {"frames": 1}),
+        ("flip", {"fps": 0}),
+    ):
+        with pytest.raises(ValueError):
+            _export(store, kind, **options)
+    with pytest.raises(ValueError):
+        export_cards(store, "demo", [3], ("thumb",))
+    with pytest.raises(ValueError):
+        export_cards(store, "nope", None, ("thumb",))
+
+
+def _request(router, method: str, target: str):
+    return router.dispatch(Request.from_target(method, target, {}))
+
+
+def test_exports_render_on_post_only(store):
+    router = build_router(store)
+    url = "/api/sets/demo/cards/1/exports/thumb?size=32"
+    assert _request(router, "GET", url).status == 404
+    assert find_export(store, "demo", 1, "thumb", size=32) is None  # A GET never renders
+
+    response = _request(router, "POST", url)
+    assert response.status == 200 and response.headers["Cache-Control"] == "no-store"
+    rendered = json.loads(response.body)
+    assert rendered["url"] == f"/assets/demo/{rendered['file']}"
+
+    response = _request(router, "GET", url)
+    assert response.status == 302 and response.headers["Location"] == rendered["url"]
+    response = _request(router, "GET", url + "&format=json")
+    assert json.loads(response.body) == rendered
+    assert _request(router, "GET", "/api/sets/demo/cards/1/exports/thumb?size=48").status == 404
+
+
+def test_post_limits(store):
+    router = build_router(store)
+    base = "/api/sets/demo/cards/1/exports"
+    assert _request(router, "POST", f"{base}/thumb?size={MAX_EXPORT_SIZE + 1}").status == 400
+    assert _request(router, "POST", f"{base}/turntable?frames={MAX_EXPORT_FRAMES + 1}").status == 400
+    assert _request(router, "POST", f"{base}/poster").status == 400
+    assert _request(router, "POST", "/api/sets/demo/cards/9/exports/thumb").status == 404
+    assert store.exports("demo") == {}
+
+
+def test_exported_files_are_readable(store):
+    entry = _export(store, "turntable", frames=3).cards["1"]["turntable"]
+    with Image.open(io.BytesIO(store.asset_path("demo", entry["file"]).read_bytes())) as image:
+        assert image.n_frames == 3
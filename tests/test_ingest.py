@@ -0,0 +1,96 @@
+"""Scan ingest: card cropping, upright aspect, perceptual dedupe and bad files."""
+
+from __future__ import annotations
+
+import pytest
+
+from cardserver.assets import AssetStore
+from cardserver.ingest import CARD_ASPECT, find_card_bounds, ingest_set, normalize_aspect, perceptual_hash
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+
+def _card(kind: str, size: tuple[int, int] = (250, 350)) -> "Image.Image":
+    """A card face with a dark frame around a pattern that differs per ``kind``."""
+    card = Image.new("RGB", (250, 350), (30, 30, 110))
+    draw = ImageDraw.Draw(card)
+    draw.rectangle((12, 12, 237, 337), fill=(235, 220, 180))
+    for i in range(0, 320, 40):
+        if kind == "stripes":
+            draw.rectangle((12, 12 + i, 237, 32 + i), fill=(180, 30, 30))
+        else:
+            draw.rectangle((12 + i * 225 // 320, 12, 32 + i * 225 // 320, 337), fill=(20, 140, 60))
+    return card.resize(size, Image.LANCZOS)
+
+
+def _scan(card: "Image.Image", size=(400, 500), at=(75, 75), background=(250, 250, 250)) -> "Image.Image":
+    scan = Image.new("RGB", size, background)
+    scan.paste(card, at)
+    return scan
+
+
+@pytest.fixture
+def scans(tmp_path):
+    source = tmp_path / "scans"
+    source.mkdir()
+    _scan(_card("stripes")).save(source / "1-front.png")
+    _scan(_card("columns")).save(source / "1-back.png")
+    # The same front rescanned smaller on a grey lid
+    _scan(_card("stripes", (200, 280)), (300, 380), (40, 50), (200, 200, 200)).save(source / "2-front.png")
+    # Photographed sideways
+    _scan(_card("columns")).transpose(Image.ROTATE_90).save(source / "3-front.png")
+    return source
+
+
+def test_find_card_bounds():
+    left, top, right, bottom = find_card_bounds(_scan(_card("stripes")))
+    assert abs(left - 75) <= 3 and abs(top - 75) <= 3
+    assert abs(right - 325) <= 3 and abs(bottom - 425) <= 3
+    assert find_card_bounds(Image.new("RGB", (400, 500), (250, 250, 250))) is None
+
+
+def test_normalize_aspect():
+    assert normalize_aspect(Image.new("RGB", (300, 350))).size == (250, 350)
+    assert normalize_aspect(Image.new("RGB", (250, 500))).size == (250, 350)
+    assert normalize_aspect(Image.new("RGB", (250, 350))).size == (250, 350)
+
+
+def test_perceptual_hash_survives_rescans():
+    stripes = perceptual_hash(_card("stripes"))
+    assert bin(stripes ^ perceptual_hash(_card("stripes", (125, 175)))).count("1") <= 2
+    assert bin(stripes ^ perceptual_hash(_card("columns"))).count("1") > 40
+
+
+def test_ingest_set(tmp_path, scans):
+    store = AssetStore(tmp_path / "store")
+    report = ingest_set(store, "demo", "Demo", scans, workers=1)
+    assert (report.cards, report.processed, report.cropped) == (3, 4, 4)
+    assert [(path.name, earlier.name) for path, earlier, _ in report.duplicates] == [("2-front.png", "1-front.png")]
+    assert report.failed == []
+
+    cards = store.manifest("demo")[0]["cards"]
+    assert cards["2"]["front"]["full"]["file"] == cards["1"]["front"]["full"]["file"]
+    assert cards["3"]["front"]["full"]["file"] != cards["1"]["front"]["full"]["file"]
+    assert "back" in cards["1"] and "back" not in cards["2"]
+    for card in cards.values():
+        full = card["front"]["full"]
+        assert full["height"] > full["width"]
+        assert abs(full["width"] / full["height"] - CARD_ASPECT) < 0.01
+
+
+def test_dedupe_can_be_turned_off(tmp_path, scans):
+    report = ingest_set(AssetStore(tmp_path / "store"), "demo", "Demo", scans, workers=1, max_distance=-1)
+    assert report.duplicates == []
+
+
+def test_unreadable_scans_are_skipped(tmp_path, scans):
+    (scans / "4-front.png").write_bytes(b"not a png")
+    (scans / "1-back.png").write_bytes(b"\x89PNG\r\n\x1a\n truncated")
+    store = AssetStore(tmp_path / "store")
+    report = ingest_set(store, "demo", "Demo", scans, workers=1)
+    assert sorted(path.name for path, _ in report.failed) == ["1-back.png", "4-front.png"]
+    assert report.cards == 3
+    cards = store.manifest("demo")[0]["cards"]
+    assert sorted(cards) == ["1", "2", "3"]
+    assert "back" not in cards["1"]
@@ -0,0 +1,111 @@
+"""Rarity-table pack odds, validation and seeded determinism."""
+
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from cardserver.packs import PackTable, parse_numbers
+
+CONFIG = {
+    "rarities": {"base": {"cards": "1-300"}, "short-print": {"cards": [301, "302-310"]}},
+    "slots": [
+        {"count": 9, "rarities": {"base": 1}},
+        {"count": 1, "rarities": {"base": 9, "short-print": 1}},
+    ],
+    "packs_per_box": 24,
+}
+
+
+@pytest.fixture
+def table():
+    return PackTable.from_config(CONFIG, range(1, 311))
+
+
+def test_parse_numbers():
+    assert parse_numbers("3-5") == [3, 4, 5]
+    assert parse_numbers([1, "5-7", "9"]) == [1, 5, 6, 7, 9]
+    assert parse_numbers(7) == [7]
+
+
+def test_from_config(table):
+    assert table.rarities == ("base", "short-print")
+    assert table.pack_size == 10
+    assert (table.packs_per_box, table.boxes_per_case) == (24, 20)
+
+
+def test_config_is_limited_to_baked_cards():
+    table = PackTable.from_config(CONFIG, range(1, 306))
+    pulled = {number for seed in range(200) for number, _ in table.rip(random.Random(seed))}
+    assert max(pulled) <= 305
+
+
+def test_same_seed_same_packs(table):
+    first = table.rip_many(50, random.Random(1989))
+    assert table.rip_many(50, random.Random(1989)) == first
+    rng = random.Random(1989)
+    assert [table.rip(rng) for _ in range(50)] == first
+    assert table.rip_many(50, random.Random(1990)) != first
+
+
+def test_summary_matches_ripped_packs(table):
+    packs = table.rip_many(500, random.Random(7))
+    summary = table.summarize(500, random.Random(7))
+    cards = Counter(number for pack in packs for number, _ in pack)
+    assert summary["packs"] == 500
+    assert summary["cards"] == {str(number): hits for number, hits in sorted(cards.items())}
+    assert sum(summary["rarities"].values()) == 5000
+
+
+def test_packs_never_repeat_a_card(table):
+    rng = random.Random(3)
+    for _ in range(2000):
+        numbers = [number for number, _ in table.rip(rng)]
+        assert len(numbers) == len(set(numbers)) == 10
+
+
+def test_slot_odds(table):
+    packs = 20_000
+    rng = random.Random(11)
+    hits = Counter(table.rip(rng)[-1][1] for _ in range(packs))
+    # The last slot pulls a short print one time in ten
+    assert hits[1] / packs == pytest.approx(0.1, abs=0.01)
+    summary = table.summarize(packs, random.Random(12))
+    assert summary["rarities"]["short-print"] / packs == pytest.approx(0.1, abs=0.01)
+    # Every base card is equally likely
+    base = [summary["cards"].get(str(number), 0) for number in range(1, 301)]
+    expected = packs * (9 + 0.9) / 300
+    assert min(base) > expected * 0.75 and max(base) < expected * 1.25
+
+
+def test_exhausted_rarity_falls_back():
+    table = PackTable({"base": list(range(1, 11)), "rare": [11, 12]}, [(4, {"rare": 1})])
+    rng = random.Random(5)
+    for _ in range(200):
+        pack = table.rip(rng)
+        numbers = [number for number, _ in pack]
+        assert len(set(numbers)) == 4
+        assert {11, 12} <= set(numbers)
+
+
+def test_uniform_table():
+    table = PackTable.uniform(range(1, 6), pack_size=10)
+    assert table.pack_size == 5
+    assert sorted(number for number, _ in table.rip(random.Random(0))) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize(
+    "pools, slots, message",
+    [
+        ({"base": []}, [(1, {"base": 1})], "no cards"),
+        ({"base": [1, 2], "sp": [2]}, [(1, {"base": 1})], "repeats"),
+        ({"base": [1, 2]}, [(1, {"foil": 1})], "unknown"),
+        ({"base": [1, 2]}, [(0, {"base": 1})], "positive count"),
+        ({"base": [1, 2]}, [(3, {"base": 1})], "need more"),
+    ],
+)
+def test_invalid_tables(pools, slots, message):
+    with pytest.raises(ValueError, match=message):
+        PackTable(pools, slots)
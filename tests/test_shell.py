@@ -0,0 +1,155 @@
+"""Vendoring three.js and rendering the service worker."""
+
+from __future__ import annotations
+
+import json
+import re
+
+import pytest
+
+from cardserver.assets import AssetStore
+from cardserver.server import StaticFiles, build_router
+from cardserver.shell import (
+    PRECACHE_BUNDLE_BYTES,
+    THREE_VERSION,
+    VENDOR_DIR,
+    is_vendored,
+    precache_bundles,
+    service_worker,
+    shell_files,
+    vendor_three,
+)
+from cardserver.web import Request
+
+LIBRARY = "export class Scene {}\nexport class Mesh {}\nexport class Unused {}\nexport const REVISION = '134';\n"
+TEMPLATE = "const SHELL_VERSION = 'dev';\nconst SHELL_FILES = [];\nconst PRECACHE_BUNDLES = [];\nself.addEventListener('install', () => {});\n"
+
+
+def _three_package(root, version: str = THREE_VERSION):
+    """A minimal stand-in for the three npm package."""
+    (root / "build").mkdir(parents=True)
+    (root / "package.json").write_text(json.dumps({"name": "three", "version": version}))
+    (root / "build" / "three.module.js").write_text(LIBRARY)
+    loaders = root / "examples" / "jsm" / "loaders"
+    loaders.mkdir(parents=True)
+    (loaders / "KTX2Loader.js").write_text(
+        "import { Mesh } from '../../../build/three.module.js';\n"
+        "import { read } from '../libs/ktx-parse.module.js';\n"
+        "export class KTX2Loader { load() { return new Mesh(read()); } }\n"
+    )
+    (root / "examples" / "jsm" / "libs").mkdir()
+    (root / "examples" / "jsm" / "libs" / "ktx-parse.module.js").write_text("export function read() {}\n")
+    basis = root / "examples" / "js" / "libs" / "basis"
+    basis.mkdir(parents=True)
+    (basis / "basis_transcoder.js").write_text("var BASIS;\n")
+    (basis / "basis_transcoder.wasm").write_bytes(b"\0asm")
+    return root
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    (root / "js").mkdir(parents=True)
+    (root / "index.html").write_text("<script type=module>const scene = new THREE.Scene();</script>")
+    (root / "js" / "app.js").write_text("import { Scene } from 'three';\nexport const app = new Scene();\n")
+    (root / "sw.js").write_text(TEMPLATE)
+    return root
+
+
+def _get(router, path: str):
+    return router.dispatch(Request.from_target("GET", path, {}))
+
+
+def test_vendor_three(site, tmp_path, monkeypatch):
+    monkeypatch.setattr("cardserver.shell.shutil.which", lambda name: None)  # Copy, even where esbuild exists
+    record = vendor_three(_three_package(tmp_path / "three"), site)
+    out = site / VENDOR_DIR
+    assert record["three"] == THREE_VERSION
+    assert record["exports"] == ["Mesh", "Scene"]  # Mesh through the copied loader
+    assert (out / "three.module.js").read_text() == LIBRARY  # Copied whole without esbuild
+    loader = (out / "examples" / "jsm" / "loaders" / "KTX2Loader.js").read_text()
+    assert "from 'three'" in loader and "build/three.module.js" not in loader
+    assert (out / "examples" / "jsm" / "libs" / "ktx-parse.module.js").is_file()
+    assert (out / "basis" / "basis_transcoder.wasm").read_bytes() == b"\0asm"
+    assert json.loads((out / "vendor.json").read_text()) == record
+    assert is_vendored(site)
+
+
+def test_vendor_three_rejects_other_versions(site, tmp_path):
+    with pytest.raises(ValueError, match=THREE_VERSION):
+        vendor_three(_three_package(tmp_path / "three", "0.150.0"), site)
+    with pytest.raises(ValueError):
+        vendor_three(tmp_path / "missing", site)
+    assert not is_vendored(site)
+
+
+def test_vendor_route_says_how_to_build_it(site, store, tmp_path):
+    router = build_router(store, StaticFiles(site))
+    response = _get(router, "/vendor/three/three.module.js")
+    assert response.status == 503
+    assert b"python -m cardserver vendor" in response.body
+    assert "Location" not in response.headers
+    vendor_three(_three_package(tmp_path / "three"), site)
+    assert _get(router, "/vendor/three/three.module.js").status == 200
+    assert _get(router, "/vendor/three/missing.js").status == 404
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AssetStore(tmp_path / "assets")
+
+
+def _with_bundles(store, slug: str, **sizes: int) -> None:
+    """A manifest listing one bundle of ``sizes[tier]`` bytes per tier."""
+    bundles = {tier: {"file": f"{slug[:4]}{tier[:4]}".ljust(20, "0") + ".cpak", "bytes": size}
+               for tier, size in sizes.items()}
+    store.write_manifest(slug, {"set": slug, "name": slug, "cards": {}, "bundles": bundles})
+
+
+def _constants(body: bytes) -> tuple[str, list, list]:
+    text = body.decode()
+    found = dict(re.findall(r"^const (SHELL_VERSION|SHELL_FILES|PRECACHE_BUNDLES) = (.*);$", text, re.MULTILINE))
+    return json.loads(found["SHELL_VERSION"]), json.loads(found["SHELL_FILES"]), json.loads(found["PRECACHE_BUNDLES"])
+
+
+def test_service_worker_fills_in_the_shell(site, store):
+    static = StaticFiles(site)
+    version, files, bundles = _constants(service_worker(site / "sw.js", static, store))
+    assert re.fullmatch(r"[0-9a-f]{16}", version)
+    assert files == ["/", "/index.html", "/js/app.js"]
+    assert bundles == []
+    assert [url for url, _ in shell_files(static)] == files
+    assert service_worker(site / "sw.js", static, store).endswith(b"self.addEventListener('install', () => {});\n")
+
+
+def test_service_worker_version_follows_the_shell(site, store, tmp_path):
+    static = StaticFiles(site)
+    first, _, _ = _constants(service_worker(site / "sw.js", static, store))
+    assert _constants(service_worker(site / "sw.js", static, store))[0] == first
+    (site / "js" / "app.js").write_text("export const app = 2;\n")
+    second, _, _ = _constants(service_worker(site / "sw.js", static, store))
+    assert second != first
+    vendor_three(_three_package(tmp_path / "three"), site)
+    third, files, _ = _constants(service_worker(site / "sw.js", static, store))
+    assert third != second
+    assert "/vendor/three/three.module.js" in files and "/vendor/three/vendor.json" not in files
+    _with_bundles(store, "alpha", thumb=1000)
+    fourth, _, bundles = _constants(service_worker(site / "sw.js", static, store))
+    assert fourth != third and bundles == [url for url, _ in precache_bundles(store)]
+
+
+def test_precache_bundles_are_thumbs_within_the_cap(store):
+    _with_bundles(store, "alpha", thumb=PRECACHE_BUNDLE_BYTES // 2, mid=1000)
+    _with_bundles(store, "bravo", thumb=1000, full=1000)
+    _with_bundles(store, "delta", thumb=PRECACHE_BUNDLE_BYTES // 2)
+    chosen = precache_bundles(store)
+    # Smallest first; the second half-cap set no longer fits after bravo
+    assert [url.split("/")[2] for url, _ in chosen] == ["bravo", "alpha"]
+    for url, etag in chosen:
+        assert url.endswith(f"/{etag}.cpak")
+
+
+def test_service_worker_template_must_declare_the_constants(site, store):
+    (site / "sw.js").write_text("const SHELL_VERSION = 'dev';\n")
+    with pytest.raises(ValueError, match="SHELL_FILES"):
+        service_worker(site / "sw.js", StaticFiles(site), store)